@@ -1,3 +1,21 @@
-from .graph import create_graph, run_interpret, run_podcast_only
+from .graph import (
+    create_graph,
+    get_graph,
+    run_interpret,
+    run_podcast_only,
+    run_related,
+    arun_interpret,
+    arun_podcast_only,
+    arun_related,
+)
 
-__all__ = ["create_graph", "run_interpret", "run_podcast_only"]
+__all__ = [
+    "create_graph",
+    "get_graph",
+    "run_interpret",
+    "run_podcast_only",
+    "run_related",
+    "arun_interpret",
+    "arun_podcast_only",
+    "arun_related",
+]
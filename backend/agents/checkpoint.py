@@ -0,0 +1,371 @@
+"""LangGraph 检查点存储。
+
+- SqliteCheckpointSaver：持久化到 paper_axon.db 旁的 checkpoints.db，进程中断后按 thread_id 从最后完成的节点恢复；
+- BoundedMemorySaver：纯内存、有界，用于无需恢复的场景（GRAPH_CHECKPOINTER=memory）。
+"""
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from backend.config import DB_BUSY_TIMEOUT_MS
+from backend.log_config import get_logger
+
+logger = get_logger(__name__)
+
+# 状态中引用的中间产物句柄（见 services.artifacts）
+_HANDLE = re.compile(r"sha256:[0-9a-f]{64}")
+_HANDLE_BYTES = re.compile(_HANDLE.pattern.encode())
+
+
+def _collect_handles(value: Any, out: set[str]) -> None:
+    if isinstance(value, str):
+        if value.startswith("sha256:") and _HANDLE.fullmatch(value):
+            out.add(value)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _collect_handles(v, out)
+    elif isinstance(value, (list, tuple, set)):
+        for v in value:
+            _collect_handles(v, out)
+
+
+class BoundedMemorySaver(MemorySaver):
+    """有界的内存检查点：进程内共享、线程安全。
+
+    - 运行结束后由调用方 delete_thread() 释放该线程的全部检查点；
+    - 最多保留 max_threads 个线程（按最近写入排序），超出时淘汰最久未写入的，
+      防止异常路径漏删导致内存无限增长。
+    """
+
+    def __init__(self, max_threads: int = 256):
+        super().__init__()
+        self.max_threads = max(1, max_threads)
+        self._lock = threading.RLock()
+        self._recent: OrderedDict[str, None] = OrderedDict()
+
+    def _touch(self, config: RunnableConfig) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        self._recent[thread_id] = None
+        self._recent.move_to_end(thread_id)
+        while len(self._recent) > self.max_threads:
+            evicted, _ = self._recent.popitem(last=False)
+            logger.info("检查点线程数超过上限 %s，淘汰 %s", self.max_threads, evicted)
+            super().delete_thread(evicted)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self._lock:
+            return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            self._touch(config)
+            return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._recent.pop(thread_id, None)
+            super().delete_thread(thread_id)
+
+    def thread_count(self) -> int:
+        with self._lock:
+            return len(self._recent)
+
+    def gc(self, max_age_sec: float) -> int:
+        """内存检查点由 max_threads 限制大小，无需按时间清理。"""
+        return 0
+
+    def artifact_handles(self) -> set[str]:
+        """现存检查点（含 pending writes）引用的中间产物句柄。"""
+        handles: set[str] = set()
+        with self._lock:
+            for t in self.list(None):
+                _collect_handles(t.checkpoint.get("channel_values"), handles)
+                _collect_handles([v for _, _, v in t.pending_writes or ()], handles)
+        return handles
+
+
+_CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_created ON checkpoints(created_at);
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """SQLite 检查点：每个 (thread_id, checkpoint_ns) 只保留最新的检查点及其 pending writes，
+    足以从中断处恢复，且单个线程占用的空间不随步数增长。
+
+    使用独立的数据库文件，避免大块状态（解析正文等）的写入与业务表争用写锁；
+    单连接 + 锁，可被多个线程共享。
+    """
+
+    def __init__(self, path: Path):
+        super().__init__()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_CHECKPOINT_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _ids(config: RunnableConfig) -> tuple[str, str]:
+        conf = config["configurable"]
+        return conf["thread_id"], conf.get("checkpoint_ns", "")
+
+    def _tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, ctype, cblob, mtype, mblob = row
+        writes = self._conn.execute(
+            """SELECT task_id, channel, type, value FROM checkpoint_writes
+               WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=? ORDER BY task_path, task_id, idx""",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((ctype, cblob)),
+            metadata=self.serde.loads_typed((mtype, mblob)),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id
+                else None
+            ),
+        )
+
+    _SELECT = """SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint,
+                        metadata_type, metadata FROM checkpoints"""
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id, checkpoint_ns = self._ids(config)
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    self._SELECT + " WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id=?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    self._SELECT + " WHERE thread_id=? AND checkpoint_ns=? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            thread_id, checkpoint_ns = self._ids(config)
+            where.append("thread_id=?")
+            params.append(thread_id)
+            if "checkpoint_ns" in config["configurable"]:
+                where.append("checkpoint_ns=?")
+                params.append(checkpoint_ns)
+        if before and get_checkpoint_id(before):
+            where.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        sql = self._SELECT + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY checkpoint_id DESC"
+        with self._lock:
+            tuples = [self._tuple(r) for r in self._conn.execute(sql, params).fetchall()]
+        n = 0
+        for t in tuples:
+            if filter and any(t.metadata.get(k) != v for k, v in filter.items()):
+                continue
+            yield t
+            n += 1
+            if limit is not None and n >= limit:
+                return
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id, checkpoint_ns = self._ids(config)
+        ctype, cblob = self.serde.dumps_typed(checkpoint)
+        mtype, mblob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO checkpoints
+                   (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 ctype, cblob, mtype, mblob, time.time()),
+            )
+            # 只保留最新检查点：更早的检查点及其 writes 已并入本检查点
+            self._conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, checkpoint["id"]),
+            )
+            self._conn.execute(
+                "DELETE FROM checkpoint_writes WHERE thread_id=? AND checkpoint_ns=? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, checkpoint["id"]),
+            )
+            self._conn.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id, checkpoint_ns = self._ids(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 普通通道已存在则保留首次写入；特殊通道（错误/中断等，下标为负）重复写入时覆盖
+        rows: dict[str, list[tuple]] = {"INSERT OR IGNORE": [], "INSERT OR REPLACE": []}
+        for idx, (channel, value) in enumerate(writes):
+            t, v = self.serde.dumps_typed(value)
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            verb = "INSERT OR REPLACE" if write_idx < 0 else "INSERT OR IGNORE"
+            rows[verb].append((thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, t, v, task_path))
+        with self._lock:
+            for verb, batch in rows.items():
+                if batch:
+                    self._conn.executemany(
+                        f"""{verb} INTO checkpoint_writes
+                            (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        batch,
+                    )
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id=?", (thread_id,))
+            self._conn.execute("DELETE FROM checkpoint_writes WHERE thread_id=?", (thread_id,))
+            self._conn.commit()
+
+    def gc(self, max_age_sec: float) -> int:
+        """删除最后一次写入早于 max_age_sec 的线程（中断后一直未被恢复的运行），返回删除的线程数。"""
+        cutoff = time.time() - max_age_sec
+        with self._lock:
+            stale = [r[0] for r in self._conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (cutoff,)
+            ).fetchall()]
+            for thread_id in stale:
+                self.delete_thread(thread_id)
+        return len(stale)
+
+    def thread_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints").fetchone()[0]
+
+    def artifact_handles(self) -> set[str]:
+        """现存检查点（含 pending writes）引用的中间产物句柄：直接在序列化后的数据中查找，无需反序列化。"""
+        handles: set[str] = set()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT checkpoint FROM checkpoints UNION ALL SELECT value FROM checkpoint_writes"
+            ).fetchall()
+        for (blob,) in rows:
+            if blob:
+                handles.update(m.decode() for m in _HANDLE_BYTES.findall(bytes(blob)))
+        return handles
+
+    # 异步接口：复用同步实现，放到线程中执行，等锁（与其他线程/运行争用）时不阻塞事件循环
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for t in self.list(config, filter=filter, before=before, limit=limit):
+            yield t
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
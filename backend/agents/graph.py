@@ -1,82 +1,229 @@
-"""LangGraph 图：规划 + 解析/解读/检索/记忆/播客。"""
-from typing import Any, Literal
+"""LangGraph 图：规划 + 解析/解读/检索/记忆/播客。
 
+解读流水线：parser -> [interpreter ∥ retriever] -> [memory ∥ podcast]，
+planner 每次给出可并行的一组节点，同一步内并发执行，端到端耗时取决于关键路径。
+
+图在每个进程中只编译一次（get_graph），各线程共享。检查点默认存于 SQLite（checkpoints.db）：
+运行正常结束即删除该 thread_id 的检查点；运行因进程退出、取消或超时中断时保留，
+同一 thread_id 的下一次运行（如任务被回收重跑）从最后完成的节点继续，省去重复的 LLM/TTS 调用。
+
+arun_* 为协程版入口（astream）：interpreter / retriever / podcast 使用各自的 arun，等待 LLM/TTS/arXiv 时
+不占用线程，单个事件循环可同时推进大量运行；parser、memory 为本地计算，由 LangGraph 放到执行器线程中。
+"""
+import threading
+from typing import Any, Callable, Optional
+
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 
+from backend.agents.checkpoint import BoundedMemorySaver, SqliteCheckpointSaver
 from backend.agents.state import AgentState
+from backend.config import (
+    CHECKPOINT_DB_PATH,
+    CHECKPOINT_RETENTION_SEC,
+    GRAPH_CHECKPOINTER,
+    GRAPH_CHECKPOINT_MAX_THREADS,
+)
+from backend.log_config import get_logger
+from backend.services import artifacts, cancellation, metrics
 from backend.agents.nodes.planner import route as planner_route
 from backend.agents.nodes.parser import run as parser_run
-from backend.agents.nodes.interpreter import run as interpreter_run
-from backend.agents.nodes.retriever import run as retriever_run
+from backend.agents.nodes.interpreter import run as interpreter_run, arun as interpreter_arun
+from backend.agents.nodes.retriever import run as retriever_run, arun as retriever_arun
 from backend.agents.nodes.memory import run as memory_run
-from backend.agents.nodes.podcast import run as podcast_run
+from backend.agents.nodes.podcast import run as podcast_run, arun as podcast_arun
+
+logger = get_logger(__name__)
 
 
-def _route_after_planner(state: AgentState) -> Literal["parser", "interpreter", "retriever", "memory", "podcast", "__end__"]:
-    n = (state.get("next_node") or "__end__").strip()
-    if n == "parser":
-        return "parser"
-    if n == "interpreter":
-        return "interpreter"
-    if n == "retriever":
-        return "retriever"
-    if n == "memory":
-        return "memory"
-    if n == "podcast":
-        return "podcast"
-    return "__end__"
+_NODES = ("parser", "interpreter", "retriever", "memory", "podcast")
 
 
-def create_graph():
+def _route_after_planner(state: AgentState) -> list[str] | str:
+    """planner 给出的节点并行执行；全部完成后回到 planner 汇合。"""
+    nodes = [n for n in (state.get("next_node") or []) if n in _NODES]
+    return nodes or END
+
+
+def create_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
     graph = StateGraph(AgentState)
 
+    def node(name: str, run, arun=None):
+        """节点经 metrics.instrument 包装；同步运行（stream）调用 run，异步运行（astream）调用 arun。"""
+        if arun is None:
+            return metrics.instrument(name, run)
+        return RunnableLambda(metrics.instrument(name, run), afunc=metrics.instrument(name, arun), name=name)
+
     graph.add_node("planner", planner_route)
-    graph.add_node("parser", parser_run)
-    graph.add_node("interpreter", interpreter_run)
-    graph.add_node("retriever", retriever_run)
-    graph.add_node("memory", memory_run)
-    graph.add_node("podcast", podcast_run)
+    graph.add_node("parser", node("parser", parser_run))
+    graph.add_node("interpreter", node("interpreter", interpreter_run, interpreter_arun))
+    graph.add_node("retriever", node("retriever", retriever_run, retriever_arun))
+    graph.add_node("memory", node("memory", memory_run))
+    graph.add_node("podcast", node("podcast", podcast_run, podcast_arun))
 
     graph.set_entry_point("planner")
-    graph.add_conditional_edges("planner", _route_after_planner)
-    graph.add_edge("parser", "planner")
-    graph.add_edge("interpreter", "planner")
-    graph.add_edge("retriever", END)
-    graph.add_edge("memory", "planner")
-    graph.add_edge("podcast", END)
+    graph.add_conditional_edges("planner", _route_after_planner, [*_NODES, END])
+    for name in _NODES:
+        graph.add_edge(name, "planner")
 
-    memory = MemorySaver()
-    return graph.compile(checkpointer=memory)
+    return graph.compile(checkpointer=checkpointer)
 
 
-def run_interpret(paper_id: str, paper_input: dict) -> dict[str, Any]:
-    """运行解读流水线：parser -> interpreter -> memory -> podcast。"""
-    app = create_graph()
-    initial: AgentState = {
-        "request_type": "interpret",
-        "paper_id": paper_id,
-        "paper_input": paper_input,
-    }
-    config = {"configurable": {"thread_id": f"interpret-{paper_id}"}}
+_checkpointer: Optional[BaseCheckpointSaver] = None
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_checkpointer():
+    global _checkpointer
+    if _checkpointer is None:
+        with _graph_lock:
+            if _checkpointer is None:
+                if GRAPH_CHECKPOINTER == "memory":
+                    _checkpointer = BoundedMemorySaver(max_threads=GRAPH_CHECKPOINT_MAX_THREADS)
+                else:
+                    _checkpointer = SqliteCheckpointSaver(CHECKPOINT_DB_PATH)
+    return _checkpointer
+
+
+def get_graph():
+    """本进程共享的已编译图（线程安全，首次调用时编译）。"""
+    global _graph
+    if _graph is None:
+        checkpointer = get_checkpointer()
+        with _graph_lock:
+            if _graph is None:
+                _graph = create_graph(checkpointer)
+    return _graph
+
+
+def gc_checkpoints() -> int:
+    """清理超过 CHECKPOINT_RETENTION_SEC 仍未恢复的检查点及其引用的中间产物，返回清理的线程数。
+    中间产物按文件修改时间判断过期，但仍被保留的检查点引用的不删除：
+    产物（如 parse_ref）可能早于同一线程后续的检查点写入，单看时间会先于检查点过期。"""
+    checkpointer = get_checkpointer()
+    n = checkpointer.gc(CHECKPOINT_RETENTION_SEC)
+    if n:
+        logger.info("清理过期检查点: %s 个线程", n)
+    artifacts.gc(CHECKPOINT_RETENTION_SEC, keep=checkpointer.artifact_handles())
+    return n
+
+
+# 节点完成回调：on_node(节点名)，用于推送任务进度；planner 不上报
+NodeCallback = Callable[[str], None]
+
+
+def _stream(app, initial: Optional[AgentState], config: dict, on_node: Optional[NodeCallback]) -> Optional[dict]:
+    """逐步执行图，返回最终的完整状态；每一步之后检查任务是否已取消或超时（在后台任务中执行时）。"""
     final = None
-    for event in app.stream(initial, config):
-        for v in event.values():
-            final = v
+    for mode, chunk in app.stream(initial, config, stream_mode=["updates", "values"]):
+        if mode == "values":
+            final = chunk
+            continue
+        if on_node:
+            for name in chunk:
+                if name != "planner":
+                    on_node(name)
+        cancellation.check()
+    return final
+
+
+def _resume_input(initial: AgentState, thread_id: str, snapshot) -> Optional[AgentState]:
+    """有同一请求的未完成检查点时返回 None（从中断处继续），否则返回 initial（重新开始）。"""
+    if snapshot.values:
+        same_request = all(snapshot.values.get(k) == v for k, v in initial.items())
+        if snapshot.next and same_request:
+            logger.info("从检查点恢复 thread_id=%s，下一步 %s", thread_id, list(snapshot.next))
+            return None
+    return initial
+
+
+def _run(initial: AgentState, thread_id: str, on_node: Optional[NodeCallback] = None) -> dict[str, Any]:
+    """运行图。若该 thread_id 有同一请求的未完成检查点，则从中断处继续；
+    中断（异常）时保留检查点供下次恢复，正常结束后删除。"""
+    app = get_graph()
+    checkpointer = get_checkpointer()
+    config = {"configurable": {"thread_id": thread_id}}
+    graph_input = _resume_input(initial, thread_id, app.get_state(config))
+    if graph_input is initial:
+        checkpointer.delete_thread(thread_id)
+    final = _stream(app, graph_input, config, on_node)
+    checkpointer.delete_thread(thread_id)
     return final or initial
 
 
-def run_podcast_only(paper_id: str, interpretation: str) -> dict[str, Any]:
-    """仅生成播客（已有解读）。"""
-    app = create_graph()
-    initial: AgentState = {
+async def _astream(app, initial: Optional[AgentState], config: dict, on_node: Optional[NodeCallback]) -> Optional[dict]:
+    """_stream 的协程版。"""
+    final = None
+    async for mode, chunk in app.astream(initial, config, stream_mode=["updates", "values"]):
+        if mode == "values":
+            final = chunk
+            continue
+        if on_node:
+            for name in chunk:
+                if name != "planner":
+                    on_node(name)
+        cancellation.check()
+    return final
+
+
+async def _arun(initial: AgentState, thread_id: str, on_node: Optional[NodeCallback] = None) -> dict[str, Any]:
+    """_run 的协程版，检查点语义相同（同一 thread_id 的同步/异步运行可互相恢复）。"""
+    app = get_graph()
+    checkpointer = get_checkpointer()
+    config = {"configurable": {"thread_id": thread_id}}
+    graph_input = _resume_input(initial, thread_id, await app.aget_state(config))
+    if graph_input is initial:
+        await checkpointer.adelete_thread(thread_id)
+    final = await _astream(app, graph_input, config, on_node)
+    await checkpointer.adelete_thread(thread_id)
+    return final or initial
+
+
+def _interpret_input(paper_id: str, paper_input: dict) -> AgentState:
+    return {"request_type": "interpret", "paper_id": paper_id, "paper_input": paper_input}
+
+
+def _podcast_input(paper_id: str, interpretation: str) -> AgentState:
+    return {
         "request_type": "podcast_only",
         "paper_id": paper_id,
-        "interpretation": interpretation,
+        "interpretation_ref": artifacts.put_text(interpretation),
     }
-    config = {"configurable": {"thread_id": f"podcast-{paper_id}"}}
-    final = None
-    for event in app.stream(initial, config):
-        for v in event.values():
-            final = v
-    return final or initial
+
+
+def _related_input(paper_id: str) -> AgentState:
+    return {"request_type": "related_only", "paper_id": paper_id}
+
+
+def run_interpret(paper_id: str, paper_input: dict, on_node: Optional[NodeCallback] = None) -> dict[str, Any]:
+    """运行解读流水线：parser -> interpreter -> memory -> podcast。"""
+    return _run(_interpret_input(paper_id, paper_input), f"interpret-{paper_id}", on_node)
+
+
+def run_podcast_only(paper_id: str, interpretation: str, on_node: Optional[NodeCallback] = None) -> dict[str, Any]:
+    """仅生成播客（已有解读）。"""
+    return _run(_podcast_input(paper_id, interpretation), f"podcast-{paper_id}", on_node)
+
+
+def run_related(paper_id: str, parse_result: dict) -> dict[str, Any]:
+    """检索相关论文。只有 retriever 一个节点且无需恢复，直接调用节点：不经过图，不写检查点与中间产物。"""
+    state = _related_input(paper_id)
+    return {**state, **retriever_run(state, parse_result)}
+
+
+async def arun_interpret(paper_id: str, paper_input: dict, on_node: Optional[NodeCallback] = None) -> dict[str, Any]:
+    """run_interpret 的协程版。"""
+    return await _arun(_interpret_input(paper_id, paper_input), f"interpret-{paper_id}", on_node)
+
+
+async def arun_podcast_only(paper_id: str, interpretation: str, on_node: Optional[NodeCallback] = None) -> dict[str, Any]:
+    """run_podcast_only 的协程版。"""
+    return await _arun(_podcast_input(paper_id, interpretation), f"podcast-{paper_id}", on_node)
+
+
+async def arun_related(paper_id: str, parse_result: dict) -> dict[str, Any]:
+    """run_related 的协程版。"""
+    state = _related_input(paper_id)
+    return {**state, **await retriever_arun(state, parse_result)}
@@ -1,16 +1,56 @@
-"""解读节点：调用 Qwen 生成中文解读 Markdown。"""
+"""解读节点：调用 Qwen 流式生成中文解读 Markdown，边生成边写入 {paper_id}.partial.md 供前端实时展示。"""
 from backend.agents.state import AgentState
-from backend.services.qwen import generate_interpretation
+from backend.services import artifacts
+from backend.services.interpretation_stream import PartialWriter
+from backend.services.qwen import (
+    agenerate_interpretation,
+    astream_interpretation,
+    generate_interpretation,
+    stream_interpretation,
+)
 
 
 def run(state: AgentState) -> AgentState:
     if state.get("error"):
-        return state
-    parse_result = state.get("parse_result")
-    if not parse_result:
-        return {**state, "error": "缺少 parse_result"}
+        return {}
+    parse_ref = state.get("parse_ref")
+    if not parse_ref:
+        return {"error": "缺少 parse_ref"}
+    paper_id = state.get("paper_id")
     try:
-        interpretation = generate_interpretation(parse_result)
-        return {**state, "interpretation": interpretation}
+        parse_result = artifacts.get_json(parse_ref)
+        if not paper_id:
+            return _result(generate_interpretation(parse_result))
+        with PartialWriter(paper_id) as w:
+            out = _result(stream_interpretation(parse_result, w.write))
+            if "error" not in out:
+                w.commit()
+        return out
     except Exception as e:
-        return {**state, "error": str(e)}
+        return {"error": str(e)}
+
+
+async def arun(state: AgentState) -> AgentState:
+    if state.get("error"):
+        return {}
+    parse_ref = state.get("parse_ref")
+    if not parse_ref:
+        return {"error": "缺少 parse_ref"}
+    paper_id = state.get("paper_id")
+    try:
+        parse_result = artifacts.get_json(parse_ref)
+        if not paper_id:
+            return _result(await agenerate_interpretation(parse_result))
+        with PartialWriter(paper_id) as w:
+            out = _result(await astream_interpretation(parse_result, w.write))
+            if "error" not in out:
+                w.commit()
+        return out
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _result(interpretation: str) -> AgentState:
+    if not interpretation.strip():
+        return {"error": "模型返回的解读为空"}
+    return {"interpretation_ref": artifacts.put_text(interpretation)}
@@ -1,9 +1,31 @@
-"""解析节点：PDF 或 arXiv 解析，输出 parse_result。"""
+"""解析节点：PDF 或 arXiv 解析，解析结果存入产物存储，输出 parse_ref。
+
+PDF 解析结果经 parse_cache 按内容哈希缓存，同一 PDF 再次解读时不再调用 PyMuPDF。
+"""
 from pathlib import Path
 
 from backend.agents.state import AgentState
-from backend.services.pdf_parser import parse_pdf
-from backend.services import arxiv_client
+from backend.config import FTS_INDEX_FULLTEXT
+from backend.db import connection
+from backend.db import models as db
+from backend.services import arxiv_client, artifacts, parse_cache, pdf_parser
+
+
+def _index_body(paper_id: str, parse_result: dict) -> None:
+    if FTS_INDEX_FULLTEXT and paper_id and parse_result.get("raw_text"):
+        with connection() as conn:
+            db.paper_fts_set_body(conn, paper_id, parse_result["raw_text"])
+
+
+def _parse_pdf(path: str | Path) -> dict:
+    digest = parse_cache.file_sha256(path)
+    version = pdf_parser.cache_version()
+    cached = parse_cache.get(digest, version)
+    if cached is not None:
+        return cached
+    parse_result = pdf_parser.parse_pdf(path)
+    parse_cache.put(digest, version, parse_result)
+    return parse_result
 
 
 def run(state: AgentState) -> AgentState:
@@ -16,7 +38,7 @@ def run(state: AgentState) -> AgentState:
         # 已有 paper_id，从 DB 取路径（由调用方保证 state 中已有 path 或由 API 层注入）
         path = paper_input.get("path")
         if not path:
-            return {**state, "error": "缺少 paper_input.path 或 arxiv_id"}
+            return {"error": "缺少 paper_input.path 或 arxiv_id"}
 
     if arxiv_id:
         try:
@@ -32,20 +54,22 @@ def run(state: AgentState) -> AgentState:
                 "raw_text": meta["abstract"][:8000],
             }
             # 若有本地 PDF 再解析正文
-            full_parse = parse_pdf(local_path)
+            full_parse = _parse_pdf(local_path)
             full_parse["title"] = meta["title"]
             full_parse["authors"] = meta["authors"]
             full_parse["abstract"] = meta["abstract"]
             parse_result = full_parse
-            return {**state, "parse_result": parse_result, "paper_input": {**paper_input, "path": path}}
+            _index_body(paper_id, parse_result)
+            return {"parse_ref": artifacts.put_json(parse_result), "paper_input": {**paper_input, "path": path}}
         except Exception as e:
-            return {**state, "error": str(e)}
+            return {"error": str(e)}
 
     if path:
         try:
-            parse_result = parse_pdf(path)
-            return {**state, "parse_result": parse_result}
+            parse_result = _parse_pdf(path)
+            _index_body(paper_id, parse_result)
+            return {"parse_ref": artifacts.put_json(parse_result)}
         except Exception as e:
-            return {**state, "error": str(e)}
+            return {"error": str(e)}
 
-    return {**state, "error": "需要 paper_input.path 或 paper_input.arxiv_id"}
+    return {"error": "需要 paper_input.path 或 paper_input.arxiv_id"}
@@ -1,5 +1,6 @@
-"""规划节点：规则路由，根据 request_type 与 state 返回 next_node。"""
+"""规划节点：规则路由，根据 request_type 与 state 返回下一步要执行的节点（可多个，并行执行）。"""
 from backend.agents.state import AgentState
+from backend.config import PREFETCH_RELATED
 
 # 节点名常量
 END = "__end__"
@@ -7,30 +8,33 @@ END = "__end__"
 
 def route(state: AgentState) -> AgentState:
     request_type = state.get("request_type") or "interpret"
-    next_node = END
+    next_nodes: list[str] = []
 
     if state.get("error"):
-        return {**state, "next_node": END}
+        return {"next_node": next_nodes}
 
     if request_type == "related_only":
-        next_node = "retriever"
-        return {**state, "next_node": next_node}
+        if "related_papers" not in state:
+            next_nodes = ["retriever"]
+        return {"next_node": next_nodes}
 
     if request_type == "podcast_only":
-        if state.get("interpretation") and state.get("paper_id"):
-            next_node = "podcast"
-        return {**state, "next_node": next_node}
+        if state.get("interpretation_ref") and state.get("paper_id") and not state.get("podcast_audio_path"):
+            next_nodes = ["podcast"]
+        return {"next_node": next_nodes}
 
     # interpret / full_pipeline
-    if not state.get("parse_result") and (state.get("paper_input") or state.get("paper_id")):
-        next_node = "parser"
-    elif state.get("parse_result") and not state.get("interpretation"):
-        next_node = "interpreter"
-    elif state.get("interpretation") and not state.get("memory_updated"):
-        next_node = "memory"
-    elif state.get("memory_updated") and state.get("paper_id"):
-        next_node = "podcast"
-    else:
-        next_node = END
-
-    return {**state, "next_node": next_node}
+    # parser -> [interpreter ∥ retriever 预取相关论文] -> [memory ∥ podcast]
+    if not state.get("parse_ref") and (state.get("paper_input") or state.get("paper_id")):
+        next_nodes = ["parser"]
+    elif state.get("parse_ref") and not state.get("interpretation_ref"):
+        next_nodes = ["interpreter"]
+        if PREFETCH_RELATED and state.get("paper_id") and "related_papers" not in state:
+            next_nodes.append("retriever")
+    elif state.get("interpretation_ref"):
+        if not state.get("memory_updated"):
+            next_nodes.append("memory")
+        if state.get("paper_id") and not state.get("podcast_audio_path"):
+            next_nodes.append("podcast")
+
+    return {"next_node": next_nodes}
@@ -1,36 +1,65 @@
 """播客节点：解读转播客稿 + TTS 生成 MP3。"""
-from pathlib import Path
+import asyncio
 
 from backend.agents.state import AgentState
 from backend.config import PODCASTS_DIR
-from backend.db import get_conn
+from backend.db import connection
 from backend.db import models as db
-from backend.services.qwen import generate_podcast_script
-from backend.services.tts_aliyun import synthesize_to_file
+from backend.services import artifacts
+from backend.services.qwen import agenerate_podcast_script, generate_podcast_script
+from backend.services.tts_aliyun import asynthesize_to_file, synthesize_to_file
+
+
+def _check(state: AgentState) -> AgentState | None:
+    if not state.get("paper_id"):
+        return {"error": "缺少 paper_id"}
+    if not state.get("interpretation_ref"):
+        return {"error": "缺少 interpretation，请先完成解读"}
+    return None
+
+
+def _save(paper_id: str, audio_path: str, duration_sec: float) -> None:
+    with connection() as conn:
+        db.podcast_upsert(conn, paper_id, audio_path, duration_sec)
 
 
 def run(state: AgentState) -> AgentState:
     if state.get("error"):
-        return state
-    paper_id = state.get("paper_id")
-    interpretation = state.get("interpretation")
-    if not paper_id:
-        return {**state, "error": "缺少 paper_id"}
-    if not interpretation:
-        return {**state, "error": "缺少 interpretation，请先完成解读"}
+        return {}
+    invalid = _check(state)
+    if invalid:
+        return invalid
+    paper_id = state["paper_id"]
+    interpretation_ref = state["interpretation_ref"]
 
     try:
-        script = generate_podcast_script(interpretation)
+        script = generate_podcast_script(artifacts.get_text(interpretation_ref))
+        script_ref = artifacts.put_text(script)
         PODCASTS_DIR.mkdir(parents=True, exist_ok=True)
         default_path = str(PODCASTS_DIR / f"{paper_id}.mp3")
         audio_path, duration_sec = synthesize_to_file(script, default_path)
 
-        conn = get_conn()
-        try:
-            db.podcast_upsert(conn, paper_id, audio_path, duration_sec)
-        finally:
-            conn.close()
+        _save(paper_id, audio_path, duration_sec)
+
+        return {"podcast_audio_path": audio_path, "podcast_script_ref": script_ref}
+    except Exception as e:
+        return {"error": str(e)}
 
-        return {**state, "podcast_audio_path": audio_path}
+
+async def arun(state: AgentState) -> AgentState:
+    if state.get("error"):
+        return {}
+    invalid = _check(state)
+    if invalid:
+        return invalid
+    paper_id = state["paper_id"]
+
+    try:
+        script = await agenerate_podcast_script(artifacts.get_text(state["interpretation_ref"]))
+        script_ref = artifacts.put_text(script)
+        PODCASTS_DIR.mkdir(parents=True, exist_ok=True)
+        audio_path, duration_sec = await asynthesize_to_file(script, str(PODCASTS_DIR / f"{paper_id}.mp3"))
+        await asyncio.to_thread(_save, paper_id, audio_path, duration_sec)
+        return {"podcast_audio_path": audio_path, "podcast_script_ref": script_ref}
     except Exception as e:
-        return {**state, "error": str(e)}
+        return {"error": str(e)}
@@ -1,33 +1,68 @@
-"""检索节点：用 arXiv API 根据当前论文 title+abstract 查相关论文。"""
+"""检索节点：用 arXiv API 根据当前论文 title+abstract 查相关论文，结果缓存到 related_papers 表。
+
+related_only 请求中检索失败即为错误；解读流水线中作为与 interpreter 并行的预取，失败只记日志。
+arun 为协程版：用 httpx 直接请求 arXiv API 并解析 Atom，不占用线程。
+"""
+import asyncio
+import xml.etree.ElementTree as ET
+from typing import Optional
+
 import arxiv
+import httpx
 
 from backend.agents.state import AgentState
-from backend.db import get_conn
+from backend.config import ARXIV_API_URL, ARXIV_TIMEOUT_SEC
+from backend.db import connection
 from backend.db import models as db
+from backend.log_config import get_logger
+from backend.services import arxiv_client, artifacts, cancellation, metrics
 
+logger = get_logger(__name__)
 
-def run(state: AgentState) -> AgentState:
-    if state.get("error"):
-        return state
+_ATOM = {"atom": "http://www.w3.org/2005/Atom"}
+_MAX_RESULTS = 10
+
+
+def _query(state: AgentState, parse_result: Optional[dict] = None) -> str:
     paper_id = state.get("paper_id")
-    parse_result = state.get("parse_result") or {}
+    if parse_result is None:
+        parse_result = artifacts.get_json(state["parse_ref"]) if state.get("parse_ref") else {}
     query = (parse_result.get("title") or "") + " " + (parse_result.get("abstract") or "")[:500]
     if not query.strip():
         # 若 state 仅有 paper_id，从 DB 取论文信息
         if paper_id:
-            conn = get_conn()
-            try:
+            with connection() as conn:
                 row = db.paper_get_by_id(conn, paper_id)
                 if row:
                     query = (row["title"] or "") + " " + (row["abstract"] or "")[:500]
-            finally:
-                conn.close()
-    if not query.strip():
-        return {**state, "related_papers": [], "next_node": "__end__"}
+    return query.strip()
+
+
+def _save(paper_id: str | None, related: list[dict]) -> None:
+    if paper_id:
+        with connection() as conn:
+            db.related_upsert(conn, paper_id, related)
+
+
+def _failed(state: AgentState, e: Exception) -> AgentState:
+    if state.get("request_type") == "related_only":
+        return {"error": str(e), "related_papers": []}
+    logger.warning("预取相关论文失败 paper_id=%s: %s", state.get("paper_id"), e)
+    metrics.record_error(str(e))
+    return {"related_papers": []}
+
+
+def run(state: AgentState, parse_result: Optional[dict] = None) -> AgentState:
+    """parse_result 供 graph.run_related 直接调用时传入，不经过中间产物。"""
+    if state.get("error"):
+        return {}
+    query = _query(state, parse_result)
+    if not query:
+        return {"related_papers": []}
 
     try:
-        search = arxiv.Search(query=query[:200], max_results=10)
-        client = arxiv.Client()
+        search = arxiv.Search(query=query[:200], max_results=_MAX_RESULTS)
+        client = arxiv_client.new_client()
         related = []
         for p in client.results(search):
             related.append({
@@ -37,6 +72,58 @@ def run(state: AgentState) -> AgentState:
                 "summary": (p.summary or "")[:300],
                 "published": p.published.isoformat() if p.published else None,
             })
-        return {**state, "related_papers": related, "next_node": "__end__"}
+        _save(state.get("paper_id"), related)
+        return {"related_papers": related}
+    except Exception as e:
+        return _failed(state, e)
+
+
+def _parse_atom(content: bytes) -> list[dict]:
+    """把 arXiv API 的 Atom 响应转成与 run 相同结构的条目列表。"""
+    related = []
+    for entry in ET.fromstring(content).findall("atom:entry", _ATOM):
+        entry_id = entry.findtext("atom:id", "", _ATOM).strip()
+        if not entry_id:
+            continue
+        published = entry.findtext("atom:published", "", _ATOM).strip()
+        related.append({
+            "title": " ".join(entry.findtext("atom:title", "", _ATOM).split()),
+            "authors": ", ".join(
+                a.findtext("atom:name", "", _ATOM).strip() for a in entry.findall("atom:author", _ATOM)
+            ),
+            "arxiv_id": entry_id.split("/")[-1],
+            "summary": " ".join(entry.findtext("atom:summary", "", _ATOM).split())[:300],
+            "published": published.replace("Z", "+00:00") or None,
+        })
+    return related
+
+
+async def arun(state: AgentState, parse_result: Optional[dict] = None) -> AgentState:
+    if state.get("error"):
+        return {}
+    query = await asyncio.to_thread(_query, state, parse_result)
+    if not query:
+        return {"related_papers": []}
+
+    try:
+        async with httpx.AsyncClient() as client:
+            resp = await client.get(
+                ARXIV_API_URL,
+                params={
+                    "search_query": query[:200],
+                    "start": 0,
+                    "max_results": _MAX_RESULTS,
+                    "sortBy": "relevance",
+                    "sortOrder": "descending",
+                },
+                timeout=cancellation.remaining(ARXIV_TIMEOUT_SEC),
+            )
+            resp.raise_for_status()
+        metrics.add("bytes_downloaded", len(resp.content))
+        related = _parse_atom(resp.content)
+        await asyncio.to_thread(_save, state.get("paper_id"), related)
+        return {"related_papers": related}
+    except cancellation.Cancelled:
+        raise
     except Exception as e:
-        return {**state, "error": str(e), "related_papers": [], "next_node": "__end__"}
+        return _failed(state, e)
@@ -1,15 +1,25 @@
-"""LangGraph 状态定义。"""
-from typing import Any, Optional, TypedDict
+"""LangGraph 状态定义。
+
+并行分支在同一步写入状态，因此节点只返回自己产生的字段；error 可能由任一分支写入，保留第一个。
+大块内容（解析结果、解读、播客稿）存于 services.artifacts，状态中只保存 *_ref 句柄，
+每步检查点因此只有几百字节。
+"""
+from typing import Annotated, Any, Optional, TypedDict
+
+
+def _first_error(current: Optional[str], new: Optional[str]) -> Optional[str]:
+    return current or new
 
 
 class AgentState(TypedDict, total=False):
     request_type: str  # interpret | related_only | podcast_only | full_pipeline
     paper_input: dict  # path 或 arxiv_id
     paper_id: str
-    parse_result: dict
-    interpretation: str
+    parse_ref: str  # 解析结果 JSON（title/abstract/raw_text...）的产物句柄
+    interpretation_ref: str  # 解读 Markdown 的产物句柄
+    podcast_script_ref: str  # 播客稿的产物句柄
     related_papers: list
     memory_updated: bool
     podcast_audio_path: str
-    error: Optional[str]
-    next_node: str  # planner 输出
+    error: Annotated[Optional[str], _first_error]
+    next_node: list[str]  # planner 输出：下一步并行执行的节点，空表示结束
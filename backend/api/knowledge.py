@@ -1,28 +1,21 @@
 """知识图谱与热度 API。"""
 from fastapi import APIRouter
 
-from backend.db import get_conn
-from backend.db import models as db
-from backend.services.knowledge_graph import build_graph, get_trending
+from backend.db import connection, async_connection
+from backend.services.knowledge_graph import build_graph, aget_trending
 
 router = APIRouter(tags=["knowledge"])
 
 
 @router.get("/api/knowledge-graph")
 def knowledge_graph():
-    conn = get_conn()
-    try:
+    with connection() as conn:
         nodes, edges = build_graph(conn)
         return {"nodes": nodes, "edges": edges}
-    finally:
-        conn.close()
 
 
 @router.get("/api/trending")
-def trending():
-    conn = get_conn()
-    try:
-        items = get_trending(conn, limit=20)
+async def trending():
+    async with async_connection() as conn:
+        items = await aget_trending(conn, limit=20)
         return {"items": items}
-    finally:
-        conn.close()
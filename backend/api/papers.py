@@ -1,134 +1,151 @@
 """论文相关 API：上传、from-arxiv、解读、播客、列表、删除、相关论文。"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 from nanoid import generate as nanoid_generate
 
-from backend.config import PAPERS_DIR, INTERPRETATIONS_DIR, PODCASTS_DIR, ensure_data_dirs
-from backend.db import get_conn
+from backend.config import (
+    PAPERS_DIR,
+    BATCH_MAX_PAPERS,
+    BATCH_TIMEOUT_SEC,
+    RELATED_CACHE_TTL_SEC,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_CHUNK_BYTES,
+    ensure_data_dirs,
+)
+from backend.db import connection, async_connection
 from backend.db import models as db
-from backend.agents.graph import run_interpret, run_podcast_only
+from backend.db import async_models as adb
+from backend.services import interpretation_stream, parse_cache, task_queue
 from backend.services.arxiv_client import extract_arxiv_id, fetch_and_download
 from backend.log_config import get_logger
 
 router = APIRouter(prefix="/api/papers", tags=["papers"])
 logger = get_logger(__name__)
 
-# 异步任务在线程池中执行，避免阻塞
-_executor = ThreadPoolExecutor(max_workers=4)
 
+# ---------- 请求体 ----------
+class FromArxivBody(BaseModel):
+    url: str | None = None
+    arxiv_id: str | None = None
 
-def _run_interpret_task(paper_id: str, task_id: str):
-    conn = get_conn()
-    try:
-        db.task_update(conn, task_id, "running")
-    finally:
-        conn.close()
+
+class InterpretBatchBody(BaseModel):
+    paper_ids: list[str] | None = None  # 指定论文；为空时按下列条件筛选全库
+    since: str | None = None  # 入库时间不早于该值（ISO 8601，如 2024-05-01 或 2024-05-01T00:00:00Z）
+    uninterpreted: bool = False  # 仅尚无解读的论文
+    limit: int = 100
+    concurrency: int | None = None  # 同时进行的子任务数，默认 BATCH_CONCURRENCY
+    no_cache: bool = False  # 跳过 LLM 响应缓存，重新调用模型
+
+
+def _enqueue_response(task_type: str, paper_id: str, no_cache: bool = False) -> dict:
+    payload = {"paper_id": paper_id}
+    if no_cache:
+        payload["no_cache"] = True
     try:
-        row = db.paper_get_by_id(get_conn(), paper_id)
-        conn2 = get_conn()
-        try:
-            if not row:
-                db.task_update(conn2, task_id, "failed", error="论文不存在")
-                return
-            path = row["source_path_or_url"]
-            if path and Path(path).exists():
-                result = run_interpret(paper_id, {"path": path})
-            else:
-                db.task_update(conn2, task_id, "failed", error="PDF 文件不存在")
-                return
-            err = result.get("error")
-            if err:
-                db.task_update(conn2, task_id, "failed", error=err)
+        task_id, created = task_queue.enqueue(task_type, payload, paper_id=paper_id)
+    except task_queue.QueueFull as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(e.retry_after)})
+    if not created:
+        return {"task_id": task_id, "message": "已有进行中的相同任务"}
+    return {"task_id": task_id}
+
+
+# ---------- 上传 PDF ----------
+# multipart 表单在文件内容之外的边界与字段头
+_UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+def _upload_too_large() -> str:
+    return f"文件超过 {UPLOAD_MAX_BYTES // (1024 * 1024)} MB 上限"
+
+
+class UploadSizeLimitMiddleware:
+    """按 Content-Length 拒绝超过 UPLOAD_MAX_BYTES 的上传：FastAPI 在进入路由前就会读完并解析整个表单，
+    只能在 ASGI 层、读取请求体之前返回 413。未带 Content-Length（分块传输）时由 _save_upload 按实际字节数限制。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == f"{router.prefix}/upload":
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > UPLOAD_MAX_BYTES + _UPLOAD_FORM_OVERHEAD:
+                await JSONResponse({"detail": _upload_too_large()}, status_code=413)(scope, receive, send)
                 return
-            interp_row = db.interpretation_get(conn2, paper_id)
-            content_path = interp_row["content_path"] if interp_row else str(INTERPRETATIONS_DIR / f"{paper_id}.md")
-            db.task_update(conn2, task_id, "success", result={"paper_id": paper_id, "interpretation_path": content_path})
-        finally:
-            conn2.close()
-    except Exception as e:
-        logger.exception("解读任务失败 paper_id=%s task_id=%s: %s", paper_id, task_id, e)
-        c = get_conn()
-        try:
-            db.task_update(c, task_id, "failed", error=str(e))
-        finally:
-            c.close()
+        await self.app(scope, receive, send)
 
 
-def _run_podcast_task(paper_id: str, task_id: str):
-    conn = get_conn()
-    try:
-        db.task_update(conn, task_id, "running")
-    finally:
-        conn.close()
-    try:
-        interp_row = db.interpretation_get(get_conn(), paper_id)
-        if not interp_row or not interp_row["content_path"]:
-            c = get_conn()
-            try:
-                db.task_update(c, task_id, "failed", error="请先完成解读")
-            finally:
-                c.close()
-            return
-        content_path = interp_row["content_path"]
-        interpretation = Path(content_path).read_text(encoding="utf-8")
-        result = run_podcast_only(paper_id, interpretation)
-        err = result.get("error")
-        if err:
-            c = get_conn()
-            try:
-                db.task_update(c, task_id, "failed", error=err)
-            finally:
-                c.close()
-            return
-        audio_path = result.get("podcast_audio_path", "")
-        podcast_url = f"/api/papers/{paper_id}/podcast" if audio_path else ""
-        is_placeholder = Path(audio_path).suffix.lower() == ".txt" if audio_path else True
-        c = get_conn()
-        try:
-            db.task_update(
-                c, task_id, "success",
-                result={"paper_id": paper_id, "podcast_url": podcast_url, "is_placeholder": is_placeholder},
-            )
-        finally:
-            c.close()
-    except Exception as e:
-        logger.exception("播客任务失败 paper_id=%s task_id=%s: %s", paper_id, task_id, e)
-        c = get_conn()
-        try:
-            db.task_update(c, task_id, "failed", error=str(e))
-        finally:
-            c.close()
+def _write_chunk(f, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    f.write(chunk)
 
 
-# ---------- 请求体 ----------
-class FromArxivBody(BaseModel):
-    url: str | None = None
-    arxiv_id: str | None = None
+async def _save_upload(file: UploadFile, tmp: Path) -> tuple[str, int]:
+    """按块把上传内容写入临时文件并增量计算 SHA-256，返回 (哈希, 字节数)；超过 UPLOAD_MAX_BYTES 或不是 PDF 时抛 HTTPException。
+    文件的打开、写入与关闭都放到线程中，不阻塞事件循环。"""
+    digest = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, tmp, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            if size == 0 and b"%PDF-" not in chunk[:1024]:
+                raise HTTPException(400, "文件内容不是 PDF")
+            size += len(chunk)
+            if size > UPLOAD_MAX_BYTES:
+                raise HTTPException(413, _upload_too_large())
+            await asyncio.to_thread(_write_chunk, f, digest, chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+    if size == 0:
+        raise HTTPException(400, "文件为空")
+    return digest.hexdigest(), size
 
 
-# ---------- 上传 PDF ----------
 @router.post("/upload")
-def upload_pdf(file: UploadFile = File(...)):
+async def upload_pdf(file: UploadFile = File(...)):
+    """分块写入临时文件后原子改名为 {paper_id}.pdf；内容与已上传的 PDF 相同时删除临时文件并返回已有的 paper_id。"""
     ensure_data_dirs()
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "请上传 PDF 文件")
-    paper_id = nanoid_generate(size=12)
-    path = PAPERS_DIR / f"{paper_id}.pdf"
-    path.write_bytes(file.file.read())
-    conn = get_conn()
+    tmp = PAPERS_DIR / f".upload-{nanoid_generate(size=12)}.part"
     try:
-        db.paper_insert(
-            conn, paper_id, "local_pdf", str(path),
-            title=file.filename or "Untitled", authors="", abstract="",
-        )
-        return {"paper_id": paper_id}
+        content_sha256, _ = await _save_upload(file, tmp)
+        async with async_connection() as conn:
+            existing = await adb.paper_get_by_sha256(conn, content_sha256)
+            if existing:
+                return {"paper_id": existing["paper_id"]}
+            paper_id = nanoid_generate(size=12)
+            path = PAPERS_DIR / f"{paper_id}.pdf"
+            await asyncio.to_thread(os.replace, tmp, path)
+            try:
+                await adb.paper_insert(
+                    conn, paper_id, "local_pdf", str(path),
+                    title=file.filename or "Untitled", authors="", abstract="",
+                    content_sha256=content_sha256,
+                )
+            except sqlite3.IntegrityError:
+                # 相同内容的并发上传已先入库
+                await conn.rollback()
+                await asyncio.to_thread(path.unlink, missing_ok=True)
+                existing = await adb.paper_get_by_sha256(conn, content_sha256)
+                if not existing:
+                    raise
+                return {"paper_id": existing["paper_id"]}
+            return {"paper_id": paper_id}
     finally:
-        conn.close()
+        await asyncio.to_thread(tmp.unlink, missing_ok=True)
+        await file.close()
 
 
 # ---------- 从 arXiv 拉取 ----------
@@ -139,17 +156,13 @@ def from_arxiv(body: FromArxivBody):
     if not arxiv_id:
         raise HTTPException(400, "需要 url 或 arxiv_id")
 
-    conn = get_conn()
-    try:
+    with connection() as conn:
         existing = db.paper_get_by_arxiv_id(conn, arxiv_id)
         if existing:
             return {"paper_id": existing["paper_id"]}
-    finally:
-        conn.close()
 
     meta, local_path = fetch_and_download(arxiv_id)
-    conn = get_conn()
-    try:
+    with connection() as conn:
         paper_id = nanoid_generate(size=12)
         db.paper_insert(
             conn, paper_id, "arxiv", meta["source_path_or_url"],
@@ -157,32 +170,90 @@ def from_arxiv(body: FromArxivBody):
             arxiv_id=arxiv_id, published_at=meta.get("published_at"),
         )
         return {"paper_id": paper_id}
-    finally:
-        conn.close()
 
 
 # ---------- 触发解读（异步） ----------
 @router.post("/{paper_id}/interpret")
-def trigger_interpret(paper_id: str):
-    conn = get_conn()
-    try:
+def trigger_interpret(paper_id: str, reuse: bool = False, no_cache: bool = False):
+    """同一论文已有进行中的解读任务时返回该任务；reuse=true 时若已有解读结果则直接返回、不再调用模型。
+    相同提示默认复用 LLM 缓存，no_cache=true 时重新调用模型。"""
+    with connection() as conn:
         row = db.paper_get_by_id(conn, paper_id)
         if not row:
             raise HTTPException(404, "论文不存在")
-        task_id = nanoid_generate(size=16)
-        db.task_insert(conn, task_id, "interpret")
-        _executor.submit(_run_interpret_task, paper_id, task_id)
-        return {"task_id": task_id}
-    finally:
-        conn.close()
+        if reuse:
+            interp = db.interpretation_get(conn, paper_id)
+            if interp and Path(interp["content_path"]).exists():
+                return {"task_id": None, "message": "解读已存在"}
+    return _enqueue_response("interpret", paper_id, no_cache)
+
+
+# ---------- 批量解读（异步） ----------
+@router.post("/interpret-batch")
+def trigger_interpret_batch(body: InterpretBatchBody):
+    """创建批量解读父任务，返回其 task_id；进度（total/done/failed/running/pending）通过
+    GET /api/tasks/{task_id} 或其 SSE 事件查看，取消父任务会一并取消未完成的子任务。"""
+    limit = max(1, min(body.limit, BATCH_MAX_PAPERS))
+    paper_ids = list(dict.fromkeys(body.paper_ids)) if body.paper_ids is not None else None
+    if paper_ids is not None and len(paper_ids) > BATCH_MAX_PAPERS:
+        raise HTTPException(400, f"单批最多 {BATCH_MAX_PAPERS} 篇论文")
+    with connection() as conn:
+        selected = db.paper_select_ids(
+            conn, paper_ids=paper_ids, since=body.since, uninterpreted=body.uninterpreted,
+            limit=len(paper_ids) if paper_ids is not None else limit,
+        )
+    if not selected:
+        return {"task_id": None, "total": 0, "message": "没有符合条件的论文"}
+    payload = {"paper_ids": selected}
+    if body.concurrency:
+        payload["concurrency"] = max(1, body.concurrency)
+    if body.no_cache:
+        payload["no_cache"] = True
+    try:
+        task_id, _ = task_queue.enqueue("interpret_batch", payload, timeout_sec=BATCH_TIMEOUT_SEC)
+    except task_queue.QueueFull as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": str(e.retry_after)})
+    return {"task_id": task_id, "total": len(selected)}
+
+
+# ---------- 全文检索（需在 /{paper_id} 之前注册）----------
+@router.get("/search")
+async def search_papers(q: str, limit: int = 20, offset: int = 0):
+    """标题/摘要/正文全文检索：BM25 排序，返回高亮标题与摘要片段。"""
+    match = db.fts_query(q)
+    if not match:
+        raise HTTPException(400, "检索词不能为空")
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    async with async_connection() as conn:
+        rows = await adb.paper_search(conn, match, limit=limit, offset=offset)
+        total = await adb.paper_search_count(conn, match)
+    return {
+        "items": [
+            {
+                "paper_id": r["paper_id"],
+                "title": r["title"],
+                "title_highlight": db.fts_highlight_html(r["title_highlight"]),
+                "snippet": db.fts_highlight_html(r["snippet"]),
+                "authors": r["authors"],
+                "arxiv_id": r["arxiv_id"] or None,
+                "source_type": r["source_type"],
+                "updated_at": r["updated_at"],
+                "score": -r["score"],
+            }
+            for r in rows
+        ],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
 
 
 # ---------- 获取论文元信息 ----------
 @router.get("/{paper_id}")
-def get_paper(paper_id: str):
-    conn = get_conn()
-    try:
-        row = db.paper_get_by_id(conn, paper_id)
+async def get_paper(paper_id: str):
+    async with async_connection() as conn:
+        row = await adb.paper_get_by_id(conn, paper_id)
         if not row:
             raise HTTPException(404, "论文不存在")
         return {
@@ -196,32 +267,55 @@ def get_paper(paper_id: str):
             "created_at": row["created_at"],
             "updated_at": row["updated_at"],
         }
-    finally:
-        conn.close()
 
 
 # ---------- 获取解读正文 ----------
 @router.get("/{paper_id}/interpretation")
-def get_interpretation(paper_id: str):
-    conn = get_conn()
-    try:
-        row = db.interpretation_get(conn, paper_id)
+async def get_interpretation(paper_id: str):
+    async with async_connection() as conn:
+        row = await adb.interpretation_get(conn, paper_id)
         if not row:
             raise HTTPException(404, "暂无解读")
         p = Path(row["content_path"])
         if not p.exists():
             raise HTTPException(404, "解读文件不存在")
         return FileResponse(p, media_type="text/markdown")
-    finally:
-        conn.close()
+
+
+async def _interpretation_pending_since(paper_id: str) -> float | None:
+    """解读尚未生成完（任务排队中或 interpreter 未完成）时返回该任务的创建时间（epoch 秒），否则 None。"""
+    async with async_connection() as conn:
+        task = await adb.task_get_active(conn, "interpret", paper_id)
+    if not task:
+        return None
+    progress = json.loads(task["progress"]) if task["progress"] else {}
+    if "interpreter" in (progress.get("completed") or []):
+        return None
+    return datetime.fromisoformat(task["created_at"].rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+
+
+@router.get("/{paper_id}/interpretation/stream")
+async def get_interpretation_stream(paper_id: str):
+    """流式返回解读 Markdown：解读进行中时先返回已生成的部分，之后随模型输出持续推送，生成完毕后结束；
+    没有进行中的解读时等同于 GET /interpretation。"""
+    async with async_connection() as conn:
+        if not await adb.paper_get_by_id(conn, paper_id):
+            raise HTTPException(404, "论文不存在")
+    pending = await _interpretation_pending_since(paper_id)
+    if pending is None and not interpretation_stream.final_path(paper_id).exists():
+        raise HTTPException(404, "暂无解读")
+    return StreamingResponse(
+        interpretation_stream.follow(paper_id, lambda: _interpretation_pending_since(paper_id)),
+        media_type="text/markdown; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ---------- 获取播客音频（支持 GET 与 HEAD；仅 .mp3/.wav 视为可播放，.txt 占位返回 503）----------
 @router.api_route("/{paper_id}/podcast", methods=["GET", "HEAD"])
-def get_podcast(paper_id: str, request: Request):
-    conn = get_conn()
-    try:
-        row = db.podcast_get(conn, paper_id)
+async def get_podcast(paper_id: str, request: Request):
+    async with async_connection() as conn:
+        row = await adb.podcast_get(conn, paper_id)
         if not row:
             raise HTTPException(404, "暂无播客")
         p = Path(row["audio_path"])
@@ -237,15 +331,13 @@ def get_podcast(paper_id: str, request: Request):
         if request.method == "HEAD":
             return Response(status_code=200, headers={"Content-Type": media})
         return FileResponse(p, media_type=media)
-    finally:
-        conn.close()
 
 
 # ---------- 触发播客生成（异步） ----------
 @router.post("/{paper_id}/podcast")
-def trigger_podcast(paper_id: str):
-    conn = get_conn()
-    try:
+def trigger_podcast(paper_id: str, no_cache: bool = False):
+    """no_cache=true 时不复用缓存的播客稿，重新调用模型。"""
+    with connection() as conn:
         if not db.paper_get_by_id(conn, paper_id):
             raise HTTPException(404, "论文不存在")
         existing = db.podcast_get(conn, paper_id)
@@ -254,86 +346,87 @@ def trigger_podcast(paper_id: str):
             # 仅当存在真实音频文件（.mp3/.wav）时才视为「播客已存在」；.txt 占位允许重新生成
             if ap.exists() and ap.suffix.lower() in (".mp3", ".wav"):
                 return {"task_id": None, "message": "播客已存在"}
-        task_id = nanoid_generate(size=16)
-        db.task_insert(conn, task_id, "podcast")
-        _executor.submit(_run_podcast_task, paper_id, task_id)
-        return {"task_id": task_id}
-    finally:
-        conn.close()
+    return _enqueue_response("podcast", paper_id, no_cache)
 
 
 # ---------- 论文列表 ----------
 @router.get("")
-def list_papers(limit: int = 50, offset: int = 0):
-    conn = get_conn()
-    try:
-        rows = db.paper_list(conn, limit=limit, offset=offset)
-        return {
-            "items": [
-                {
-                    "paper_id": r["paper_id"],
-                    "title": r["title"],
-                    "authors": r["authors"],
-                    "arxiv_id": r["arxiv_id"] or None,
-                    "source_type": r["source_type"],
-                    "created_at": r["created_at"],
-                    "updated_at": r["updated_at"],
-                }
-                for r in rows
-            ],
-            "limit": limit,
-            "offset": offset,
-        }
-    finally:
-        conn.close()
+async def list_papers(limit: int = 50, offset: int = 0, cursor: str | None = None):
+    """论文列表。推荐用 cursor（上一页返回的 next_cursor）翻页；offset 仅为兼容保留。"""
+    limit = max(1, min(limit, 200))
+    after = None
+    if cursor:
+        try:
+            after = db.paper_cursor_decode(cursor)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        offset = 0
+    async with async_connection() as conn:
+        rows = await adb.paper_list(conn, limit=limit, offset=offset, cursor=after)
+        total = await adb.paper_count_estimate(conn)
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = db.paper_cursor_encode(last["updated_at"], last["paper_id"])
+    return {
+        "items": [
+            {
+                "paper_id": r["paper_id"],
+                "title": r["title"],
+                "authors": r["authors"],
+                "arxiv_id": r["arxiv_id"] or None,
+                "source_type": r["source_type"],
+                "created_at": r["created_at"],
+                "updated_at": r["updated_at"],
+            }
+            for r in rows
+        ],
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+        "total_estimate": total,
+    }
 
 
 # ---------- 删除论文 ----------
 @router.delete("/{paper_id}")
 def delete_paper(paper_id: str):
-    conn = get_conn()
-    try:
+    with connection() as conn:
         row = db.paper_get_by_id(conn, paper_id)
         if not row:
             raise HTTPException(404, "论文不存在")
         interp = db.interpretation_get(conn, paper_id)
         podcast = db.podcast_get(conn, paper_id)
         db.paper_delete(conn, paper_id)
+        parse_cache.invalidate_file(row["source_path_or_url"])
         for p in [Path(row["source_path_or_url"]), interp and Path(interp["content_path"]), podcast and Path(podcast["audio_path"])]:
             if p and p.exists():
                 try:
                     p.unlink()
                 except Exception:
                     pass
-        return {"ok": True}
-    finally:
-        conn.close()
+    interpretation_stream.discard(paper_id)
+    from backend.agents.graph import get_checkpointer
+    for thread_id in (f"interpret-{paper_id}", f"podcast-{paper_id}"):
+        get_checkpointer().delete_thread(thread_id)
+    return {"ok": True}
 
 
 # ---------- 相关论文 ----------
 @router.get("/{paper_id}/related")
-def get_related(paper_id: str):
-    from backend.agents.graph import create_graph
-    from backend.agents.state import AgentState
-    app = create_graph()
-    conn = get_conn()
-    try:
-        row = db.paper_get_by_id(conn, paper_id)
-        if not row:
-            raise HTTPException(404, "论文不存在")
-        initial: AgentState = {
-            "request_type": "related_only",
-            "paper_id": paper_id,
-            "parse_result": {"title": row["title"], "abstract": row["abstract"]},
-        }
-        config = {"configurable": {"thread_id": f"related-{paper_id}"}}
-        final = None
-        for event in app.stream(initial, config):
-            for v in event.values():
-                final = v
-        related = (final or {}).get("related_papers") or []
-        if (final or {}).get("error"):
-            raise HTTPException(500, final.get("error"))
-        return {"items": related}
-    finally:
-        conn.close()
+async def get_related(paper_id: str, refresh: bool = False):
+    """相关论文：优先返回缓存（解读时已并行预取），过期或 refresh=true 时重新检索（直接调用 retriever 协程版，不占用线程）。"""
+    from backend.agents.graph import arun_related
+    async with async_connection() as conn:
+        row = await adb.paper_get_by_id(conn, paper_id)
+        cached = await adb.related_get(conn, paper_id) if not refresh else None
+    if not row:
+        raise HTTPException(404, "论文不存在")
+    if cached:
+        age = (datetime.utcnow() - datetime.fromisoformat(cached["created_at"].rstrip("Z"))).total_seconds()
+        if age < RELATED_CACHE_TTL_SEC:
+            return {"items": json.loads(cached["items"])}
+    final = await arun_related(paper_id, {"title": row["title"], "abstract": row["abstract"]})
+    if final.get("error"):
+        raise HTTPException(500, final.get("error"))
+    return {"items": final.get("related_papers") or []}
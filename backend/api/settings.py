@@ -2,8 +2,9 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from backend.db import get_conn
+from backend.db import connection, async_connection
 from backend.db import models as db
+from backend.db import async_models as adb
 from backend.config import DEFAULT_COLLECT_TIME
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
@@ -15,25 +16,19 @@ class CollectSettings(BaseModel):
 
 
 @router.get("/collect")
-def get_collect_settings():
-    conn = get_conn()
-    try:
-        enabled = db.setting_get(conn, "auto_collect_enabled")
-        time_val = db.setting_get(conn, "collect_time") or DEFAULT_COLLECT_TIME
+async def get_collect_settings():
+    async with async_connection() as conn:
+        enabled = await adb.setting_get(conn, "auto_collect_enabled")
+        time_val = await adb.setting_get(conn, "collect_time") or DEFAULT_COLLECT_TIME
         return {
             "auto_collect_enabled": enabled == "true" if enabled else False,
             "collect_time": time_val,
         }
-    finally:
-        conn.close()
 
 
 @router.put("/collect")
 def update_collect_settings(body: CollectSettings):
-    conn = get_conn()
-    try:
+    with connection() as conn:
         db.setting_set(conn, "auto_collect_enabled", "true" if body.auto_collect_enabled else "false")
         db.setting_set(conn, "collect_time", body.collect_time)
         return {"ok": True}
-    finally:
-        conn.close()
@@ -1,25 +1,164 @@
-"""异步任务状态查询。"""
-from fastapi import APIRouter, HTTPException
+"""异步任务状态查询、进度推送（SSE）与流水线埋点。"""
+import asyncio
+import json
+from datetime import datetime, timedelta
 
-from backend.db import get_conn
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from backend.config import TASK_QUEUE_MAX_DEPTH, TASK_EVENTS_KEEPALIVE_SEC
+from backend.db import connection, async_connection
 from backend.db import models as db
+from backend.db import async_models as adb
+from backend.services import events, limits, llm_cache, llm_client, metrics, task_queue
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
 
+@router.get("/stats")
+def queue_stats():
+    """队列深度（按类型/状态）、本进程各资源并发预算的占用情况、LLM 缓存命中与 LLM 客户端限流/重试统计。"""
+    with connection() as conn:
+        rows = db.task_counts(conn)
+    counts: dict[str, dict[str, int]] = {}
+    for r in rows:
+        counts.setdefault(r["type"], {})[r["status"]] = r["n"]
+    return {
+        "queue": counts,
+        "max_depth": TASK_QUEUE_MAX_DEPTH,
+        "resources": limits.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_client": llm_client.stats(),
+    }
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _summarize(rows) -> dict:
+    """同一节点的多条记录汇总：次数、错误数、耗时分位数、计数合计与估算费用。"""
+    walls = sorted(r["wall_ms"] for r in rows)
+    counts = {c: sum(r[c] for r in rows) for c in metrics.COUNTERS}
+    return {
+        "runs": len(rows),
+        "errors": sum(1 for r in rows if r["error"]),
+        "wall_ms_avg": round(sum(walls) / len(walls), 1) if walls else 0.0,
+        "wall_ms_p50": round(_percentile(walls, 0.5), 1),
+        "wall_ms_p95": round(_percentile(walls, 0.95), 1),
+        "wall_ms_max": round(walls[-1], 1) if walls else 0.0,
+        **counts,
+        "cost": metrics.cost(counts),
+    }
+
+
+@router.get("/metrics")
+def metrics_summary(hours: float = Query(24, gt=0, le=24 * 90), type: str | None = None):
+    """最近 hours 小时内各图节点的耗时分位数、token / TTS 字符 / 下载字节合计与错误数，可按任务类型过滤。"""
+    since = (datetime.utcnow() - timedelta(hours=hours)).isoformat() + "Z"
+    with connection() as conn:
+        rows = db.task_metrics_since(conn, since, type)
+    by_node: dict[str, list] = {}
+    for r in rows:
+        by_node.setdefault(r["node"], []).append(r)
+    return {
+        "since": since,
+        "tasks": len({r["task_id"] for r in rows}),
+        "nodes": {node: _summarize(rs) for node, rs in by_node.items()},
+        "total": _summarize(rows),
+    }
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _task_event_stream(task_ids: list[str]):
+    """先推送当前快照，之后仅在快照变化时推送；全部进入终态后发送 end 并结束。"""
+    async with events.subscribe(task_ids) as queue:
+        async with async_connection() as conn:
+            rows = await adb.task_get_many(conn, task_ids)
+        last: dict[str, dict] = {}
+        open_ids: set[str] = set()
+        for row in rows:
+            snap = db.task_public(row)
+            last[snap["task_id"]] = snap
+            yield _sse("task", snap)
+            if snap["status"] not in db.TASK_TERMINAL_STATUSES:
+                open_ids.add(snap["task_id"])
+        while open_ids:
+            try:
+                snap = await asyncio.wait_for(queue.get(), TASK_EVENTS_KEEPALIVE_SEC)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            task_id = snap["task_id"]
+            if task_id not in open_ids or last.get(task_id) == snap:
+                continue
+            last[task_id] = snap
+            yield _sse("task", snap)
+            if snap["status"] in db.TASK_TERMINAL_STATUSES:
+                open_ids.discard(task_id)
+        yield _sse("end", {"task_ids": task_ids})
+
+
+def _sse_response(task_ids: list[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _task_event_stream(task_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/events")
+async def multi_task_events(ids: str = Query(..., description="逗号分隔的 task_id")):
+    """多任务复用一条 SSE 连接：每个事件为 `event: task` + 任务快照。"""
+    task_ids = list(dict.fromkeys(t.strip() for t in ids.split(",") if t.strip()))
+    if not task_ids or len(task_ids) > 200:
+        raise HTTPException(400, "ids 需包含 1~200 个 task_id")
+    return _sse_response(task_ids)
+
+
+@router.get("/{task_id}/events")
+async def task_events(task_id: str):
+    """单任务 SSE：推送状态变化与节点进度（parser → interpreter → memory → podcast），替代轮询。"""
+    async with async_connection() as conn:
+        if not await adb.task_get(conn, task_id):
+            raise HTTPException(404, "任务不存在")
+    return _sse_response([task_id])
+
+
+@router.get("/{task_id}/metrics")
+def task_metrics(task_id: str):
+    """单个任务各次执行中每个节点的耗时、token、TTS 字符、下载字节与错误。"""
+    with connection() as conn:
+        if not db.task_get(conn, task_id):
+            raise HTTPException(404, "任务不存在")
+        rows = db.task_metrics_list(conn, task_id)
+    nodes = [
+        {k: r[k] for k in ("attempt", "node", "wall_ms", *metrics.COUNTERS, "error", "created_at")}
+        for r in rows
+    ]
+    counts = {c: sum(r[c] for r in rows) for c in metrics.COUNTERS}
+    return {"task_id": task_id, "nodes": nodes, "total": {**counts, "cost": metrics.cost(counts)}}
+
+
 @router.get("/{task_id}")
-def get_task(task_id: str):
-    conn = get_conn()
-    try:
-        row = db.task_get(conn, task_id)
+async def get_task(task_id: str):
+    async with async_connection() as conn:
+        row = await adb.task_get(conn, task_id)
         if not row:
             raise HTTPException(404, "任务不存在")
-        result = db.task_result_parse(row)
-        return {
-            "task_id": row["task_id"],
-            "status": row["status"],
-            "result": result,
-            "error": row["error"],
-        }
-    finally:
-        conn.close()
+        return db.task_public(row)
+
+
+@router.post("/{task_id}/cancel")
+def cancel_task(task_id: str):
+    """取消任务：排队中的立即取消；执行中的在下一个检查点（图节点之间、外部调用前）退出。
+    已结束的任务原样返回。"""
+    row = task_queue.cancel(task_id)
+    if not row:
+        raise HTTPException(404, "任务不存在")
+    return db.task_public(row)
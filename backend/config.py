@@ -15,9 +15,26 @@ PAPERS_DIR = DATA_DIR / "papers"
 INTERPRETATIONS_DIR = DATA_DIR / "interpretations"
 PODCASTS_DIR = DATA_DIR / "podcasts"
 DB_PATH = DATA_DIR / "paper_axon.db"
+# 流水线中间产物（解析结果、解读、播客稿）的内容寻址存储，图状态中只保存句柄
+ARTIFACTS_DIR = DATA_DIR / "artifacts"
+# LLM 响应缓存（按模型、参数、提示模板版本与完整提示寻址）
+LLM_CACHE_DIR = DATA_DIR / "llm_cache"
+# PDF 解析结果缓存（按 PDF 内容 SHA-256 与解析器版本寻址，gzip 压缩）
+PARSE_CACHE_DIR = DATA_DIR / "parse_cache"
 LOG_DIR = DATA_DIR / "logs"
 LOG_FILE = LOG_DIR / "app.log"
 
+# SQLite 连接池与 PRAGMA
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_ASYNC_POOL_SIZE = int(os.environ.get("DB_ASYNC_POOL_SIZE", "4"))
+DB_POOL_TIMEOUT_SEC = float(os.environ.get("DB_POOL_TIMEOUT_SEC", "30"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "20000"))  # 每连接页缓存约 20MB
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# 全文检索：是否把 PDF 解析出的正文写入 FTS 索引（否则仅索引标题与摘要）
+FTS_INDEX_FULLTEXT = os.environ.get("FTS_INDEX_FULLTEXT", "true").lower() in ("1", "true", "yes")
+
 # 服务端口
 PORT = int(os.environ.get("PORT", "18527"))
 
@@ -25,6 +42,11 @@ PORT = int(os.environ.get("PORT", "18527"))
 DASHSCOPE_API_KEY = os.environ.get("DASHSCOPE_API_KEY", "")
 # 阿里云百炼 base_url（OpenAI 兼容，北京地域；新加坡用 dashscope-intl.aliyuncs.com）
 DASHSCOPE_BASE_URL = os.environ.get("DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+# 非流式 TTS 接口（与百炼 Qwen-TTS API 一致）与 arXiv 查询接口；压测时可指向本地模拟服务（backend.loadtest.fake_upstream）
+DASHSCOPE_TTS_URL = os.environ.get(
+    "DASHSCOPE_TTS_URL", "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation"
+)
+ARXIV_API_URL = os.environ.get("ARXIV_API_URL", "https://export.arxiv.org/api/query")
 QWEN_MODEL = os.environ.get("QWEN_MODEL", "qwen3-max-2026-01-23")
 
 # TTS（DashScope Qwen TTS；标准 HTTP 接口用 qwen3-tts-flash，realtime 模型需其他接口）
@@ -37,7 +59,101 @@ ALIYUN_TTS_ACCESS_KEY_SECRET = os.environ.get("ALIYUN_TTS_ACCESS_KEY_SECRET", ""
 
 # 异步任务轮询
 TASK_POLL_INTERVAL_SEC = 2
-TASK_TIMEOUT_SEC = 15 * 60  # 15 分钟
+# 单次执行的截止时间：超时的任务记为 timeout，由 worker 协作退出或被回收线程标记
+TASK_TIMEOUT_SEC = float(os.environ.get("TASK_TIMEOUT_SEC", str(15 * 60)))  # 15 分钟
+
+# 外部调用的默认超时（秒），任务中还会被截断到任务剩余时间
+LLM_TIMEOUT_SEC = float(os.environ.get("LLM_TIMEOUT_SEC", "300"))
+TTS_TIMEOUT_SEC = float(os.environ.get("TTS_TIMEOUT_SEC", "60"))
+ARXIV_TIMEOUT_SEC = float(os.environ.get("ARXIV_TIMEOUT_SEC", "60"))
+
+# 持久化任务队列（tasks 表）
+# 本进程内的 worker 线程数；设为 0 时 API 进程只入队，由 `python -m backend.worker` 独立进程执行
+TASK_WORKERS = int(os.environ.get("TASK_WORKERS", "4"))
+TASK_LEASE_SEC = float(os.environ.get("TASK_LEASE_SEC", "60"))  # 租约时长，worker 每 1/3 租约续租一次
+TASK_MAX_ATTEMPTS = int(os.environ.get("TASK_MAX_ATTEMPTS", "3"))  # 含因进程退出/崩溃而被回收重跑的次数
+TASK_IDLE_POLL_SEC = float(os.environ.get("TASK_IDLE_POLL_SEC", "1"))
+# 异步 worker（`python -m backend.worker --async`）：单个事件循环中同时执行的任务数，
+# 以及执行 PDF 解析、DB 读写等同步步骤的线程数
+TASK_ASYNC_CONCURRENCY = int(os.environ.get("TASK_ASYNC_CONCURRENCY", "200"))
+TASK_ASYNC_THREADS = int(os.environ.get("TASK_ASYNC_THREADS", "16"))
+TASK_SHUTDOWN_GRACE_SEC = float(os.environ.get("TASK_SHUTDOWN_GRACE_SEC", "10"))
+# 排队中的任务超过该值时，新提交返回 429 + Retry-After
+TASK_QUEUE_MAX_DEPTH = int(os.environ.get("TASK_QUEUE_MAX_DEPTH", "100"))
+TASK_RETRY_AFTER_SEC = int(os.environ.get("TASK_RETRY_AFTER_SEC", "30"))
+
+# 解读时与 interpreter 并行预取相关论文（结果缓存，供 /related 直接返回）
+PREFETCH_RELATED = os.environ.get("PREFETCH_RELATED", "true").lower() in ("1", "true", "yes")
+RELATED_CACHE_TTL_SEC = float(os.environ.get("RELATED_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+
+# LangGraph 检查点：sqlite（默认，进程中断后从最后完成的节点恢复）或 memory（不持久化）
+GRAPH_CHECKPOINTER = os.environ.get("GRAPH_CHECKPOINTER", "sqlite").lower()
+CHECKPOINT_DB_PATH = DATA_DIR / "checkpoints.db"
+# 中断后超过该时长仍未恢复的检查点会被清理
+CHECKPOINT_RETENTION_SEC = float(os.environ.get("CHECKPOINT_RETENTION_SEC", str(3 * 24 * 3600)))
+# 进程内缓存的中间产物个数（按句柄，内容不可变）
+ARTIFACT_CACHE_ITEMS = int(os.environ.get("ARTIFACT_CACHE_ITEMS", "64"))
+# 内存检查点最多保留的线程数（正常运行结束即释放，此上限防止异常路径泄漏）
+GRAPH_CHECKPOINT_MAX_THREADS = int(os.environ.get("GRAPH_CHECKPOINT_MAX_THREADS", "256"))
+
+# 批量解读：父任务按窗口提交子任务，同时进行的子任务不超过 BATCH_CONCURRENCY
+# 父任务等待期间不占用 worker：子任务结束时被唤醒，复用他人进行中任务时每 BATCH_POLL_SEC 秒检查一次
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "3"))
+BATCH_MAX_PAPERS = int(os.environ.get("BATCH_MAX_PAPERS", "500"))
+BATCH_TIMEOUT_SEC = float(os.environ.get("BATCH_TIMEOUT_SEC", str(6 * 3600)))
+BATCH_POLL_SEC = float(os.environ.get("BATCH_POLL_SEC", "5"))
+
+# 任务进度推送（SSE）：心跳间隔；跨进程 worker 的状态由共享监视器按此间隔从 DB 拉取
+TASK_EVENTS_KEEPALIVE_SEC = float(os.environ.get("TASK_EVENTS_KEEPALIVE_SEC", "15"))
+TASK_EVENTS_DB_POLL_SEC = float(os.environ.get("TASK_EVENTS_DB_POLL_SEC", "1"))
+
+# LLM 响应缓存：相同提示直接返回上次结果；超过保留时长未使用或总大小超限时按最久未使用淘汰
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_AGE_SEC = float(os.environ.get("LLM_CACHE_MAX_AGE_SEC", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# PDF 解析结果缓存：同一 PDF（内容相同）重复解读、生成播客、重建索引时不再调用 PyMuPDF；删除论文时失效
+PARSE_CACHE_ENABLED = os.environ.get("PARSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# 全文解读（map-reduce）：正文估算 token 不超过 INTERPRET_DIRECT_MAX_TOKENS 时单次调用；
+# 更长时按章节切成约 INTERPRET_CHUNK_TOKENS 的片段并发提炼要点（每篇同时 INTERPRET_MAP_CONCURRENCY 个，
+# 仍受 LLM_CONCURRENCY 限制），再汇总成报告。INTERPRET_TOKEN_BUDGET 为 map 阶段输入的总上限
+PDF_MAX_TEXT_CHARS = int(os.environ.get("PDF_MAX_TEXT_CHARS", "400000"))
+INTERPRET_DIRECT_MAX_TOKENS = int(os.environ.get("INTERPRET_DIRECT_MAX_TOKENS", "6000"))
+INTERPRET_CHUNK_TOKENS = int(os.environ.get("INTERPRET_CHUNK_TOKENS", "3000"))
+INTERPRET_TOKEN_BUDGET = int(os.environ.get("INTERPRET_TOKEN_BUDGET", "60000"))
+INTERPRET_MAP_CONCURRENCY = int(os.environ.get("INTERPRET_MAP_CONCURRENCY", "4"))
+INTERPRET_NOTE_MAX_TOKENS = int(os.environ.get("INTERPRET_NOTE_MAX_TOKENS", "600"))
+
+# LLM 客户端（每进程共享连接池）：每分钟请求数 / token 数上限（0 不限，按账号配额设置），
+# 瞬时错误（429、超时、连接失败、5xx）按带抖动的指数退避重试；遇到 429 时 LLM 并发减半，持续成功后逐步恢复到 LLM_CONCURRENCY
+LLM_RPM = int(os.environ.get("LLM_RPM", "0"))
+LLM_TPM = int(os.environ.get("LLM_TPM", "0"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SEC = float(os.environ.get("LLM_RETRY_BASE_SEC", "1"))
+LLM_RETRY_MAX_SEC = float(os.environ.get("LLM_RETRY_MAX_SEC", "30"))
+LLM_ADAPTIVE_CONCURRENCY = os.environ.get("LLM_ADAPTIVE_CONCURRENCY", "true").lower() in ("1", "true", "yes")
+LLM_HTTP_MAX_CONNECTIONS = int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "100"))
+
+# 外部资源并发预算（每进程）
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "4"))
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "2"))
+PDF_PARSE_CONCURRENCY = int(os.environ.get("PDF_PARSE_CONCURRENCY", "2"))
+
+# PDF 文本提取进程池：页数不少于 PDF_PARALLEL_MIN_PAGES 时按 PDF_PAGES_PER_TASK 页一段分给子进程并行提取
+# （绕开 PyMuPDF 持有的 GIL）；进程数 <=1 时在当前线程逐页提取
+PDF_PARSE_PROCESSES = int(os.environ.get("PDF_PARSE_PROCESSES", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "24"))
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "8"))
+
+# PDF 上传：按 UPLOAD_CHUNK_BYTES 分块写入临时文件并计算 SHA-256，超过 UPLOAD_MAX_BYTES 返回 413；内容相同的文件返回已有论文
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# 流水线埋点的费用估算单价（元 / 千 token、元 / 千字符），默认 0 表示不估算
+LLM_PRICE_PROMPT_PER_1K = float(os.environ.get("LLM_PRICE_PROMPT_PER_1K", "0"))
+LLM_PRICE_COMPLETION_PER_1K = float(os.environ.get("LLM_PRICE_COMPLETION_PER_1K", "0"))
+TTS_PRICE_PER_1K_CHARS = float(os.environ.get("TTS_PRICE_PER_1K_CHARS", "0"))
 
 # 每日采集默认
 DEFAULT_COLLECT_TIME = "00:00"
@@ -46,5 +162,8 @@ DEFAULT_ARXIV_CATEGORY = "physics.hist-ph"  # 物理史，近 24h
 
 def ensure_data_dirs() -> None:
     """确保 data 及子目录存在。"""
-    for d in (DATA_DIR, PAPERS_DIR, INTERPRETATIONS_DIR, PODCASTS_DIR, LOG_DIR):
+    for d in (
+        DATA_DIR, PAPERS_DIR, INTERPRETATIONS_DIR, PODCASTS_DIR, LOG_DIR,
+        ARTIFACTS_DIR, LLM_CACHE_DIR, PARSE_CACHE_DIR,
+    ):
         d.mkdir(parents=True, exist_ok=True)
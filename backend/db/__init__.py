@@ -1,9 +1,23 @@
-from .database import init_db, get_conn, get_db_path
+from .database import (
+    init_db,
+    connection,
+    close_pool,
+    async_connection,
+    close_async_pool,
+    get_conn,
+    get_db_path,
+)
 from . import models
+from . import async_models
 
 __all__ = [
     "init_db",
+    "connection",
+    "close_pool",
+    "async_connection",
+    "close_async_pool",
     "get_conn",
     "get_db_path",
     "models",
+    "async_models",
 ]
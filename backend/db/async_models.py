@@ -0,0 +1,210 @@
+"""models 的异步版本（aiosqlite），供 async 路由使用；SQL 与 models 保持一致。"""
+import json
+from typing import Any, Optional
+
+import aiosqlite
+
+from backend.db.models import (
+    _now,
+    paper_list_sql,
+    PAPER_COUNT_ESTIMATE_SQL,
+    PAPER_SEARCH_SQL,
+    PAPER_SEARCH_COUNT_SQL,
+)
+
+
+async def _fetchone(conn: aiosqlite.Connection, sql: str, params: tuple = ()) -> Optional[aiosqlite.Row]:
+    async with conn.execute(sql, params) as cur:
+        return await cur.fetchone()
+
+
+async def _fetchall(conn: aiosqlite.Connection, sql: str, params: tuple = ()) -> list[aiosqlite.Row]:
+    async with conn.execute(sql, params) as cur:
+        return list(await cur.fetchall())
+
+
+# ---------- Paper ----------
+async def paper_insert(
+    conn: aiosqlite.Connection,
+    paper_id: str,
+    source_type: str,
+    source_path_or_url: str,
+    title: str = "",
+    authors: str = "",
+    abstract: str = "",
+    arxiv_id: Optional[str] = None,
+    published_at: Optional[str] = None,
+    content_sha256: Optional[str] = None,
+) -> None:
+    now = _now()
+    await conn.execute(
+        """INSERT INTO papers (paper_id, source_type, source_path_or_url, title, authors, abstract, arxiv_id, published_at, content_sha256, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (paper_id, source_type, source_path_or_url, title, authors, abstract, arxiv_id or "", published_at or "", content_sha256, now, now),
+    )
+    await conn.commit()
+
+
+async def paper_update_by_arxiv_id(
+    conn: aiosqlite.Connection,
+    arxiv_id: str,
+    source_path_or_url: str,
+    title: str,
+    authors: str,
+    abstract: str,
+    published_at: Optional[str],
+) -> Optional[str]:
+    """更新已存在的 arXiv 论文记录，返回 paper_id。"""
+    now = _now()
+    cur = await conn.execute(
+        """UPDATE papers SET source_path_or_url=?, title=?, authors=?, abstract=?, published_at=?, updated_at=?
+           WHERE arxiv_id=?""",
+        (source_path_or_url, title, authors, abstract, published_at or "", now, arxiv_id),
+    )
+    await conn.commit()
+    if cur.rowcount:
+        row = await _fetchone(conn, "SELECT paper_id FROM papers WHERE arxiv_id=?", (arxiv_id,))
+        return row[0] if row else None
+    return None
+
+
+async def paper_get_by_id(conn: aiosqlite.Connection, paper_id: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(conn, "SELECT * FROM papers WHERE paper_id=?", (paper_id,))
+
+
+async def paper_get_by_arxiv_id(conn: aiosqlite.Connection, arxiv_id: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(conn, "SELECT * FROM papers WHERE arxiv_id=?", (arxiv_id,))
+
+
+async def paper_get_by_sha256(conn: aiosqlite.Connection, content_sha256: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(conn, "SELECT * FROM papers WHERE content_sha256=?", (content_sha256,))
+
+
+async def paper_list(
+    conn: aiosqlite.Connection,
+    limit: int = 50,
+    offset: int = 0,
+    cursor: Optional[tuple[str, str]] = None,
+) -> list[aiosqlite.Row]:
+    params = (*cursor, limit, offset) if cursor else (limit, offset)
+    return await _fetchall(conn, paper_list_sql(cursor), params)
+
+
+async def paper_count_estimate(conn: aiosqlite.Connection) -> int:
+    row = await _fetchone(conn, PAPER_COUNT_ESTIMATE_SQL)
+    return row[0]
+
+
+async def paper_search(conn: aiosqlite.Connection, match: str, limit: int = 20, offset: int = 0) -> list[aiosqlite.Row]:
+    return await _fetchall(conn, PAPER_SEARCH_SQL, (match, limit, offset))
+
+
+async def paper_search_count(conn: aiosqlite.Connection, match: str) -> int:
+    row = await _fetchone(conn, PAPER_SEARCH_COUNT_SQL, (match,))
+    return row[0]
+
+
+async def paper_delete(conn: aiosqlite.Connection, paper_id: str) -> None:
+    await conn.execute("DELETE FROM interpretations WHERE paper_id=?", (paper_id,))
+    await conn.execute("DELETE FROM podcasts WHERE paper_id=?", (paper_id,))
+    await conn.execute("DELETE FROM related_papers WHERE paper_id=?", (paper_id,))
+    await conn.execute("DELETE FROM papers WHERE paper_id=?", (paper_id,))
+    await conn.commit()
+
+
+# ---------- Interpretations ----------
+async def interpretation_upsert(conn: aiosqlite.Connection, paper_id: str, content_path: str) -> None:
+    now = _now()
+    await conn.execute("DELETE FROM interpretations WHERE paper_id=?", (paper_id,))
+    await conn.execute(
+        "INSERT INTO interpretations (paper_id, content_path, created_at) VALUES (?, ?, ?)",
+        (paper_id, content_path, now),
+    )
+    await conn.commit()
+
+
+async def interpretation_get(conn: aiosqlite.Connection, paper_id: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(conn, "SELECT * FROM interpretations WHERE paper_id=?", (paper_id,))
+
+
+# ---------- Tasks ----------
+async def task_insert(
+    conn: aiosqlite.Connection,
+    task_id: str,
+    task_type: str,
+    paper_id: Optional[str] = None,
+    payload: Optional[dict] = None,
+    max_attempts: int = 3,
+    priority: int = 0,
+    parent_id: Optional[str] = None,
+    timeout_sec: Optional[float] = None,
+) -> None:
+    now = _now()
+    await conn.execute(
+        """INSERT INTO tasks (task_id, type, status, result, error, paper_id, payload, max_attempts, priority,
+                              parent_id, timeout_sec, created_at, updated_at)
+           VALUES (?, ?, 'pending', NULL, NULL, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (task_id, task_type, paper_id, json.dumps(payload) if payload is not None else None, max_attempts, priority,
+         parent_id, timeout_sec, now, now),
+    )
+    await conn.commit()
+
+
+async def task_update(conn: aiosqlite.Connection, task_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+    now = _now()
+    result_json = json.dumps(result) if result is not None else None
+    await conn.execute(
+        "UPDATE tasks SET status=?, result=?, error=?, updated_at=? WHERE task_id=?",
+        (status, result_json, error, now, task_id),
+    )
+    await conn.commit()
+
+
+async def task_get(conn: aiosqlite.Connection, task_id: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(conn, "SELECT * FROM tasks WHERE task_id=?", (task_id,))
+
+
+async def task_get_active(conn: aiosqlite.Connection, task_type: str, paper_id: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(
+        conn,
+        "SELECT * FROM tasks WHERE type=? AND paper_id=? AND status IN ('pending', 'running')",
+        (task_type, paper_id),
+    )
+
+
+async def task_get_many(conn: aiosqlite.Connection, task_ids: list[str]) -> list[aiosqlite.Row]:
+    if not task_ids:
+        return []
+    marks = ",".join("?" * len(task_ids))
+    return await _fetchall(conn, f"SELECT * FROM tasks WHERE task_id IN ({marks})", tuple(task_ids))
+
+
+# ---------- Podcasts ----------
+async def podcast_upsert(conn: aiosqlite.Connection, paper_id: str, audio_path: str, duration_sec: Optional[float] = None) -> None:
+    now = _now()
+    await conn.execute("DELETE FROM podcasts WHERE paper_id=?", (paper_id,))
+    await conn.execute(
+        "INSERT INTO podcasts (paper_id, audio_path, duration_sec, created_at) VALUES (?, ?, ?, ?)",
+        (paper_id, audio_path, duration_sec, now),
+    )
+    await conn.commit()
+
+
+async def podcast_get(conn: aiosqlite.Connection, paper_id: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(conn, "SELECT * FROM podcasts WHERE paper_id=?", (paper_id,))
+
+
+# ---------- Related papers ----------
+async def related_get(conn: aiosqlite.Connection, paper_id: str) -> Optional[aiosqlite.Row]:
+    return await _fetchone(conn, "SELECT * FROM related_papers WHERE paper_id=?", (paper_id,))
+
+
+# ---------- Settings ----------
+async def setting_get(conn: aiosqlite.Connection, key: str) -> Optional[str]:
+    row = await _fetchone(conn, "SELECT value FROM settings WHERE key=?", (key,))
+    return row[0] if row else None
+
+
+async def setting_set(conn: aiosqlite.Connection, key: str, value: str) -> None:
+    await conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+    await conn.commit()
@@ -1,20 +1,299 @@
-"""数据库初始化与连接。"""
+"""数据库初始化与连接池。
+
+同步调用方通过 ``with connection() as conn:`` 借用连接：
+- 连接池有上限（DB_POOL_SIZE），借出期间连接与当前线程绑定，同一线程内嵌套借用复用同一连接；
+- 连接以 WAL 模式打开，并设置 synchronous / busy_timeout / cache_size / mmap_size 等 PRAGMA；
+- 正常退出时提交未完成事务，异常时回滚，再归还到池中。
+
+异步路由通过 ``async with async_connection() as conn:`` 借用 aiosqlite 连接（DB_ASYNC_POOL_SIZE），
+SQLite I/O 在 aiosqlite 的专用线程中执行，不占用 Starlette 线程池。
+"""
+import asyncio
+import queue
 import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+import aiosqlite
 
-from backend.config import DB_PATH
-from backend.db.models import create_tables, get_conn as _get_conn
+from backend.config import (
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_ASYNC_POOL_SIZE,
+    DB_POOL_TIMEOUT_SEC,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+)
+from backend.db.models import create_tables
 
 
 def get_db_path() -> Path:
     return DB_PATH
 
 
+def _pragmas() -> list[str]:
+    return [
+        "PRAGMA journal_mode=WAL",
+        # WAL 下 NORMAL 已保证崩溃一致性，仅掉电时可能丢失最近提交
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}",
+        # 负数表示 KiB
+        f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def _connect() -> sqlite3.Connection:
+    """新建一个已设置好 PRAGMA 的连接（允许跨线程归还，但同一时刻只由一个线程使用）。"""
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        str(DB_PATH),
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma in _pragmas():
+        conn.execute(pragma)
+    return conn
+
+
+async def _aconnect() -> aiosqlite.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = await aiosqlite.connect(str(DB_PATH), timeout=DB_BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = aiosqlite.Row
+    for pragma in _pragmas():
+        await conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """有界 SQLite 连接池：连接按需创建，最多 size 个；借出期间与借用线程绑定。"""
+
+    def __init__(self, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT_SEC):
+        self._size = max(1, size)
+        self._timeout = timeout
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("连接池已关闭")
+            if self._created < self._size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return _connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self._timeout)
+        except queue.Empty:
+            raise TimeoutError(f"等待数据库连接超时（{self._timeout}s，池大小 {self._size}）") from None
+
+    def _release(self, conn: sqlite3.Connection, ok: bool) -> None:
+        try:
+            if conn.in_transaction:
+                if ok:
+                    conn.commit()
+                else:
+                    conn.rollback()
+        except sqlite3.Error:
+            # 连接已不可用：丢弃并释放名额
+            try:
+                conn.close()
+            finally:
+                with self._lock:
+                    self._created -= 1
+            return
+        with self._lock:
+            closed = self._closed
+        if closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if held is not None:
+            # 同一线程嵌套借用：复用外层连接，由外层负责提交/归还
+            yield held
+            return
+        conn = self._acquire()
+        self._local.conn = conn
+        ok = False
+        try:
+            yield conn
+            ok = True
+        finally:
+            self._local.conn = None
+            self._release(conn, ok)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    """从全局连接池借用一个连接：``with connection() as conn: ...``。"""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def close_pool() -> None:
+    """关闭全局连接池（应用退出时调用）。"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+class AsyncConnectionPool:
+    """有界 aiosqlite 连接池；只在单个事件循环内使用。"""
+
+    def __init__(self, size: int = DB_ASYNC_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT_SEC):
+        self._size = max(1, size)
+        self._timeout = timeout
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._created = 0
+        self._closed = False
+
+    async def _acquire(self) -> aiosqlite.Connection:
+        if self._closed:
+            raise RuntimeError("连接池已关闭")
+        try:
+            return self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        if self._created < self._size:
+            self._created += 1
+            try:
+                return await _aconnect()
+            except Exception:
+                self._created -= 1
+                raise
+        try:
+            return await asyncio.wait_for(self._idle.get(), self._timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"等待数据库连接超时（{self._timeout}s，池大小 {self._size}）") from None
+
+    async def _release(self, conn: aiosqlite.Connection, ok: bool) -> None:
+        try:
+            if conn.in_transaction:
+                if ok:
+                    await conn.commit()
+                else:
+                    await conn.rollback()
+        except (sqlite3.Error, ValueError):
+            self._created -= 1
+            try:
+                await conn.close()
+            except Exception:
+                pass
+            return
+        if self._closed:
+            self._created -= 1
+            await conn.close()
+            return
+        self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosqlite.Connection]:
+        conn = await self._acquire()
+        ok = False
+        try:
+            yield conn
+            ok = True
+        finally:
+            await self._release(conn, ok)
+
+    async def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            self._created -= 1
+            await conn.close()
+
+
+_async_pool: Optional[AsyncConnectionPool] = None
+
+
+def get_async_pool() -> AsyncConnectionPool:
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = AsyncConnectionPool()
+    return _async_pool
+
+
+@asynccontextmanager
+async def async_connection() -> AsyncIterator[aiosqlite.Connection]:
+    """从全局异步连接池借用一个 aiosqlite 连接：``async with async_connection() as conn: ...``。"""
+    async with get_async_pool().connection() as conn:
+        yield conn
+
+
+async def close_async_pool() -> None:
+    """关闭全局异步连接池（应用退出时调用）。"""
+    global _async_pool
+    pool, _async_pool = _async_pool, None
+    if pool is not None:
+        await pool.close()
+
+
 def init_db() -> None:
     """确保数据目录存在并创建/迁移表。"""
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    create_tables()
+    with connection() as conn:
+        create_tables(conn)
 
 
 def get_conn() -> sqlite3.Connection:
-    return _get_conn()
+    """不经连接池的独立连接（一次性脚本用），调用方负责 close。"""
+    return _connect()
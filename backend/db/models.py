@@ -1,84 +1,177 @@
 """SQLite 表结构定义与建表。"""
+import base64
+import html
 import json
+import re
 import sqlite3
+import time
 from datetime import datetime
 from typing import Any, Optional
 
-from backend.config import DB_PATH
 
+def create_tables(conn: sqlite3.Connection) -> None:
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS papers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        paper_id TEXT NOT NULL UNIQUE,
+        source_type TEXT NOT NULL,
+        source_path_or_url TEXT NOT NULL,
+        title TEXT,
+        authors TEXT,
+        abstract TEXT,
+        arxiv_id TEXT,
+        published_at TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_papers_arxiv_id ON papers(arxiv_id);
+    -- 覆盖列表/热度投影的键集分页索引：(updated_at, paper_id) 有序，无需回表与排序
+    CREATE INDEX IF NOT EXISTS idx_papers_updated_list
+        ON papers(updated_at DESC, paper_id DESC, title, authors, arxiv_id, source_type, created_at);
+
+    CREATE TABLE IF NOT EXISTS interpretations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        paper_id TEXT NOT NULL,
+        content_path TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (paper_id) REFERENCES papers(paper_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT NOT NULL UNIQUE,
+        type TEXT NOT NULL,
+        status TEXT NOT NULL,
+        result TEXT,
+        error TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS podcasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        paper_id TEXT NOT NULL,
+        audio_path TEXT NOT NULL,
+        duration_sec REAL,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (paper_id) REFERENCES papers(paper_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS collect_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_at TEXT NOT NULL,
+        new_count INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS related_papers (
+        paper_id TEXT PRIMARY KEY,
+        items TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    );
+
+    -- 流水线埋点：每次任务执行中每个图节点一行（node='task' 为节点之外的计数）
+    CREATE TABLE IF NOT EXISTS task_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT NOT NULL,
+        task_type TEXT NOT NULL,
+        attempt INTEGER NOT NULL DEFAULT 1,
+        node TEXT NOT NULL,
+        wall_ms REAL NOT NULL DEFAULT 0,
+        llm_calls INTEGER NOT NULL DEFAULT 0,
+        prompt_tokens INTEGER NOT NULL DEFAULT 0,
+        completion_tokens INTEGER NOT NULL DEFAULT 0,
+        tts_chars INTEGER NOT NULL DEFAULT 0,
+        bytes_downloaded INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_task_metrics_task ON task_metrics(task_id);
+    CREATE INDEX IF NOT EXISTS idx_task_metrics_created ON task_metrics(created_at);
+    """)
+    _migrate_papers(conn)
+    _migrate_tasks(conn)
+    _create_fts(conn)
+    conn.commit()
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    return conn
 
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: dict[str, str]) -> None:
+    existing = {r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    for name, decl in columns.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
 
-def create_tables(conn: Optional[sqlite3.Connection] = None) -> None:
-    close = False
-    if conn is None:
-        conn = get_conn()
-        close = True
-    try:
-        conn.executescript("""
-        CREATE TABLE IF NOT EXISTS papers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            paper_id TEXT NOT NULL UNIQUE,
-            source_type TEXT NOT NULL,
-            source_path_or_url TEXT NOT NULL,
-            title TEXT,
-            authors TEXT,
-            abstract TEXT,
-            arxiv_id TEXT,
-            published_at TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
-        );
-        CREATE INDEX IF NOT EXISTS idx_papers_arxiv_id ON papers(arxiv_id);
-
-        CREATE TABLE IF NOT EXISTS interpretations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            paper_id TEXT NOT NULL,
-            content_path TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY (paper_id) REFERENCES papers(paper_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id TEXT NOT NULL UNIQUE,
-            type TEXT NOT NULL,
-            status TEXT NOT NULL,
-            result TEXT,
-            error TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS podcasts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            paper_id TEXT NOT NULL,
-            audio_path TEXT NOT NULL,
-            duration_sec REAL,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY (paper_id) REFERENCES papers(paper_id)
-        );
-
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS collect_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            run_at TEXT NOT NULL,
-            new_count INTEGER NOT NULL,
-            created_at TEXT NOT NULL
-        );
-        """)
-        conn.commit()
-    finally:
-        if close:
-            conn.close()
+
+def _migrate_papers(conn: sqlite3.Connection) -> None:
+    """content_sha256：上传 PDF 的内容哈希，相同内容重复上传时返回已有论文。"""
+    _add_missing_columns(conn, "papers", {"content_sha256": "TEXT"})
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_sha256 ON papers(content_sha256) WHERE content_sha256 IS NOT NULL"
+    )
+
+
+def _migrate_tasks(conn: sqlite3.Connection) -> None:
+    """tasks 表作为持久化任务队列：payload 为任务参数，worker_id/lease_expires_at 为租约。"""
+    _add_missing_columns(conn, "tasks", {
+        "paper_id": "TEXT",
+        "payload": "TEXT",
+        "attempts": "INTEGER NOT NULL DEFAULT 0",
+        "max_attempts": "INTEGER NOT NULL DEFAULT 3",
+        "worker_id": "TEXT",
+        "lease_expires_at": "REAL",
+        "started_at": "TEXT",
+        "priority": "INTEGER NOT NULL DEFAULT 0",
+        "progress": "TEXT",
+        "deadline_at": "REAL",
+        "cancel_requested": "INTEGER NOT NULL DEFAULT 0",
+        "parent_id": "TEXT",
+        "timeout_sec": "REAL",
+        "run_after": "REAL",
+        "state": "TEXT",
+    })
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_status")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, priority DESC, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_id) WHERE parent_id IS NOT NULL")
+    # 同一论文同一类型最多一个进行中的任务（单飞），重复提交由 task_insert 的调用方合并
+    conn.execute(
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_active_paper ON tasks(type, paper_id)
+           WHERE status IN ('pending', 'running') AND paper_id IS NOT NULL"""
+    )
+
+
+def _create_fts(conn: sqlite3.Connection) -> None:
+    """全文索引 papers_fts：rowid 与 papers.id 一致；title/abstract 由触发器同步，body 为可选的解析正文。"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='papers_fts'"
+    ).fetchone()
+    conn.executescript("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+        title, abstract, body,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS papers_fts_ai AFTER INSERT ON papers BEGIN
+        INSERT INTO papers_fts (rowid, title, abstract, body) VALUES (new.id, new.title, new.abstract, '');
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS papers_fts_au AFTER UPDATE OF title, abstract ON papers BEGIN
+        UPDATE papers_fts SET title = new.title, abstract = new.abstract WHERE rowid = new.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS papers_fts_ad AFTER DELETE ON papers BEGIN
+        DELETE FROM papers_fts WHERE rowid = old.id;
+    END;
+    """)
+    if not exists:
+        # 首次建索引：回填已有论文
+        conn.execute(
+            "INSERT INTO papers_fts (rowid, title, abstract, body) SELECT id, title, abstract, '' FROM papers"
+        )
 
 
 def _now() -> str:
@@ -96,12 +189,13 @@ def paper_insert(
     abstract: str = "",
     arxiv_id: Optional[str] = None,
     published_at: Optional[str] = None,
+    content_sha256: Optional[str] = None,
 ) -> None:
     now = _now()
     conn.execute(
-        """INSERT INTO papers (paper_id, source_type, source_path_or_url, title, authors, abstract, arxiv_id, published_at, created_at, updated_at)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-        (paper_id, source_type, source_path_or_url, title, authors, abstract, arxiv_id or "", published_at or "", now, now),
+        """INSERT INTO papers (paper_id, source_type, source_path_or_url, title, authors, abstract, arxiv_id, published_at, content_sha256, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (paper_id, source_type, source_path_or_url, title, authors, abstract, arxiv_id or "", published_at or "", content_sha256, now, now),
     )
     conn.commit()
 
@@ -137,20 +231,149 @@ def paper_get_by_arxiv_id(conn: sqlite3.Connection, arxiv_id: str) -> Optional[s
     return conn.execute("SELECT * FROM papers WHERE arxiv_id=?", (arxiv_id,)).fetchone()
 
 
+def paper_get_by_sha256(conn: sqlite3.Connection, content_sha256: str) -> Optional[sqlite3.Row]:
+    return conn.execute("SELECT * FROM papers WHERE content_sha256=?", (content_sha256,)).fetchone()
+
+
+# 列表投影，与 idx_papers_updated_list 的列一致
+PAPER_LIST_COLUMNS = "paper_id, title, authors, arxiv_id, source_type, created_at, updated_at"
+
+
+def paper_cursor_encode(updated_at: str, paper_id: str) -> str:
+    """列表游标：对 (updated_at, paper_id) 做 base64url 编码，对客户端不透明。"""
+    raw = json.dumps([updated_at, paper_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def paper_cursor_decode(cursor: str) -> tuple[str, str]:
+    """解析列表游标，非法时抛 ValueError。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, paper_id = json.loads(raw)
+    except Exception:
+        raise ValueError("非法的 cursor") from None
+    if not isinstance(updated_at, str) or not isinstance(paper_id, str):
+        raise ValueError("非法的 cursor")
+    return updated_at, paper_id
+
+
+def paper_list_sql(cursor: Optional[tuple[str, str]]) -> str:
+    """cursor 为 None 时取第一页；否则取严格位于 cursor 之后的一页（键集分页）。"""
+    where = "WHERE (updated_at, paper_id) < (?, ?) " if cursor else ""
+    return (
+        f"SELECT {PAPER_LIST_COLUMNS} FROM papers {where}"
+        "ORDER BY updated_at DESC, paper_id DESC LIMIT ? OFFSET ?"
+    )
+
+
 def paper_list(
     conn: sqlite3.Connection,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[tuple[str, str]] = None,
 ) -> list[sqlite3.Row]:
-    return conn.execute(
-        "SELECT * FROM papers ORDER BY updated_at DESC LIMIT ? OFFSET ?",
-        (limit, offset),
-    ).fetchall()
+    """按 updated_at 降序列出论文。传 cursor 时走键集分页（offset 应为 0），否则兼容 OFFSET 分页。"""
+    params = (*cursor, limit, offset) if cursor else (limit, offset)
+    return conn.execute(paper_list_sql(cursor), params).fetchall()
+
+
+def paper_select_ids(
+    conn: sqlite3.Connection,
+    paper_ids: Optional[list[str]] = None,
+    since: Optional[str] = None,
+    uninterpreted: bool = False,
+    limit: int = 100,
+) -> list[str]:
+    """按条件筛选论文 ID（批量任务用）：指定 ID 列表 / 入库时间不早于 since / 尚无解读；按入库时间先后返回。"""
+    where, params = [], []
+    if paper_ids is not None:
+        if not paper_ids:
+            return []
+        where.append(f"p.paper_id IN ({','.join('?' * len(paper_ids))})")
+        params.extend(paper_ids)
+    if since:
+        where.append("p.created_at >= ?")
+        params.append(since)
+    if uninterpreted:
+        where.append("NOT EXISTS (SELECT 1 FROM interpretations i WHERE i.paper_id = p.paper_id)")
+    sql = "SELECT p.paper_id FROM papers p"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY p.created_at, p.id LIMIT ?"
+    params.append(limit)
+    return [r[0] for r in conn.execute(sql, params).fetchall()]
+
+
+# 论文总数估计：自增主键的最大值，走主键 B 树只读一页，删除过的论文会使其偏大
+PAPER_COUNT_ESTIMATE_SQL = "SELECT COALESCE(MAX(id), 0) FROM papers"
+
+
+def paper_count_estimate(conn: sqlite3.Connection) -> int:
+    return conn.execute(PAPER_COUNT_ESTIMATE_SQL).fetchone()[0]
+
+
+def paper_fts_set_body(conn: sqlite3.Connection, paper_id: str, body: str) -> None:
+    """写入解析正文到全文索引（title/abstract 由触发器维护）。"""
+    conn.execute(
+        "UPDATE papers_fts SET body=? WHERE rowid=(SELECT id FROM papers WHERE paper_id=?)",
+        (body, paper_id),
+    )
+    conn.commit()
+
+
+_FTS_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str) -> str:
+    """把用户输入转为安全的 FTS5 MATCH 表达式：各词加引号后取交集，最后一个词做前缀匹配。"""
+    tokens = _FTS_TOKEN_RE.findall(text or "")
+    if not tokens:
+        return ""
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+# 高亮边界用私有区字符标记，由 fts_highlight_html 转义原文后再换成 <mark>
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
+
+
+def fts_highlight_html(text: Optional[str]) -> str:
+    """highlight/snippet 结果转为 HTML：原文（标题、PDF 正文均不可信）先转义，只保留 <mark> 标签。"""
+    if not text:
+        return ""
+    return html.escape(text).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+# bm25 列权重：title > abstract > body
+PAPER_SEARCH_SQL = f"""
+    SELECT {", ".join("p." + c.strip() for c in PAPER_LIST_COLUMNS.split(","))},
+           highlight(papers_fts, 0, '{_MARK_OPEN}', '{_MARK_CLOSE}') AS title_highlight,
+           snippet(papers_fts, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', 24) AS snippet,
+           bm25(papers_fts, 10.0, 4.0, 1.0) AS score
+    FROM papers_fts
+    JOIN papers p ON p.id = papers_fts.rowid
+    WHERE papers_fts MATCH ?
+    ORDER BY score
+    LIMIT ? OFFSET ?
+"""
+
+PAPER_SEARCH_COUNT_SQL = "SELECT COUNT(*) FROM papers_fts WHERE papers_fts MATCH ?"
+
+
+def paper_search(conn: sqlite3.Connection, match: str, limit: int = 20, offset: int = 0) -> list[sqlite3.Row]:
+    """全文检索，match 需经 fts_query 处理；按 BM25 升序（越小越相关）。"""
+    return conn.execute(PAPER_SEARCH_SQL, (match, limit, offset)).fetchall()
+
+
+def paper_search_count(conn: sqlite3.Connection, match: str) -> int:
+    return conn.execute(PAPER_SEARCH_COUNT_SQL, (match,)).fetchone()[0]
 
 
 def paper_delete(conn: sqlite3.Connection, paper_id: str) -> None:
     conn.execute("DELETE FROM interpretations WHERE paper_id=?", (paper_id,))
     conn.execute("DELETE FROM podcasts WHERE paper_id=?", (paper_id,))
+    conn.execute("DELETE FROM related_papers WHERE paper_id=?", (paper_id,))
     conn.execute("DELETE FROM papers WHERE paper_id=?", (paper_id,))
     conn.commit()
 
@@ -171,11 +394,25 @@ def interpretation_get(conn: sqlite3.Connection, paper_id: str) -> Optional[sqli
 
 
 # ---------- Tasks ----------
-def task_insert(conn: sqlite3.Connection, task_id: str, task_type: str) -> None:
+def task_insert(
+    conn: sqlite3.Connection,
+    task_id: str,
+    task_type: str,
+    paper_id: Optional[str] = None,
+    payload: Optional[dict] = None,
+    max_attempts: int = 3,
+    priority: int = 0,
+    parent_id: Optional[str] = None,
+    timeout_sec: Optional[float] = None,
+) -> None:
+    """parent_id 为所属批量任务；timeout_sec 为空时使用 worker 的默认截止时间。"""
     now = _now()
     conn.execute(
-        "INSERT INTO tasks (task_id, type, status, result, error, created_at, updated_at) VALUES (?, ?, 'pending', NULL, NULL, ?, ?)",
-        (task_id, task_type, now, now),
+        """INSERT INTO tasks (task_id, type, status, result, error, paper_id, payload, max_attempts, priority,
+                              parent_id, timeout_sec, created_at, updated_at)
+           VALUES (?, ?, 'pending', NULL, NULL, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (task_id, task_type, paper_id, json.dumps(payload) if payload is not None else None, max_attempts, priority,
+         parent_id, timeout_sec, now, now),
     )
     conn.commit()
 
@@ -195,6 +432,210 @@ def task_get(conn: sqlite3.Connection, task_id: str) -> Optional[sqlite3.Row]:
     return row
 
 
+def task_get_active(conn: sqlite3.Connection, task_type: str, paper_id: str) -> Optional[sqlite3.Row]:
+    """该论文同类型的 pending/running 任务（至多一个）。"""
+    return conn.execute(
+        "SELECT * FROM tasks WHERE type=? AND paper_id=? AND status IN ('pending', 'running')",
+        (task_type, paper_id),
+    ).fetchone()
+
+
+def task_count_pending(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(*) FROM tasks WHERE status='pending'").fetchone()[0]
+
+
+def task_counts(conn: sqlite3.Connection) -> list[sqlite3.Row]:
+    """按 (type, status) 统计进行中的任务数。"""
+    return conn.execute(
+        """SELECT type, status, COUNT(*) AS n FROM tasks
+           WHERE status IN ('pending', 'running') GROUP BY type, status"""
+    ).fetchall()
+
+
+def task_claim(
+    conn: sqlite3.Connection,
+    worker_id: str,
+    lease_sec: float,
+    timeout_sec: float,
+) -> Optional[sqlite3.Row]:
+    """原子地领取优先级最高、最早入队的一个 pending 任务并加租约，无任务时返回 None。
+    deadline_at 为本次执行的截止时间（每次领取重新计算，任务自带 timeout_sec 时优先）；
+    task_defer 放回的任务未到 run_after 不领取，再次领取时沿用原截止时间。"""
+    now = _now()
+    ts = time.time()
+    row = conn.execute(
+        """UPDATE tasks
+           SET status='running', worker_id=?, lease_expires_at=?,
+               deadline_at=CASE WHEN run_after IS NOT NULL AND deadline_at IS NOT NULL THEN deadline_at
+                                ELSE ? + COALESCE(timeout_sec, ?) END,
+               attempts=attempts+1, run_after=NULL,
+               started_at=COALESCE(started_at, ?), updated_at=?
+           WHERE id = (SELECT id FROM tasks WHERE status='pending' AND (run_after IS NULL OR run_after <= ?)
+                       ORDER BY priority DESC, id LIMIT 1)
+             AND status='pending'
+           RETURNING *""",
+        (worker_id, ts + lease_sec, ts, timeout_sec, now, now, ts),
+    ).fetchone()
+    conn.commit()
+    return row
+
+
+def task_heartbeat(conn: sqlite3.Connection, task_id: str, worker_id: str, lease_sec: float) -> bool:
+    """续租；返回 False 表示租约已丢失（任务已被回收或完成）。"""
+    cur = conn.execute(
+        "UPDATE tasks SET lease_expires_at=? WHERE task_id=? AND worker_id=? AND status='running'",
+        (time.time() + lease_sec, task_id, worker_id),
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def task_complete(
+    conn: sqlite3.Connection,
+    task_id: str,
+    worker_id: str,
+    status: str,
+    result: Any = None,
+    error: Optional[str] = None,
+) -> bool:
+    """持有租约的 worker 写入终态；租约已丢失时不覆盖，返回 False。"""
+    now = _now()
+    result_json = json.dumps(result) if result is not None else None
+    cur = conn.execute(
+        """UPDATE tasks SET status=?, result=?, error=?, lease_expires_at=NULL, updated_at=?
+           WHERE task_id=? AND worker_id=? AND status='running'""",
+        (status, result_json, error, now, task_id, worker_id),
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def task_release(conn: sqlite3.Connection, task_id: str, worker_id: str) -> None:
+    """worker 退出时把未完成的任务放回队列（不计入失败）。"""
+    conn.execute(
+        """UPDATE tasks SET status='pending', worker_id=NULL, lease_expires_at=NULL,
+               attempts=MAX(attempts-1, 0), updated_at=?
+           WHERE task_id=? AND worker_id=? AND status='running'""",
+        (_now(), task_id, worker_id),
+    )
+    conn.commit()
+
+
+def task_defer(
+    conn: sqlite3.Connection,
+    task_id: str,
+    worker_id: str,
+    run_after: float,
+    state: Optional[dict] = None,
+) -> bool:
+    """处理函数交还 worker：放回 pending，run_after 之前不再领取，不计入重试次数；state 供下次执行读取。
+    执行期间已被 task_wake 唤醒时保留更早的唤醒时间。"""
+    cur = conn.execute(
+        """UPDATE tasks SET status='pending', worker_id=NULL, lease_expires_at=NULL,
+               run_after=MIN(COALESCE(run_after, ?), ?), state=?,
+               attempts=MAX(attempts-1, 0), updated_at=?
+           WHERE task_id=? AND worker_id=? AND status='running'""",
+        (run_after, run_after, json.dumps(state, ensure_ascii=False) if state is not None else None, _now(), task_id, worker_id),
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def task_wake(conn: sqlite3.Connection, task_id: str) -> bool:
+    """让等待中的 task_defer 任务立即可被领取（如子任务结束时唤醒父任务）。
+    任务正在执行时记下唤醒时间，随后的 task_defer 据此立即放回，避免唤醒丢失。"""
+    ts = time.time()
+    cur = conn.execute(
+        """UPDATE tasks SET run_after=?
+           WHERE task_id=? AND ((status='pending' AND run_after > ?) OR (status='running' AND run_after IS NULL))""",
+        (ts, task_id, ts),
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def task_recover_expired(conn: sqlite3.Connection) -> dict[str, int]:
+    """回收卡住的 running 任务，返回各类处理数：
+    - timeout：超过 deadline_at（worker 可能卡在外部调用上），不再重试；
+    - cancelled：已请求取消且租约过期；
+    - failed：租约过期且重试次数用尽；无 payload 的旧任务（队列化之前创建）无法重放，也直接标记失败；
+    - requeued：其余租约过期的任务放回 pending。"""
+    now = _now()
+    ts = time.time()
+    timed_out = conn.execute(
+        """UPDATE tasks SET status='timeout', error=COALESCE(error, '任务超时'), lease_expires_at=NULL, updated_at=?
+           WHERE status='running' AND deadline_at < ?""",
+        (now, ts),
+    ).rowcount
+    cancelled = conn.execute(
+        """UPDATE tasks SET status='cancelled', error=COALESCE(error, '任务已取消'), lease_expires_at=NULL, updated_at=?
+           WHERE status='running' AND cancel_requested=1 AND (lease_expires_at IS NULL OR lease_expires_at < ?)""",
+        (now, ts),
+    ).rowcount
+    failed = conn.execute(
+        """UPDATE tasks SET status='failed', error=COALESCE(error, '任务中断且无法恢复'),
+               lease_expires_at=NULL, updated_at=?
+           WHERE (status='running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                  AND (payload IS NULL OR attempts >= max_attempts))
+              OR (status='pending' AND payload IS NULL)""",
+        (now, ts),
+    ).rowcount
+    requeued = conn.execute(
+        """UPDATE tasks SET status='pending', worker_id=NULL, lease_expires_at=NULL, updated_at=?
+           WHERE status='running' AND lease_expires_at < ?""",
+        (now, ts),
+    ).rowcount
+    conn.commit()
+    return {"requeued": requeued, "failed": failed, "timeout": timed_out, "cancelled": cancelled}
+
+
+def task_request_cancel(conn: sqlite3.Connection, task_id: str) -> Optional[sqlite3.Row]:
+    """请求取消：pending 任务直接置为 cancelled；running 任务标记 cancel_requested，
+    由执行它的 worker 在下一个检查点退出。终态任务不变。返回更新后的行，不存在时 None。"""
+    now = _now()
+    conn.execute(
+        "UPDATE tasks SET status='cancelled', error='任务已取消', updated_at=? WHERE task_id=? AND status='pending'",
+        (now, task_id),
+    )
+    conn.execute(
+        "UPDATE tasks SET cancel_requested=1, updated_at=? WHERE task_id=? AND status='running'",
+        (now, task_id),
+    )
+    conn.commit()
+    return task_get(conn, task_id)
+
+
+def task_cancel_requested(conn: sqlite3.Connection, task_ids: list[str]) -> set[str]:
+    """task_ids 中已请求取消的 running 任务。"""
+    if not task_ids:
+        return set()
+    marks = ",".join("?" * len(task_ids))
+    rows = conn.execute(
+        f"SELECT task_id FROM tasks WHERE task_id IN ({marks}) AND status='running' AND cancel_requested=1",
+        tuple(task_ids),
+    ).fetchall()
+    return {r[0] for r in rows}
+
+
+def task_get_many(conn: sqlite3.Connection, task_ids: list[str]) -> list[sqlite3.Row]:
+    if not task_ids:
+        return []
+    marks = ",".join("?" * len(task_ids))
+    return conn.execute(f"SELECT * FROM tasks WHERE task_id IN ({marks})", tuple(task_ids)).fetchall()
+
+
+def task_list_children(conn: sqlite3.Connection, parent_id: str) -> list[sqlite3.Row]:
+    return conn.execute("SELECT * FROM tasks WHERE parent_id=? ORDER BY id", (parent_id,)).fetchall()
+
+
+def task_set_progress(conn: sqlite3.Connection, task_id: str, progress: dict) -> None:
+    conn.execute(
+        "UPDATE tasks SET progress=?, updated_at=? WHERE task_id=? AND status='running'",
+        (json.dumps(progress, ensure_ascii=False), _now(), task_id),
+    )
+    conn.commit()
+
+
 def task_result_parse(row: sqlite3.Row) -> Optional[dict]:
     if row is None or row["result"] is None:
         return None
@@ -204,6 +645,38 @@ def task_result_parse(row: sqlite3.Row) -> Optional[dict]:
         return None
 
 
+def task_state_parse(row: sqlite3.Row) -> dict:
+    """task_defer 保存的处理函数内部状态，没有时为空 dict。"""
+    if row is None or not row["state"]:
+        return {}
+    try:
+        return json.loads(row["state"])
+    except ValueError:
+        return {}
+
+
+# 终态：不会再变化，SSE 推送到此结束
+TASK_TERMINAL_STATUSES = ("success", "failed", "cancelled", "timeout")
+
+
+def task_public(row) -> dict:
+    """对外暴露的任务快照（GET /api/tasks/{id} 与 SSE 事件共用）。
+    task_defer 放回、等待下一步的任务仍在进行中，对外显示为 running。"""
+    progress = None
+    if row["progress"]:
+        try:
+            progress = json.loads(row["progress"])
+        except ValueError:
+            progress = None
+    return {
+        "task_id": row["task_id"],
+        "status": "running" if row["status"] == "pending" and row["run_after"] is not None else row["status"],
+        "progress": progress,
+        "result": task_result_parse(row),
+        "error": row["error"],
+    }
+
+
 # ---------- Podcasts ----------
 def podcast_upsert(conn: sqlite3.Connection, paper_id: str, audio_path: str, duration_sec: Optional[float] = None) -> None:
     now = _now()
@@ -219,6 +692,50 @@ def podcast_get(conn: sqlite3.Connection, paper_id: str) -> Optional[sqlite3.Row
     return conn.execute("SELECT * FROM podcasts WHERE paper_id=?", (paper_id,)).fetchone()
 
 
+# ---------- Related papers（检索结果缓存）----------
+def related_upsert(conn: sqlite3.Connection, paper_id: str, items: list) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO related_papers (paper_id, items, created_at) VALUES (?, ?, ?)",
+        (paper_id, json.dumps(items, ensure_ascii=False), _now()),
+    )
+    conn.commit()
+
+
+def related_get(conn: sqlite3.Connection, paper_id: str) -> Optional[sqlite3.Row]:
+    return conn.execute("SELECT * FROM related_papers WHERE paper_id=?", (paper_id,)).fetchone()
+
+
+# ---------- Task metrics（流水线埋点）----------
+def task_metrics_insert(conn: sqlite3.Connection, task_id: str, task_type: str, attempt: int, records: list[dict]) -> None:
+    if not records:
+        return
+    now = _now()
+    conn.executemany(
+        """INSERT INTO task_metrics (task_id, task_type, attempt, node, wall_ms, llm_calls, prompt_tokens,
+               completion_tokens, tts_chars, bytes_downloaded, error, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (task_id, task_type, attempt, r["node"], r["wall_ms"], r["llm_calls"], r["prompt_tokens"],
+             r["completion_tokens"], r["tts_chars"], r["bytes_downloaded"], r["error"], now)
+            for r in records
+        ],
+    )
+    conn.commit()
+
+
+def task_metrics_list(conn: sqlite3.Connection, task_id: str) -> list[sqlite3.Row]:
+    return conn.execute("SELECT * FROM task_metrics WHERE task_id=? ORDER BY id", (task_id,)).fetchall()
+
+
+def task_metrics_since(conn: sqlite3.Connection, since: str, task_type: Optional[str] = None) -> list[sqlite3.Row]:
+    """since 之后的全部节点记录（供按节点汇总分位数）。"""
+    if task_type:
+        return conn.execute(
+            "SELECT * FROM task_metrics WHERE created_at >= ? AND task_type=? ORDER BY id", (since, task_type)
+        ).fetchall()
+    return conn.execute("SELECT * FROM task_metrics WHERE created_at >= ? ORDER BY id", (since,)).fetchall()
+
+
 # ---------- Settings ----------
 def setting_get(conn: sqlite3.Connection, key: str) -> Optional[str]:
     row = conn.execute("SELECT value FROM settings WHERE key=?", (key,)).fetchone()
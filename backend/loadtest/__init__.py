@@ -0,0 +1 @@
+"""压测工具：本地模拟上游服务（fake_upstream）与 API 压测驱动（driver），不消耗真实 API 配额。"""
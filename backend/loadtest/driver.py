@@ -0,0 +1,256 @@
+"""API 压测驱动：准备一批论文后，由若干并发虚拟用户按比例调用解读、播客、相关论文与任务查询接口。
+
+    python -m backend.loadtest.driver --base-url http://127.0.0.1:18527 --papers 20 --users 20 --duration 120
+
+- interpret / podcast：POST 入队后轮询 GET /api/tasks/{id} 直到结束，分别统计入队请求延迟与任务端到端耗时；
+  播客只对已完成解读的论文发起（否则改为解读）；
+- related：GET /api/papers/{id}/related，--related-refresh 比例的请求带 refresh=true，绕过缓存走 arXiv 检索；
+- tasks：GET /api/tasks/stats 与最近一个任务的 GET /api/tasks/{id}。
+结束后输出各接口与各类任务的 p50/p95/p99、错误数、每分钟完成任务数，以及服务端 /api/tasks/stats 中的 LLM 客户端统计。
+论文默认由本地生成的多页 PDF 上传；--source arxiv 时经 POST /from-arxiv 导入（需后端指向 fake_upstream）。
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from backend.loadtest.fake_upstream import synthetic_pdf
+
+_TERMINAL = ("success", "failed", "cancelled", "timeout")
+
+
+@dataclass
+class Samples:
+    latencies: list[float] = field(default_factory=list)
+    errors: dict[str, int] = field(default_factory=dict)
+
+    def ok(self, sec: float) -> None:
+        self.latencies.append(sec)
+
+    def fail(self, reason: str) -> None:
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def summary(self) -> dict:
+        values = sorted(self.latencies)
+
+        def pct(q: float) -> Optional[float]:
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+
+        return {
+            "ok": len(values),
+            "errors": dict(self.errors),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+        }
+
+
+class Report:
+    def __init__(self):
+        self.requests: dict[str, Samples] = {}
+        self.jobs: dict[str, Samples] = {}
+        self.skipped = 0
+
+    def request(self, name: str) -> Samples:
+        return self.requests.setdefault(name, Samples())
+
+    def job(self, name: str) -> Samples:
+        return self.jobs.setdefault(name, Samples())
+
+
+def _sample_pdf(i: int, pages: int) -> bytes:
+    """与 fake_upstream 的假论文同构：编号章节的多页 PDF，每篇内容不同以免命中缓存。"""
+    return synthetic_pdf(f"load-{i}-{random.getrandbits(32):x}", pages)
+
+
+async def _timed(report: Report, name: str, coro) -> Optional[httpx.Response]:
+    t0 = time.perf_counter()
+    try:
+        resp = await coro
+    except httpx.HTTPError as e:
+        report.request(name).fail(type(e).__name__)
+        return None
+    if resp.status_code >= 400:
+        report.request(name).fail(str(resp.status_code))
+        return resp
+    report.request(name).ok(time.perf_counter() - t0)
+    return resp
+
+
+async def _prepare(client: httpx.AsyncClient, args: argparse.Namespace, report: Report) -> list[str]:
+    paper_ids: list[str] = []
+    for i in range(args.papers):
+        if args.source == "arxiv":
+            arxiv_id = f"{2600 + i // 10000}.{i % 10000:05d}"
+            resp = await _timed(report, "from_arxiv", client.post("/api/papers/from-arxiv", json={"arxiv_id": arxiv_id}))
+        else:
+            pdf = await asyncio.to_thread(_sample_pdf, i, args.pdf_pages)
+            resp = await _timed(
+                report, "upload",
+                client.post("/api/papers/upload", files={"file": (f"load-{i}.pdf", pdf, "application/pdf")}),
+            )
+        if resp is not None and resp.status_code < 400:
+            paper_ids.append(resp.json()["paper_id"])
+    return paper_ids
+
+
+async def _wait_task(client: httpx.AsyncClient, task_id: str, poll_sec: float, timeout_sec: float) -> str:
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll_sec)
+        try:
+            resp = await client.get(f"/api/tasks/{task_id}")
+        except httpx.HTTPError:
+            continue
+        if resp.status_code == 200 and resp.json()["status"] in _TERMINAL:
+            return resp.json()["status"]
+    return "driver_timeout"
+
+
+class User:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace, report: Report, papers: list[str], state: dict):
+        self.client = client
+        self.args = args
+        self.report = report
+        self.papers = papers
+        self.state = state  # 各用户共享：interpreted（已解读的论文）、last_task
+
+    async def _job(self, kind: str, paper_id: str) -> None:
+        params = {"no_cache": "true"} if self.args.no_cache else {}
+        t0 = time.perf_counter()
+        resp = await _timed(self.report, kind, self.client.post(f"/api/papers/{paper_id}/{kind}", params=params))
+        if resp is None or resp.status_code >= 400:
+            return
+        task_id = resp.json().get("task_id")
+        if not task_id:
+            self.report.skipped += 1  # 已存在的结果，未入队
+            return
+        self.state["last_task"] = task_id
+        status = await _wait_task(self.client, task_id, self.args.poll_sec, self.args.job_timeout)
+        if status == "success":
+            self.report.job(kind).ok(time.perf_counter() - t0)
+            if kind == "interpret":
+                self.state["interpreted"].add(paper_id)
+        else:
+            self.report.job(kind).fail(status)
+
+    async def _related(self, paper_id: str) -> None:
+        params = {"refresh": "true"} if random.random() < self.args.related_refresh else {}
+        await _timed(self.report, "related", self.client.get(f"/api/papers/{paper_id}/related", params=params))
+
+    async def _tasks(self) -> None:
+        await _timed(self.report, "tasks_stats", self.client.get("/api/tasks/stats"))
+        if self.state.get("last_task"):
+            await _timed(self.report, "task_get", self.client.get(f"/api/tasks/{self.state['last_task']}"))
+
+    async def run(self, until: float, mix: list[tuple[str, float]]) -> None:
+        names = [m[0] for m in mix]
+        weights = [m[1] for m in mix]
+        while time.monotonic() < until:
+            op = random.choices(names, weights)[0]
+            paper_id = random.choice(self.papers)
+            if op == "podcast":
+                done = list(self.state["interpreted"])
+                if done:
+                    await self._job("podcast", random.choice(done))
+                else:
+                    await self._job("interpret", paper_id)
+            elif op == "interpret":
+                await self._job("interpret", paper_id)
+            elif op == "related":
+                await self._related(paper_id)
+            else:
+                await self._tasks()
+            if self.args.think_sec:
+                await asyncio.sleep(random.uniform(0, 2 * self.args.think_sec))
+
+
+def _parse_mix(text: str) -> list[tuple[str, float]]:
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("interpret", "podcast", "related", "tasks"):
+            raise SystemExit(f"未知操作: {name}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def _print(result: dict) -> None:
+    print(f"\n持续 {result['duration_sec']}s，论文 {result['papers']} 篇，并发用户 {result['users']}")
+    print(f"完成任务 {result['jobs_completed']} 个，{result['jobs_per_min']} 个/分钟（跳过已存在结果 {result['skipped']} 次）")
+    for title, group in (("接口", result["requests"]), ("任务端到端", result["jobs"])):
+        print(f"\n{title:<12}{'ok':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  错误")
+        for name, s in sorted(group.items()):
+            print(f"{name:<12}{s['ok']:>7}{s['p50_ms'] or '-':>10}{s['p95_ms'] or '-':>10}{s['p99_ms'] or '-':>10}  {s['errors'] or ''}")
+    if result.get("server"):
+        print("\n服务端 llm_client:", json.dumps(result["server"].get("llm_client"), ensure_ascii=False))
+        print("服务端 resources:", json.dumps(result["server"].get("resources"), ensure_ascii=False))
+
+
+async def run(args: argparse.Namespace) -> dict:
+    report = Report()
+    limits = httpx.Limits(max_connections=args.users * 2 + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.request_timeout, limits=limits) as client:
+        papers = await _prepare(client, args, report)
+        if not papers:
+            raise SystemExit("没有可用的论文（上传/导入全部失败）")
+        state = {"interpreted": set(), "last_task": None}
+        mix = _parse_mix(args.mix)
+        t0 = time.monotonic()
+        until = t0 + args.duration
+        users = [User(client, args, report, papers, state) for _ in range(args.users)]
+        await asyncio.gather(*(u.run(until, mix) for u in users))
+        elapsed = time.monotonic() - t0
+        server = None
+        try:
+            server = (await client.get("/api/tasks/stats")).json()
+        except (httpx.HTTPError, ValueError):
+            pass
+    completed = sum(len(s.latencies) for s in report.jobs.values())
+    return {
+        "duration_sec": round(elapsed, 1),
+        "papers": len(papers),
+        "users": args.users,
+        "jobs_completed": completed,
+        "jobs_per_min": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+        "skipped": report.skipped,
+        "requests": {k: v.summary() for k, v in report.requests.items()},
+        "jobs": {k: v.summary() for k, v in report.jobs.items()},
+        "server": server,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PaperAxon API 压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:18527")
+    parser.add_argument("--papers", type=int, default=20, help="准备的论文数")
+    parser.add_argument("--source", choices=("upload", "arxiv"), default="upload")
+    parser.add_argument("--pdf-pages", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=60, help="压测时长（秒，不含准备）")
+    parser.add_argument("--mix", default="interpret=4,podcast=1,related=3,tasks=2", help="操作比例")
+    parser.add_argument("--no-cache", action="store_true", help="解读/播客带 no_cache=true，不复用 LLM 缓存")
+    parser.add_argument("--related-refresh", type=float, default=0.5, help="相关论文请求中带 refresh=true 的比例")
+    parser.add_argument("--think-sec", type=float, default=0.0, help="每个用户两次操作之间的平均间隔（秒）")
+    parser.add_argument("--poll-sec", type=float, default=0.5)
+    parser.add_argument("--job-timeout", type=float, default=900)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--json", dest="json_path", help="另把结果写入该 JSON 文件")
+    args = parser.parse_args()
+    result = asyncio.run(run(args))
+    _print(result)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
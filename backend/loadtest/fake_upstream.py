@@ -0,0 +1,310 @@
+"""本地模拟上游：DashScope OpenAI 兼容对话接口、Qwen TTS 接口、arXiv 查询与 PDF 下载。
+
+    python -m backend.loadtest.fake_upstream --port 18600 --llm-latency 2 --error-rate 0.02
+
+后端（API 与 worker）指向它：
+    DASHSCOPE_API_KEY=fake
+    DASHSCOPE_BASE_URL=http://127.0.0.1:18600/compatible-mode/v1
+    DASHSCOPE_TTS_URL=http://127.0.0.1:18600/api/v1/services/aigc/multimodal-generation/generation
+    ARXIV_API_URL=http://127.0.0.1:18600/api/query
+
+延迟按均值加高斯抖动模拟；--error-rate 的请求返回 500；LLM 同时在途超过 --llm-max-inflight 时返回 429
+（带 Retry-After），用于观察重试与自适应并发。GET /stats 返回各接口的请求数、错误数与在途峰值。
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+import wave
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+_SECTIONS = ("Introduction", "Related Work", "Method", "Experiments", "Results", "Discussion", "Conclusion")
+_WORDS = (
+    "model training data attention transformer layer benchmark accuracy latency baseline ablation dataset "
+    "gradient inference objective representation retrieval encoder decoder token evaluation robustness"
+).split()
+
+
+class Options:
+    def __init__(self, args: argparse.Namespace):
+        self.llm_latency = args.llm_latency
+        self.llm_gen_sec = args.llm_gen_sec
+        self.llm_chunks = args.llm_chunks
+        self.llm_output_chars = args.llm_output_chars
+        self.llm_max_inflight = args.llm_max_inflight
+        self.tts_latency = args.tts_latency
+        self.arxiv_latency = args.arxiv_latency
+        self.jitter = args.jitter
+        self.error_rate = args.error_rate
+        self.pdf_pages = args.pdf_pages
+        self.audio_sec = args.audio_sec
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.time()
+        self.requests: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.throttled = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+
+    def hit(self, name: str) -> None:
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    def error(self, name: str) -> None:
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            "uptime_sec": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "llm_throttled": self.throttled,
+            "llm_inflight": self.inflight,
+            "llm_peak_inflight": self.peak_inflight,
+        }
+
+
+def _delay(mean: float, jitter: float) -> float:
+    return max(0.0, random.gauss(mean, mean * jitter)) if mean > 0 else 0.0
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def _wav(seconds: float) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\0\0" * int(16000 * seconds))
+    return buf.getvalue()
+
+
+def synthetic_pdf(arxiv_id: str, pages: int) -> bytes:
+    """生成带编号章节的多页假论文（内容按 arxiv_id 固定）：大字号标题、粗体章节标题、摘要与参考文献。"""
+    import fitz  # PyMuPDF，后端已依赖
+
+    rng = random.Random(arxiv_id)
+    # (文本, 字号, 粗体)
+    lines = [(f"Synthetic Paper {arxiv_id}", 16, True), ("", 9, False), ("Abstract", 11, True)]
+    lines += [(_words(rng, 10), 9, False) for _ in range(6)]
+    for i, name in enumerate(_SECTIONS, 1):
+        lines += [("", 9, False), (f"{i} {name}", 11, True)]
+        lines += [(_words(rng, 10), 9, False) for _ in range(max(1, pages * 40 // len(_SECTIONS)))]
+    lines += [("", 9, False), ("References", 11, True)]
+    lines += [(f"[{k}] {_words(rng, 8)}. 2024.", 9, False) for k in range(1, 11)]
+    per_page = max(1, len(lines) // pages + 1)
+    doc = fitz.open()
+    try:
+        for start in range(0, len(lines), per_page):
+            page = doc.new_page()
+            y = 50.0
+            for text, size, bold in lines[start:start + per_page]:
+                y += size * 1.25
+                if text:
+                    page.insert_text((50, y), text, fontsize=size, fontname="hebo" if bold else "helv")
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+def _atom_entry(base_url: str, arxiv_id: str, title: str) -> str:
+    rng = random.Random(arxiv_id)
+    published = (datetime.now(timezone.utc) - timedelta(hours=rng.randint(1, 20))).strftime("%Y-%m-%dT%H:%M:%SZ")
+    authors = "".join(f"<author><name>Author {rng.randint(1, 999)}</name></author>" for _ in range(3))
+    return f"""<entry>
+<id>http://arxiv.org/abs/{arxiv_id}v1</id>
+<updated>{published}</updated>
+<published>{published}</published>
+<title>{escape(title)}</title>
+<summary>{escape(_words(rng, 60))}</summary>
+{authors}
+<link href="{base_url}/abs/{arxiv_id}v1" rel="alternate" type="text/html"/>
+<link title="pdf" href="{base_url}/pdf/{arxiv_id}v1" rel="related" type="application/pdf"/>
+<arxiv:primary_category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+<category term="cs.LG" scheme="http://arxiv.org/schemas/atom"/>
+</entry>"""
+
+
+def _atom_feed(entries: list[str]) -> str:
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" xmlns:arxiv="http://arxiv.org/schemas/atom">
+<title>fake arXiv query</title>
+<opensearch:totalResults>{len(entries)}</opensearch:totalResults>
+<opensearch:startIndex>0</opensearch:startIndex>
+<opensearch:itemsPerPage>{len(entries)}</opensearch:itemsPerPage>
+{"".join(entries)}
+</feed>"""
+
+
+def _llm_reply(prompt: str, chars: int) -> str:
+    """按提示类型给出形状相近的假输出：播客稿、分段要点或七节解读报告。"""
+    rng = random.Random(hash(prompt))
+    if "播客" in prompt:
+        return "今天要聊的论文是一篇关于模型效率的工作。\n\n" + "\n\n".join(
+            _words(rng, 30) for _ in range(max(1, chars // 200))
+        )
+    if "片段" in prompt and "要点" in prompt:
+        return "\n".join(f"- {_words(rng, 12)}" for _ in range(6))
+    titles = ("研究背景与动机", "问题定义与目标", "方法/技术路线概述", "主要结果与实验结论", "创新点与贡献", "局限性与未来工作", "一句话总结")
+    per = max(20, chars // len(titles) // 6)
+    return "\n\n".join(f"## {i}. **{t}**\n{_words(rng, per)}" for i, t in enumerate(titles, 1))
+
+
+def create_app(opts: Options) -> FastAPI:
+    app = FastAPI(title="PaperAxon fake upstream")
+    stats = Stats()
+    pdf_cache: dict[str, bytes] = {}
+    audio = _wav(opts.audio_sec)
+
+    def failed(name: str) -> bool:
+        if random.random() < opts.error_rate:
+            stats.error(name)
+            return True
+        return False
+
+    @app.post("/compatible-mode/v1/chat/completions")
+    async def chat(request: Request):
+        stats.hit("chat")
+        body = await request.json()
+        if opts.llm_max_inflight and stats.inflight >= opts.llm_max_inflight:
+            stats.throttled += 1
+            return JSONResponse(
+                {"error": {"message": "Requests rate limit exceeded", "type": "limit_requests", "code": "limit_requests"}},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        if failed("chat"):
+            return JSONResponse({"error": {"message": "fake upstream error", "type": "internal_error"}}, status_code=500)
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = _llm_reply(prompt, opts.llm_output_chars)
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens:
+            text = text[: int(max_tokens) * 2]
+        usage = {"prompt_tokens": len(prompt) // 3, "completion_tokens": len(text) // 3}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        model = body.get("model", "fake")
+        stats.inflight += 1
+        stats.peak_inflight = max(stats.peak_inflight, stats.inflight)
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                stats.inflight -= 1
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(_delay(opts.llm_latency, opts.jitter) + _delay(opts.llm_gen_sec, opts.jitter))
+            finally:
+                release()
+            return {
+                "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            try:
+                await asyncio.sleep(_delay(opts.llm_latency, opts.jitter))
+                n = max(1, opts.llm_chunks)
+                step = max(1, len(text) // n + 1)
+                interval = _delay(opts.llm_gen_sec, opts.jitter) / n
+                for i in range(0, len(text), step):
+                    chunk = {
+                        "id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": {"content": text[i:i + step]}, "finish_reason": None}],
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    await asyncio.sleep(interval)
+                tail = {"id": "fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [], "usage": usage}
+                yield f"data: {json.dumps(tail)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                release()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/api/v1/services/aigc/multimodal-generation/generation")
+    async def tts(request: Request):
+        stats.hit("tts")
+        await request.body()
+        await asyncio.sleep(_delay(opts.tts_latency, opts.jitter))
+        if failed("tts"):
+            return JSONResponse({"code": "InternalError", "message": "fake upstream error"}, status_code=500)
+        base = str(request.base_url).rstrip("/")
+        return {"output": {"audio": {"url": f"{base}/audio/{random.getrandbits(48):x}.wav"}}, "request_id": "fake"}
+
+    @app.get("/audio/{name}")
+    async def audio_file(name: str):
+        stats.hit("audio")
+        return Response(audio, media_type="audio/wav")
+
+    @app.get("/api/query")
+    async def query(request: Request, search_query: str = "", id_list: str = "", max_results: int = 10):
+        stats.hit("arxiv_query")
+        await asyncio.sleep(_delay(opts.arxiv_latency, opts.jitter))
+        if failed("arxiv_query"):
+            return Response("fake upstream error", status_code=500)
+        base = str(request.base_url).rstrip("/")
+        if id_list:
+            entries = [_atom_entry(base, i.strip(), f"Synthetic Paper {i.strip()}") for i in id_list.split(",") if i.strip()]
+        else:
+            rng = random.Random(search_query)
+            entries = [
+                _atom_entry(base, f"{rng.randint(2001, 2612)}.{rng.randint(10000, 99999)}", f"Related {_words(rng, 5)}")
+                for _ in range(min(max_results, 50))
+            ]
+        return Response(_atom_feed(entries), media_type="application/atom+xml")
+
+    @app.get("/pdf/{name}")
+    async def pdf(name: str):
+        stats.hit("arxiv_pdf")
+        if failed("arxiv_pdf"):
+            return Response("fake upstream error", status_code=500)
+        arxiv_id = name.removesuffix(".pdf").split("v")[0]
+        if arxiv_id not in pdf_cache:
+            pdf_cache[arxiv_id] = await asyncio.to_thread(synthetic_pdf, arxiv_id, opts.pdf_pages)
+        return Response(pdf_cache[arxiv_id], media_type="application/pdf")
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.to_dict()
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PaperAxon 本地模拟上游（DashScope 对话/TTS、arXiv）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18600)
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="LLM 首 token 延迟均值（秒）")
+    parser.add_argument("--llm-gen-sec", type=float, default=3.0, help="LLM 生成耗时均值（秒），流式时均匀分布到各段")
+    parser.add_argument("--llm-chunks", type=int, default=30, help="流式响应的段数")
+    parser.add_argument("--llm-output-chars", type=int, default=1500, help="解读/播客稿输出长度（字符）")
+    parser.add_argument("--llm-max-inflight", type=int, default=0, help="LLM 同时在途上限，超出返回 429（0 不限）")
+    parser.add_argument("--tts-latency", type=float, default=0.8, help="TTS 每段延迟均值（秒）")
+    parser.add_argument("--arxiv-latency", type=float, default=0.5, help="arXiv 查询延迟均值（秒）")
+    parser.add_argument("--jitter", type=float, default=0.3, help="延迟的相对标准差")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的请求比例")
+    parser.add_argument("--pdf-pages", type=int, default=8, help="模拟 PDF 页数")
+    parser.add_argument("--audio-sec", type=float, default=1.0, help="每段模拟音频时长（秒）")
+    args = parser.parse_args()
+    uvicorn.run(create_app(Options(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 """FastAPI 应用入口：挂载 API、静态资源、定时采集、MCP/Skill 占位。"""
+from datetime import datetime
 from pathlib import Path
 from contextlib import asynccontextmanager
 
@@ -8,14 +9,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
 
 from backend.config import ensure_data_dirs, PORT, PROJECT_ROOT, DATA_DIR
-from backend.db import init_db
+from backend.db import init_db, close_pool, close_async_pool
 from backend.log_config import setup_logging, get_logger
-from backend.api.papers import router as papers_router
+from backend.api.papers import router as papers_router, UploadSizeLimitMiddleware
 from backend.api.tasks import router as tasks_router
 from backend.api.settings import router as settings_router
 from backend.api.knowledge import router as knowledge_router
-from backend.services.collect import run_collect
-from backend.db import get_conn
+from backend.services import llm_client, pdf_parser, task_queue
+from backend.services.task_queue import WorkerPool
+from backend.services import jobs  # noqa: F401  注册任务处理函数
+from backend.db import connection
 from backend.db import models as db
 
 
@@ -23,27 +26,44 @@ logger = get_logger(__name__)
 
 
 def _scheduled_collect():
-    """每分钟检查：若当前时间与配置的采集时间一致且已开启，则执行采集。"""
+    """每分钟检查：若当前时间与配置的采集时间一致且已开启，则以低优先级入队一次采集任务。"""
     from datetime import datetime
-    conn = get_conn()
     try:
-        enabled = db.setting_get(conn, "auto_collect_enabled")
+        with connection() as conn:
+            enabled = db.setting_get(conn, "auto_collect_enabled")
+            collect_time = db.setting_get(conn, "collect_time") or "00:00"
         if enabled != "true":
             return
-        collect_time = db.setting_get(conn, "collect_time") or "00:00"
         parts = collect_time.split(":")
         target_h, target_m = int(parts[0]), int(parts[1]) if len(parts) > 1 else 0
         now = datetime.now()
         if now.hour == target_h and now.minute == target_m:
-            n = run_collect()
-            logger.info("定时采集完成, 新增论文数: %s", n)
+            task_id, _ = task_queue.enqueue("collect", {}, priority=task_queue.PRIORITY_SCHEDULED)
+            logger.info("定时采集已入队 task_id=%s", task_id)
+    except task_queue.QueueFull as e:
+        logger.warning("任务队列已满，跳过本次定时采集: %s", e)
     except Exception as e:
         logger.exception("定时采集异常: %s", e)
-    finally:
-        conn.close()
+
+
+def _gc_checkpoints():
+    from backend.agents.graph import gc_checkpoints
+    try:
+        gc_checkpoints()
+    except Exception as e:
+        logger.warning("清理检查点失败: %s", e)
+
+
+def _gc_llm_cache():
+    from backend.services import llm_cache
+    try:
+        llm_cache.gc()
+    except Exception as e:
+        logger.warning("清理 LLM 缓存失败: %s", e)
 
 
 scheduler = BackgroundScheduler()
+worker_pool = WorkerPool()
 
 
 @asynccontextmanager
@@ -52,14 +72,25 @@ async def lifespan(app: FastAPI):
     setup_logging()
     logger.info("PaperAxon 启动 data_dir=%s port=%s", DATA_DIR, PORT)
     init_db()
+    worker_pool.start()
     scheduler.add_job(_scheduled_collect, "interval", minutes=1)
+    scheduler.add_job(_gc_checkpoints, "interval", hours=1, next_run_time=datetime.now())
+    scheduler.add_job(_gc_llm_cache, "interval", hours=1, next_run_time=datetime.now())
     scheduler.start()
     yield
     scheduler.shutdown()
+    worker_pool.stop()
+    pdf_parser.shutdown()
+    close_pool()
+    await close_async_pool()
+    await llm_client.aclose()
+    llm_client.close()
     logger.info("PaperAxon 关闭")
 
 
 app = FastAPI(title="PaperAxon", lifespan=lifespan)
+# 先加的中间件在内层：413 响应仍带 CORS 头
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 app.include_router(papers_router)
@@ -0,0 +1,93 @@
+"""内容寻址的中间产物存储：大块数据（解析正文、解读 Markdown、播客稿）存为文件，
+图状态与检查点中只保存形如 "sha256:<hex>" 的句柄。
+
+- 相同内容得到相同句柄，重复写入不产生新文件；
+- 文件写入临时文件后原子改名，可被多个线程/进程并发写；
+- 最近读取的内容缓存在进程内（ARTIFACT_CACHE_ITEMS 个），内容不可变，无需失效。
+"""
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable
+
+from backend.config import ARTIFACTS_DIR, ARTIFACT_CACHE_ITEMS
+from backend.log_config import get_logger
+
+logger = get_logger(__name__)
+
+_PREFIX = "sha256:"
+
+
+class ArtifactNotFound(KeyError):
+    """句柄对应的文件不存在（可能已被清理）。"""
+
+
+def _path(handle: str) -> Path:
+    if not handle.startswith(_PREFIX):
+        raise ValueError(f"无效的产物句柄: {handle}")
+    digest = handle[len(_PREFIX):]
+    return ARTIFACTS_DIR / digest[:2] / digest
+
+
+def put_bytes(data: bytes) -> str:
+    handle = _PREFIX + hashlib.sha256(data).hexdigest()
+    path = _path(handle)
+    if path.exists():
+        # 刷新修改时间，避免仍在使用的产物被 gc 清理
+        os.utime(path)
+        return handle
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return handle
+
+
+def put_text(text: str) -> str:
+    return put_bytes(text.encode("utf-8"))
+
+
+def put_json(obj: Any) -> str:
+    return put_bytes(json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+@lru_cache(maxsize=ARTIFACT_CACHE_ITEMS)
+def get_bytes(handle: str) -> bytes:
+    try:
+        return _path(handle).read_bytes()
+    except FileNotFoundError:
+        raise ArtifactNotFound(handle) from None
+
+
+def get_text(handle: str) -> str:
+    return get_bytes(handle).decode("utf-8")
+
+
+def get_json(handle: str) -> Any:
+    """每次返回新对象，调用方可以修改。"""
+    return json.loads(get_bytes(handle))
+
+
+def gc(max_age_sec: float, keep: Iterable[str] = ()) -> int:
+    """删除超过 max_age_sec 未写入、且不在 keep（如现存检查点引用的句柄）中的产物文件，返回删除数。"""
+    if not ARTIFACTS_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age_sec
+    keep_names = {_path(h).name for h in keep}
+    removed = 0
+    for path in ARTIFACTS_DIR.glob("*/*"):
+        if path.name in keep_names:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        get_bytes.cache_clear()
+        logger.info("清理过期中间产物: %s 个", removed)
+    return removed
@@ -6,7 +6,8 @@ from typing import Any, Optional
 import arxiv
 import requests
 
-from backend.config import PAPERS_DIR
+from backend.config import PAPERS_DIR, ARXIV_API_URL, ARXIV_TIMEOUT_SEC
+from backend.services import cancellation, metrics
 
 
 def extract_arxiv_id(url_or_id: str) -> Optional[str]:
@@ -23,13 +24,34 @@ def extract_arxiv_id(url_or_id: str) -> Optional[str]:
     return None
 
 
+class _TimeoutSession(requests.Session):
+    """arxiv.Client 不支持设置请求超时，用带默认超时的 Session 替换其内部会话。"""
+
+    def __init__(self, timeout: float):
+        super().__init__()
+        self._timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self._timeout)
+        return super().request(*args, **kwargs)
+
+
+def new_client(timeout: float = ARXIV_TIMEOUT_SEC) -> arxiv.Client:
+    """arxiv.Client：查询地址取 ARXIV_API_URL，请求超时不超过当前任务剩余时间。"""
+    client = arxiv.Client()
+    client.query_url_format = ARXIV_API_URL + "?{}"
+    client._session = _TimeoutSession(cancellation.remaining(timeout))
+    return client
+
+
 def fetch_and_download(arxiv_id: str) -> tuple[dict[str, Any], Path]:
     """
     拉取 arXiv 元数据并下载 PDF 到 data/papers/，返回 (元数据 dict, 本地 PDF 路径)。
     元数据含 title, authors, abstract, published_at 等。
+    在后台任务中执行时，超时不超过任务剩余时间，下载过程中响应取消。
     """
     search = arxiv.Search(id_list=[arxiv_id])
-    client = arxiv.Client()
+    client = new_client()
     paper = None
     for p in client.results(search):
         paper = p
@@ -39,11 +61,9 @@ def fetch_and_download(arxiv_id: str) -> tuple[dict[str, Any], Path]:
 
     # 下载 PDF
     pdf_url = paper.pdf_url
-    resp = requests.get(pdf_url, timeout=60)
-    resp.raise_for_status()
     PAPERS_DIR.mkdir(parents=True, exist_ok=True)
     local_path = PAPERS_DIR / f"{arxiv_id.replace('/', '_')}.pdf"
-    local_path.write_bytes(resp.content)
+    _download(pdf_url, local_path)
 
     authors_str = ", ".join(a.name for a in paper.authors)
     published = paper.published.strftime("%Y-%m-%dT%H:%M:%SZ") if paper.published else None
@@ -55,3 +75,19 @@ def fetch_and_download(arxiv_id: str) -> tuple[dict[str, Any], Path]:
         "published_at": published,
         "source_path_or_url": str(local_path),
     }, local_path
+
+
+def _download(url: str, path: Path) -> None:
+    """分块下载到临时文件后改名；requests 的 timeout 只约束单次读取，故每块检查一次截止时间。"""
+    tmp = path.with_suffix(path.suffix + ".part")
+    try:
+        with requests.get(url, timeout=cancellation.remaining(ARXIV_TIMEOUT_SEC), stream=True) as resp:
+            resp.raise_for_status()
+            with open(tmp, "wb") as f:
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    cancellation.check()
+                    f.write(chunk)
+                    metrics.add("bytes_downloaded", len(chunk))
+        tmp.replace(path)
+    finally:
+        tmp.unlink(missing_ok=True)
@@ -0,0 +1,88 @@
+"""任务级截止时间与协作式取消。
+
+worker 执行任务时用 bind() 把 TaskContext 绑定到当前上下文（contextvars，LangGraph 的节点线程会继承），
+下游代码在步骤之间调用 check() 响应取消，在网络调用前用 remaining() 把超时限制在任务剩余时间内。
+不在任务中执行时（如同步 API 请求）两者退化为空操作 / 默认超时。
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class Cancelled(Exception):
+    """任务已被取消（用户请求或租约丢失）。"""
+
+
+class DeadlineExceeded(Cancelled):
+    """任务执行超过截止时间（TASK_TIMEOUT_SEC）。"""
+
+
+class TaskContext:
+    def __init__(self, task_id: str, deadline: Optional[float] = None):
+        self.task_id = task_id
+        self.deadline = deadline  # epoch 秒，与 tasks.deadline_at 一致
+        self._cancel = threading.Event()
+        self.reason = ""
+
+    def cancel(self, reason: str = "任务已取消") -> None:
+        if not self._cancel.is_set():
+            self.reason = reason
+            self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def outcome(self) -> Optional[str]:
+        """任务异常结束时据此决定终态：timeout / cancelled / None（普通失败）。"""
+        if self.expired:
+            return "timeout"
+        if self.cancelled:
+            return "cancelled"
+        return None
+
+    def check(self) -> None:
+        if self.expired:
+            raise DeadlineExceeded(f"任务超时 task_id={self.task_id}")
+        if self.cancelled:
+            raise Cancelled(self.reason)
+
+
+_current: contextvars.ContextVar[Optional[TaskContext]] = contextvars.ContextVar("task_context", default=None)
+
+
+@contextmanager
+def bind(ctx: TaskContext) -> Iterator[TaskContext]:
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[TaskContext]:
+    return _current.get()
+
+
+def check() -> None:
+    """当前任务已取消或超时则抛出 Cancelled / DeadlineExceeded。"""
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.check()
+
+
+def remaining(default: float) -> float:
+    """网络调用的超时秒数：default 与任务剩余时间取小（至少 1 秒）；已取消或超时则直接抛出。"""
+    ctx = _current.get()
+    if ctx is None:
+        return default
+    ctx.check()
+    if ctx.deadline is None:
+        return default
+    return max(1.0, min(default, ctx.deadline - time.time()))
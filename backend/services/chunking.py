@@ -0,0 +1,154 @@
+"""长文切分：按章节把论文正文切成不超过 chunk_tokens 的片段，供 map-reduce 解读使用。
+
+章节优先取 parse_result["sections"]（pdf_layout 识别的 [{heading, kind, text, ...}]），为空时从 raw_text 中按标题行启发式识别；
+摘要（已单独放入提示）、参考文献、致谢与附录不参与解读。token 数按字符估算（中日韩字符约 1 token，其余约 4 字符 1 token），无需分词器。
+"""
+import math
+import re
+from dataclasses import dataclass, field
+
+_CJK = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+_KNOWN_HEADINGS = (
+    r"abstract|introduction|related work|background|preliminaries|method(?:s|ology)?|approach|model|"
+    r"experiments?(?: setup)?|evaluation|results?|analysis|discussion|conclusions?|limitations|future work|"
+    r"references|bibliography|acknowledg(?:e)?ments?|appendix(?: [a-z])?|"
+    r"摘要|引言|相关工作|背景|方法|实验|结果|讨论|结论|参考文献|致谢|附录"
+)
+# 编号标题（"3 Method"、"2.1 Setup"、"IV. RESULTS"）或常见章节名单独成行
+_HEADING = re.compile(
+    rf"^\s*(?:(?:\d+(?:\.\d+){{0,2}}\.?|[IVX]{{1,5}}\.)\s+[A-Z一-鿿][^.:;]{{0,78}}|(?:\d+(?:\.\d+)*\.?\s*)?(?:{_KNOWN_HEADINGS})\s*:?)\s*$",
+    re.IGNORECASE,
+)
+_SKIP = re.compile(
+    r"^\s*(?:\d+\.?\s*)?(?:references|bibliography|acknowledg(?:e)?ments?|appendi(?:x|ces)|参考文献|致谢|附录)\b", re.IGNORECASE
+)
+_SKIP_KINDS = ("abstract", "references", "acknowledgements", "appendix")
+
+
+def estimate_tokens(text: str) -> int:
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """按估算 token 数截断（按比例换算字符数，留 5% 余量）。"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    return text[: int(len(text) * max_tokens / tokens * 0.95)]
+
+
+@dataclass
+class Chunk:
+    headings: list[str] = field(default_factory=list)
+    text: str = ""
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def looks_like_heading(line: str) -> bool:
+    s = line.strip()
+    if not s or len(s) > 80 or len(s.split()) > 10 or s.endswith((".", "。", ",", "，", ";")):
+        return False
+    if re.fullmatch(r"[\d.\s]+", s):
+        return False  # 页码、单独的数字
+    return bool(_HEADING.match(s))
+
+
+def split_sections(raw_text: str) -> list[dict]:
+    """从纯文本中识别章节，返回 [{heading, text}]；第一个标题之前的内容记为 heading=""。"""
+    sections: list[dict] = [{"heading": "", "lines": []}]
+    for line in raw_text.splitlines():
+        if looks_like_heading(line):
+            sections.append({"heading": line.strip(), "lines": []})
+        else:
+            sections[-1]["lines"].append(line)
+    out = []
+    for s in sections:
+        text = "\n".join(s["lines"]).strip()
+        if text or s["heading"]:
+            out.append({"heading": s["heading"], "text": text})
+    return out
+
+
+def _split_long(text: str, max_tokens: int) -> list[str]:
+    """超长章节按段落（再按行、最后按字符）切成不超过 max_tokens 的片段。"""
+    pieces: list[str] = []
+    cur = ""
+    for para in re.split(r"\n\s*\n|\n", text):
+        para = para.strip()
+        if not para:
+            continue
+        while estimate_tokens(para) > max_tokens:
+            head = truncate_tokens(para, max_tokens)
+            if cur:
+                pieces.append(cur)
+                cur = ""
+            pieces.append(head)
+            para = para[len(head):]
+        candidate = f"{cur}\n{para}" if cur else para
+        if estimate_tokens(candidate) > max_tokens:
+            pieces.append(cur)
+            cur = para
+        else:
+            cur = candidate
+    if cur:
+        pieces.append(cur)
+    return pieces
+
+
+def relevant_sections(parse_result: dict) -> list[tuple[str, str]]:
+    """参与解读的章节 [(heading, body)]，按原文顺序。"""
+    sections = parse_result.get("sections") or split_sections(parse_result.get("raw_text") or "")
+    out = []
+    for sec in sections:
+        heading = (sec.get("heading") or "").strip()
+        if sec.get("kind") in _SKIP_KINDS or (heading and _SKIP.match(heading)):
+            continue
+        body = (sec.get("text") or "").strip()
+        if body:
+            out.append((heading, body))
+    return out
+
+
+def body_text(parse_result: dict) -> str:
+    """参与解读的正文（各章节带标题拼接），短文单次调用时代替 raw_text 前缀。"""
+    text = "\n\n".join(f"## {h}\n{b}" if h else b for h, b in relevant_sections(parse_result))
+    return text or (parse_result.get("raw_text") or "")
+
+
+def chunk_paper(parse_result: dict, chunk_tokens: int) -> list[Chunk]:
+    """按章节切分并把相邻的短章节合并，每个片段不超过 chunk_tokens；跳过参考文献、致谢与附录。"""
+    chunks: list[Chunk] = []
+    cur = Chunk()
+    for heading, body in relevant_sections(parse_result):
+        block = f"## {heading}\n{body}" if heading else body
+        if estimate_tokens(block) > chunk_tokens:
+            if cur.text:
+                chunks.append(cur)
+                cur = Chunk()
+            for i, piece in enumerate(_split_long(body, chunk_tokens)):
+                label = heading + (f"（续 {i}）" if i else "") if heading else ""
+                chunks.append(Chunk([label] if label else [], f"## {label}\n{piece}" if label else piece))
+            continue
+        if cur.text and estimate_tokens(cur.text + "\n\n" + block) > chunk_tokens:
+            chunks.append(cur)
+            cur = Chunk()
+        cur.text = f"{cur.text}\n\n{block}" if cur.text else block
+        if heading:
+            cur.headings.append(heading)
+    if cur.text:
+        chunks.append(cur)
+    return chunks
+
+
+def fit_budget(chunks: list[Chunk], budget_tokens: int) -> list[Chunk]:
+    """总量超过 budget_tokens 时把每个片段截到相同上限，保留全文各部分而不是只保留开头。"""
+    total = sum(c.tokens for c in chunks)
+    if total <= budget_tokens or not chunks:
+        return chunks
+    cap = max(200, budget_tokens // len(chunks))
+    return [Chunk(c.headings, truncate_tokens(c.text, cap)) for c in chunks]
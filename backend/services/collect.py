@@ -5,9 +5,10 @@ from typing import Optional
 import arxiv
 
 from backend.config import DEFAULT_ARXIV_CATEGORY
-from backend.db import get_conn
+from backend.db import connection
 from backend.db import models as db
-from backend.services.arxiv_client import fetch_and_download, extract_arxiv_id
+from backend.services.arxiv_client import fetch_and_download, extract_arxiv_id, new_client
+from backend.services import cancellation
 
 
 def run_collect(category: Optional[str] = None) -> int:
@@ -22,35 +23,36 @@ def run_collect(category: Optional[str] = None) -> int:
         sort_by=arxiv.SortCriterion.LastUpdatedDate,
         max_results=50,
     )
-    client = arxiv.Client()
-    conn = get_conn()
+    client = new_client()
     new_count = 0
-    try:
-        for p in client.results(search):
-            # 只保留最近 24h 内更新的
-            if p.updated:
-                from datetime import timezone
-                cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
-                if p.updated.replace(tzinfo=timezone.utc) < cutoff:
-                    continue
-            arxiv_id = p.entry_id.split("/")[-1].split("v")[0]
-            existing = db.paper_get_by_arxiv_id(conn, arxiv_id)
-            if existing:
+    for p in client.results(search):
+        # 只保留最近 24h 内更新的
+        if p.updated:
+            from datetime import timezone
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
+            if p.updated.replace(tzinfo=timezone.utc) < cutoff:
                 continue
-            try:
-                from nanoid import generate as nanoid_generate
-                meta, _ = fetch_and_download(arxiv_id)
-                paper_id = nanoid_generate(size=12)
+        arxiv_id = p.entry_id.split("/")[-1].split("v")[0]
+        with connection() as conn:
+            existing = db.paper_get_by_arxiv_id(conn, arxiv_id)
+        if existing:
+            continue
+        try:
+            from nanoid import generate as nanoid_generate
+            meta, _ = fetch_and_download(arxiv_id)
+            paper_id = nanoid_generate(size=12)
+            with connection() as conn:
                 db.paper_insert(
                     conn, paper_id, "arxiv", meta["source_path_or_url"],
                     title=meta["title"], authors=meta["authors"], abstract=meta["abstract"],
                     arxiv_id=arxiv_id, published_at=meta.get("published_at"),
                 )
-                new_count += 1
-            except Exception:
-                continue
-        run_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%SZ")
+            new_count += 1
+        except cancellation.Cancelled:
+            raise
+        except Exception:
+            continue
+    run_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%SZ")
+    with connection() as conn:
         db.collect_log_insert(conn, run_at, new_count)
-        return new_count
-    finally:
-        conn.close()
+    return new_count
@@ -0,0 +1,96 @@
+"""任务事件总线：worker 线程发布任务快照，SSE 连接在事件循环中订阅。
+
+- 同进程内的 worker 通过 publish() 即时推送状态变化与节点进度；
+- 跨进程 worker 的变化由每个事件循环一个的共享监视器按 TASK_EVENTS_DB_POLL_SEC 批量查询 DB 发现，
+  无论打开多少个页面，每个进程每个周期只有一次查询。
+快照可能重复到达，由订阅方按内容去重。
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from backend.config import TASK_EVENTS_DB_POLL_SEC
+from backend.db import async_connection
+from backend.db import models as db
+from backend.db import async_models as adb
+from backend.log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class _Subscriber:
+    def __init__(self, task_ids: set[str], loop: asyncio.AbstractEventLoop):
+        self.task_ids = task_ids
+        self.loop = loop
+        self.queue: asyncio.Queue[dict] = asyncio.Queue()
+
+
+_subscribers: set[_Subscriber] = set()
+_lock = threading.Lock()
+_watchers: dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+
+
+def publish(snapshot: dict) -> None:
+    """发布任务快照（见 models.task_public），可在任意线程调用。"""
+    task_id = snapshot["task_id"]
+    with _lock:
+        targets = [s for s in _subscribers if task_id in s.task_ids]
+    for sub in targets:
+        try:
+            sub.loop.call_soon_threadsafe(sub.queue.put_nowait, snapshot)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+
+@asynccontextmanager
+async def subscribe(task_ids: list[str]) -> AsyncIterator["asyncio.Queue[dict]"]:
+    loop = asyncio.get_running_loop()
+    sub = _Subscriber(set(task_ids), loop)
+    with _lock:
+        _subscribers.add(sub)
+    watcher = _watchers.get(loop)
+    if watcher is None or watcher.done():
+        _watchers[loop] = loop.create_task(_watch(loop))
+    try:
+        yield sub.queue
+    finally:
+        with _lock:
+            _subscribers.discard(sub)
+
+
+def _watched_ids(loop: asyncio.AbstractEventLoop) -> set[str]:
+    with _lock:
+        ids: set[str] = set()
+        for s in _subscribers:
+            if s.loop is loop:
+                ids |= s.task_ids
+        return ids
+
+
+async def _watch(loop: asyncio.AbstractEventLoop) -> None:
+    """共享 DB 监视器：只要本循环还有订阅者就定期批量读取被订阅任务，updated_at 变化时发布。"""
+    seen: dict[str, Optional[str]] = {}
+    try:
+        while True:
+            await asyncio.sleep(TASK_EVENTS_DB_POLL_SEC)
+            ids = _watched_ids(loop)
+            if not ids:
+                break
+            try:
+                async with async_connection() as conn:
+                    rows = await adb.task_get_many(conn, sorted(ids))
+            except Exception as e:
+                logger.warning("任务事件监视器查询失败: %s", e)
+                continue
+            for row in rows:
+                if seen.get(row["task_id"]) != row["updated_at"]:
+                    seen[row["task_id"]] = row["updated_at"]
+                    publish(db.task_public(row))
+            for task_id in list(seen):
+                if task_id not in ids:
+                    del seen[task_id]
+    finally:
+        if _watchers.get(loop) is asyncio.current_task():
+            del _watchers[loop]
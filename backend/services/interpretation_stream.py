@@ -0,0 +1,106 @@
+"""解读的流式输出：interpreter 边生成边追加到 {paper_id}.partial.md，完成后原子改名为 {paper_id}.md
+（memory 节点随后写入同样的内容并登记到 interpretations 表）。
+
+API 进程（可能与 worker 不在同一进程）按文件增长读取并转发给客户端，改名即表示生成完毕；
+生成失败时残留的 .partial.md 在下次解读开始时被覆盖，删除论文时一并清理。
+"""
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Optional, TextIO
+
+from backend.config import INTERPRETATIONS_DIR
+
+_POLL_SEC = 0.2
+
+
+def final_path(paper_id: str) -> Path:
+    return INTERPRETATIONS_DIR / f"{paper_id}.md"
+
+
+def partial_path(paper_id: str) -> Path:
+    return INTERPRETATIONS_DIR / f"{paper_id}.partial.md"
+
+
+class PartialWriter:
+    """with PartialWriter(paper_id) as w: w.write(chunk) ...; w.commit()。commit 时改名为正式文件，未 commit 则保留为残留。"""
+
+    def __init__(self, paper_id: str):
+        self.paper_id = paper_id
+        self._f: Optional[TextIO] = None
+
+    def __enter__(self) -> "PartialWriter":
+        path = partial_path(self.paper_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先删除上次残留的文件，新文件是新的 inode，仍在读旧文件的连接不会读到错位内容
+        path.unlink(missing_ok=True)
+        self._f = open(path, "x", encoding="utf-8")
+        return self
+
+    def write(self, chunk: str) -> None:
+        self._f.write(chunk)
+        self._f.flush()
+
+    def commit(self) -> None:
+        self._f.close()
+        os.replace(partial_path(self.paper_id), final_path(self.paper_id))
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._f.close()
+
+
+def discard(paper_id: str) -> None:
+    partial_path(paper_id).unlink(missing_ok=True)
+
+
+def _same_file(f: TextIO, path: Path) -> bool:
+    try:
+        return os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+async def follow(
+    paper_id: str,
+    generating: Callable[[], Awaitable[Optional[float]]],
+    check_every: int = 5,
+) -> AsyncIterator[str]:
+    """产出解读正文：正在生成时先给出已写入的部分，再随文件增长继续产出，直到生成结束。
+
+    generating() 在本论文的解读尚未生成完时返回该次任务的创建时间（epoch 秒，早于它的 .partial.md 视为残留），
+    否则返回 None；每 check_every 轮查询一次。没有进行中的生成时直接产出正式文件（不存在则什么也不产出）。
+    """
+    f: Optional[TextIO] = None
+    since = await generating()
+    tick = 0
+    try:
+        while True:
+            partial = partial_path(paper_id)
+            if f is None and since is not None:
+                try:
+                    if partial.stat().st_mtime >= since:
+                        f = open(partial, encoding="utf-8")
+                except FileNotFoundError:
+                    pass
+            if f is not None:
+                chunk = f.read()
+                if chunk:
+                    yield chunk
+                if since is None or not _same_file(f, partial):
+                    # 已改名为正式文件（或生成中止）：读完剩余部分即结束
+                    rest = f.read()
+                    if rest:
+                        yield rest
+                    return
+            elif since is None:
+                path = final_path(paper_id)
+                if path.exists():
+                    yield path.read_text(encoding="utf-8")
+                return
+            await asyncio.sleep(_POLL_SEC)
+            tick += 1
+            if tick % check_every == 0:
+                since = await generating()
+    finally:
+        if f is not None:
+            f.close()
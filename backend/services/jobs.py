@@ -0,0 +1,189 @@
+"""后台任务处理函数：解读、批量解读、播客、定时采集。由 task_queue 的 worker 执行。
+
+解读与播客另有协程版（AsyncWorkerPool 使用），其中的同步 DB 读写放到线程中执行。
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+from pathlib import Path
+
+from backend.config import INTERPRETATIONS_DIR, BATCH_CONCURRENCY, BATCH_POLL_SEC
+from backend.db import connection
+from backend.db import models as db
+from backend.agents.graph import run_interpret, run_podcast_only, arun_interpret, arun_podcast_only
+from backend.log_config import get_logger
+from backend.services import llm_cache, task_queue
+from backend.services.collect import run_collect
+from backend.services.task_queue import register, report_progress, TaskError
+
+logger = get_logger(__name__)
+
+
+def _progress_reporter(task_id: str):
+    """把图节点完成事件转成任务进度：{"node": 最近完成的节点, "completed": [...]}。"""
+    completed: list[str] = []
+
+    def on_node(name: str) -> None:
+        completed.append(name)
+        report_progress(task_id, {"node": name, "completed": list(completed)})
+    return on_node
+
+
+def _aprogress_reporter(task_id: str):
+    """_progress_reporter 的事件循环版：进度写入放到线程中执行，较早的快照晚到时丢弃。"""
+    completed: list[str] = []
+    written = [0]
+    lock = threading.Lock()
+
+    def write(progress: dict) -> None:
+        with lock:
+            if len(progress["completed"]) <= written[0]:
+                return
+            written[0] = len(progress["completed"])
+            report_progress(task_id, progress)
+
+    def on_node(name: str) -> None:
+        completed.append(name)
+        asyncio.get_running_loop().run_in_executor(None, write, {"node": name, "completed": list(completed)})
+    return on_node
+
+
+def _interpret_source(paper_id: str) -> str:
+    with connection() as conn:
+        row = db.paper_get_by_id(conn, paper_id)
+    if not row:
+        raise TaskError("论文不存在")
+    path = row["source_path_or_url"]
+    if not path or not Path(path).exists():
+        raise TaskError("PDF 文件不存在")
+    return path
+
+
+def _interpret_result(paper_id: str, result: dict) -> dict:
+    err = result.get("error")
+    if err:
+        raise TaskError(err)
+    with connection() as conn:
+        interp_row = db.interpretation_get(conn, paper_id)
+    content_path = interp_row["content_path"] if interp_row else str(INTERPRETATIONS_DIR / f"{paper_id}.md")
+    return {"paper_id": paper_id, "interpretation_path": content_path}
+
+
+@register("interpret")
+def interpret_job(task_id: str, payload: dict) -> dict:
+    paper_id = payload["paper_id"]
+    path = _interpret_source(paper_id)
+    with llm_cache.bypass(bool(payload.get("no_cache"))):
+        result = run_interpret(paper_id, {"path": path}, on_node=_progress_reporter(task_id))
+    return _interpret_result(paper_id, result)
+
+
+@register("interpret")
+async def ainterpret_job(task_id: str, payload: dict) -> dict:
+    paper_id = payload["paper_id"]
+    path = await asyncio.to_thread(_interpret_source, paper_id)
+    with llm_cache.bypass(bool(payload.get("no_cache"))):
+        result = await arun_interpret(paper_id, {"path": path}, on_node=_aprogress_reporter(task_id))
+    return await asyncio.to_thread(_interpret_result, paper_id, result)
+
+
+@register("interpret_batch")
+def interpret_batch_job(task_id: str, payload: dict) -> dict:
+    """批量解读：以本任务为父任务，按窗口提交 interpret 子任务（同时进行的不超过 concurrency），子任务由 worker 池并行执行。
+
+    每次执行只推进一步：从 DB 汇总子任务状态、补足窗口、更新进度，未完成时抛 Deferred 交还 worker，
+    等待期间不占用 worker；子任务结束时唤醒本任务，BATCH_POLL_SEC 为兜底检查间隔。
+    复用的他人进行中任务（单飞）记在 state["adopted"] 中，下一步继续跟踪其结果。"""
+    paper_ids: list[str] = payload["paper_ids"]
+    concurrency = max(1, int(payload.get("concurrency") or BATCH_CONCURRENCY))
+
+    with connection() as conn:
+        row = db.task_get(conn, task_id)
+        adopted: dict[str, str] = db.task_state_parse(row).get("adopted", {})  # 子任务 task_id -> paper_id
+        children = db.task_list_children(conn, task_id) + db.task_get_many(conn, list(adopted))
+    finished: dict[str, str] = {}  # paper_id -> 子任务终态
+    inflight: dict[str, str] = {}  # 子任务 task_id -> paper_id
+    for r in children:
+        if r["status"] in db.TASK_TERMINAL_STATUSES:
+            finished[r["paper_id"]] = r["status"]
+        else:
+            inflight[r["task_id"]] = r["paper_id"]
+    started = set(finished) | set(inflight.values())
+    todo = deque(p for p in paper_ids if p not in started)
+
+    while todo and len(inflight) < concurrency:
+        paper_id = todo[0]
+        child_payload = {"paper_id": paper_id}
+        if payload.get("no_cache"):
+            # 子任务在其他 worker 中执行，llm_cache.bypass 不会传递过去，需写入子任务参数
+            child_payload["no_cache"] = True
+        try:
+            child_id, created = task_queue.enqueue(
+                "interpret", child_payload, paper_id=paper_id,
+                priority=task_queue.PRIORITY_BATCH, parent_id=task_id,
+            )
+        except task_queue.QueueFull:
+            break  # 队列已满，等已有子任务完成后再提交
+        todo.popleft()
+        inflight[child_id] = paper_id
+        if not created:
+            adopted[child_id] = paper_id
+
+    failed = {p: st for p, st in finished.items() if st != "success"}
+    progress = {
+        "total": len(paper_ids),
+        "done": len(finished),
+        "succeeded": len(finished) - len(failed),
+        "failed": len(failed),
+        "running": len(inflight),
+        "pending": len(todo),
+    }
+    if row is None or row["progress"] is None or json.loads(row["progress"]) != progress:
+        report_progress(task_id, progress)
+    if todo or inflight:
+        raise task_queue.Deferred(BATCH_POLL_SEC, {"adopted": adopted})
+    if failed:
+        logger.info("批量解读完成 task_id=%s: 失败 %s/%s", task_id, len(failed), len(paper_ids))
+    return {**progress, "failed_papers": failed}
+
+
+def _podcast_source(paper_id: str) -> str:
+    with connection() as conn:
+        interp_row = db.interpretation_get(conn, paper_id)
+    if not interp_row or not interp_row["content_path"]:
+        raise TaskError("请先完成解读")
+    return Path(interp_row["content_path"]).read_text(encoding="utf-8")
+
+
+def _podcast_result(paper_id: str, result: dict) -> dict:
+    err = result.get("error")
+    if err:
+        raise TaskError(err)
+    audio_path = result.get("podcast_audio_path", "")
+    podcast_url = f"/api/papers/{paper_id}/podcast" if audio_path else ""
+    is_placeholder = Path(audio_path).suffix.lower() == ".txt" if audio_path else True
+    return {"paper_id": paper_id, "podcast_url": podcast_url, "is_placeholder": is_placeholder}
+
+
+@register("podcast")
+def podcast_job(task_id: str, payload: dict) -> dict:
+    paper_id = payload["paper_id"]
+    interpretation = _podcast_source(paper_id)
+    with llm_cache.bypass(bool(payload.get("no_cache"))):
+        result = run_podcast_only(paper_id, interpretation, on_node=_progress_reporter(task_id))
+    return _podcast_result(paper_id, result)
+
+
+@register("podcast")
+async def apodcast_job(task_id: str, payload: dict) -> dict:
+    paper_id = payload["paper_id"]
+    interpretation = await asyncio.to_thread(_podcast_source, paper_id)
+    with llm_cache.bypass(bool(payload.get("no_cache"))):
+        result = await arun_podcast_only(paper_id, interpretation, on_node=_aprogress_reporter(task_id))
+    return _podcast_result(paper_id, result)
+
+
+@register("collect")
+def collect_job(task_id: str, payload: dict) -> dict:
+    return {"new_count": run_collect(payload.get("category"))}
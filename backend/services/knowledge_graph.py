@@ -2,6 +2,7 @@
 import sqlite3
 from typing import Any
 
+import aiosqlite
 import networkx as nx
 
 
@@ -25,12 +26,23 @@ def build_graph(conn: sqlite3.Connection) -> tuple[list[dict], list[dict]]:
     return nodes, edges
 
 
+_TRENDING_SQL = "SELECT paper_id, title, authors, updated_at FROM papers ORDER BY updated_at DESC, paper_id DESC LIMIT ?"
+
+
 def get_trending(conn: sqlite3.Connection, limit: int = 20) -> list[dict[str, Any]]:
     """热度：按 updated_at 降序（最近更新优先）。"""
-    rows = conn.execute(
-        "SELECT paper_id, title, authors, updated_at FROM papers ORDER BY updated_at DESC LIMIT ?",
-        (limit,),
-    ).fetchall()
+    rows = conn.execute(_TRENDING_SQL, (limit,)).fetchall()
+    return _trending_items(rows)
+
+
+async def aget_trending(conn: aiosqlite.Connection, limit: int = 20) -> list[dict[str, Any]]:
+    """get_trending 的 aiosqlite 版本。"""
+    async with conn.execute(_TRENDING_SQL, (limit,)) as cur:
+        rows = await cur.fetchall()
+    return _trending_items(rows)
+
+
+def _trending_items(rows) -> list[dict[str, Any]]:
     return [
         {
             "paper_id": r[0],
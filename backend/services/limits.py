@@ -0,0 +1,116 @@
+"""按外部资源划分的并发预算：LLM、TTS、PDF 解析各自独立限流。
+
+worker 线程数只决定同时执行的任务数，真正昂贵的调用在这里排队：
+    with limits.llm.slot():
+        llm.invoke(...)
+协程中用 `async with limits.llm.aslot():`，与线程共用同一份预算，排队时不占用线程。
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from backend.config import LLM_CONCURRENCY, TTS_CONCURRENCY, PDF_PARSE_CONCURRENCY
+from backend.log_config import get_logger
+from backend.services import cancellation
+
+logger = get_logger(__name__)
+
+
+class ResourceLimiter:
+    """带名字的计数信号量，记录排队等待时间便于定位瓶颈。"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self._limit = max(1, limit)
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def acquire(self) -> None:
+        """排队期间每秒检查一次当前任务是否已取消或超时。"""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_use >= self._limit:
+                    self._cond.wait(1.0)
+                    cancellation.check()
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+
+    def _try_acquire(self) -> bool:
+        with self._cond:
+            if self._in_use >= self._limit:
+                return False
+            self._in_use += 1
+            return True
+
+    async def aacquire(self) -> None:
+        """协程版 acquire：不阻塞事件循环，按退避间隔重试，期间检查取消/超时。"""
+        if self._try_acquire():
+            return
+        with self._cond:
+            self._waiting += 1
+        try:
+            delay = 0.05
+            while not self._try_acquire():
+                await asyncio.sleep(delay)
+                cancellation.check()
+                delay = min(delay * 2, 0.5)
+        finally:
+            with self._cond:
+                self._waiting -= 1
+
+    def set_limit(self, limit: int) -> None:
+        """运行时调整上限（如 llm_client 按限流反馈自适应）；调小时已占用的名额照常归还，不会被打断。"""
+        with self._cond:
+            self._limit = max(1, limit)
+            self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        t0 = time.monotonic()
+        self.acquire()
+        waited = time.monotonic() - t0
+        if waited > 1:
+            logger.info("%s 并发已满，排队 %.1fs", self.name, waited)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self) -> AsyncIterator[None]:
+        t0 = time.monotonic()
+        await self.aacquire()
+        waited = time.monotonic() - t0
+        if waited > 1:
+            logger.info("%s 并发已满，排队 %.1fs", self.name, waited)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"limit": self._limit, "in_use": self._in_use, "waiting": self._waiting}
+
+
+llm = ResourceLimiter("llm", LLM_CONCURRENCY)
+tts = ResourceLimiter("tts", TTS_CONCURRENCY)
+pdf = ResourceLimiter("pdf", PDF_PARSE_CONCURRENCY)
+
+
+def stats() -> dict[str, dict]:
+    return {lim.name: lim.stats() for lim in (llm, tts, pdf)}
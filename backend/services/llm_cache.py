@@ -0,0 +1,142 @@
+"""LLM 响应的磁盘缓存：键为 (模型, temperature, 提示模板名与版本, 完整提示) 的 SHA-256。
+
+同一 PDF 重新解读、重新生成播客、重复入库的论文，提示完全相同时直接返回上次的结果，不调用模型。
+- 文件布局与 artifacts 相同（LLM_CACHE_DIR/<hex[:2]>/<hex>），写入临时文件后原子改名，多进程可共享；
+- 命中时刷新修改时间，gc() 先删除超过 LLM_CACHE_MAX_AGE_SEC 未使用的条目，再按最久未使用淘汰到 LLM_CACHE_MAX_BYTES 以下；
+- 绕过：LLM_CACHE_ENABLED=false 全局关闭；任务中用 bypass() 跳过读取（仍写入新结果，相当于刷新）。
+"""
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from backend.config import LLM_CACHE_DIR, LLM_CACHE_ENABLED, LLM_CACHE_MAX_AGE_SEC, LLM_CACHE_MAX_BYTES
+from backend.log_config import get_logger
+
+logger = get_logger(__name__)
+
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "writes": 0, "evicted": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+@contextmanager
+def bypass(enabled: bool = True) -> Iterator[None]:
+    """在此范围内（含图节点的线程/协程）跳过缓存读取，新结果仍会写入。"""
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def make_key(template: str, version: int, model: str, temperature: float, prompt: str) -> str:
+    raw = json.dumps(
+        {"template": template, "version": version, "model": model, "temperature": temperature, "prompt": prompt},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> Path:
+    return LLM_CACHE_DIR / key[:2] / key
+
+
+def get(key: str) -> Optional[str]:
+    """命中返回缓存的文本；未启用、被绕过或未命中返回 None。"""
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _bypass.get():
+        _count("bypassed")
+        return None
+    path = _path(key)
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        _count("misses")
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    _count("hits")
+    return text
+
+
+def put(key: str, text: str) -> None:
+    """写入结果；空结果不缓存。"""
+    if not LLM_CACHE_ENABLED or not text.strip():
+        return
+    path = _path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("写入 LLM 缓存失败: %s", e)
+        return
+    _count("writes")
+
+
+def _entries() -> list[tuple[float, int, Path]]:
+    out = []
+    if not LLM_CACHE_DIR.exists():
+        return out
+    for path in LLM_CACHE_DIR.glob("*/*"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        out.append((st.st_mtime, st.st_size, path))
+    return out
+
+
+def gc(max_age_sec: float = LLM_CACHE_MAX_AGE_SEC, max_bytes: int = LLM_CACHE_MAX_BYTES) -> int:
+    """淘汰过期条目，再按最久未使用淘汰到 max_bytes 以下，返回删除数。"""
+    entries = sorted(_entries())
+    cutoff = time.time() - max_age_sec
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    if removed:
+        with _stats_lock:
+            _stats["evicted"] += removed
+        logger.info("清理 LLM 缓存: %s 条", removed)
+    return removed
+
+
+def stats() -> dict:
+    """本进程的命中/未命中计数与缓存目录的条目数、字节数。"""
+    entries = _entries()
+    with _stats_lock:
+        counts = dict(_stats)
+    lookups = counts["hits"] + counts["misses"]
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        **counts,
+        "hit_rate": round(counts["hits"] / lookups, 4) if lookups else None,
+        "entries": len(entries),
+        "bytes": sum(size for _, size, _ in entries),
+        "max_bytes": LLM_CACHE_MAX_BYTES,
+    }
@@ -0,0 +1,361 @@
+"""进程内共享的 LLM 客户端：连接池复用、按配额限速、瞬时错误重试、按限流反馈自适应并发。
+
+- 同步调用共用一个 httpx.Client，协程按事件循环各用一个 httpx.AsyncClient（连接不能跨事件循环），
+  ChatOpenAI 每次调用仍按任务剩余时间设置超时，但不再各自新建连接；
+- LLM_RPM / LLM_TPM 为令牌桶，调用前按估算 token 数预扣，返回后按实际用量多退少补；
+- 429、超时、连接失败与 5xx 按带抖动的指数退避重试（优先遵守 Retry-After），退避期间释放并发名额，
+  重试不超过任务剩余时间；流式调用已输出内容后不再重试，避免重复输出；
+- 遇到 429 时把 limits.llm 的上限减半（冷却期内只减一次），之后每连续成功一轮加一，直到 LLM_CONCURRENCY。
+"""
+import asyncio
+import random
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+from backend.config import (
+    DASHSCOPE_API_KEY,
+    DASHSCOPE_BASE_URL,
+    QWEN_MODEL,
+    LLM_TIMEOUT_SEC,
+    LLM_CONCURRENCY,
+    LLM_RPM,
+    LLM_TPM,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SEC,
+    LLM_RETRY_MAX_SEC,
+    LLM_ADAPTIVE_CONCURRENCY,
+    LLM_HTTP_MAX_CONNECTIONS,
+)
+from backend.log_config import get_logger
+from backend.services import cancellation, chunking, limits
+
+logger = get_logger(__name__)
+
+# 未指定 max_tokens 时预扣的输出 token 数，返回后按实际用量修正
+_COMPLETION_ESTIMATE = 1000
+# 两次并发减半之间的最短间隔（秒）：同一波 429 只算一次；最近一次被限流后这段时间内不加并发
+_DECREASE_COOLDOWN_SEC = 1.0
+_INCREASE_HOLD_SEC = 5.0
+
+_TRANSIENT = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class TokenBucket:
+    """每分钟补充 per_min 个令牌、容量为一分钟用量的令牌桶；per_min<=0 表示不限。
+    单次需求超过容量时等桶满后放行并记为欠账，后续调用等待补足。"""
+
+    def __init__(self, name: str, per_min: int):
+        self.name = name
+        self.per_min = per_min
+        self._tokens = float(per_min)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, n: float) -> float:
+        """令牌足够则扣除并返回 0，否则返回还需等待的秒数。"""
+        if self.per_min <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.per_min, self._tokens + (now - self._updated) * self.per_min / 60)
+            self._updated = now
+            need = min(n, self.per_min)
+            if self._tokens >= need:
+                self._tokens -= n
+                return 0.0
+            return (need - self._tokens) * 60 / self.per_min
+
+    def acquire(self, n: float = 1) -> None:
+        while (wait := self._reserve(n)) > 0:
+            time.sleep(min(wait, 1.0))
+            cancellation.check()
+
+    async def aacquire(self, n: float = 1) -> None:
+        while (wait := self._reserve(n)) > 0:
+            await asyncio.sleep(min(wait, 1.0))
+            cancellation.check()
+
+    def adjust(self, delta: float) -> None:
+        """按实际用量修正预扣：delta>0 补扣，delta<0 退还。"""
+        if self.per_min <= 0 or not delta:
+            return
+        with self._lock:
+            self._tokens = min(self.per_min, self._tokens - delta)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"per_min": self.per_min, "available": round(self._tokens, 1)}
+
+
+class AdaptiveConcurrency:
+    """AIMD：被限流时上限减半，连续成功达到当前上限次数后加一（最近被限流时暂不加），最大不超过 max_limit。"""
+
+    def __init__(self, limiter: limits.ResourceLimiter, max_limit: int, enabled: bool = True):
+        self.limiter = limiter
+        self.max_limit = max(1, max_limit)
+        self.enabled = enabled
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._last_throttled = 0.0
+        self._lock = threading.Lock()
+
+    def on_success(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._successes += 1
+            limit = self.limiter.limit
+            if time.monotonic() - self._last_throttled < _INCREASE_HOLD_SEC:
+                return
+            if limit < self.max_limit and self._successes >= limit:
+                self._successes = 0
+                self.limiter.set_limit(limit + 1)
+
+    def on_throttled(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._successes = 0
+            now = time.monotonic()
+            self._last_throttled = now
+            if now - self._last_decrease < _DECREASE_COOLDOWN_SEC:
+                return
+            self._last_decrease = now
+            limit = self.limiter.limit
+            if limit > 1:
+                self.limiter.set_limit(limit // 2)
+                logger.warning("LLM 被限流，并发上限 %s -> %s", limit, limit // 2)
+
+
+requests_bucket = TokenBucket("requests", LLM_RPM)
+tokens_bucket = TokenBucket("tokens", LLM_TPM)
+concurrency = AdaptiveConcurrency(limits.llm, LLM_CONCURRENCY, LLM_ADAPTIVE_CONCURRENCY)
+
+_stats = {"calls": 0, "retries": 0, "throttled": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+# ---------- 共享连接池 ----------
+
+_http_limits = httpx.Limits(
+    max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS, keepalive_expiry=30
+)
+_client_lock = threading.Lock()
+_sync_client: Optional[httpx.Client] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _http_client() -> httpx.Client:
+    global _sync_client
+    with _client_lock:
+        if _sync_client is None:
+            _sync_client = httpx.Client(limits=_http_limits, timeout=LLM_TIMEOUT_SEC)
+        return _sync_client
+
+
+def _http_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=_http_limits, timeout=LLM_TIMEOUT_SEC)
+            _async_clients[loop] = client
+        return client
+
+
+async def aclose() -> None:
+    """关闭当前事件循环的连接池（API 与异步 worker 退出前调用）。"""
+    with _client_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def close() -> None:
+    global _sync_client
+    with _client_lock:
+        client, _sync_client = _sync_client, None
+    if client is not None:
+        client.close()
+
+
+def chat_model(temperature: float, max_tokens: Optional[int] = None, model: Optional[str] = None, use_async: bool = False) -> ChatOpenAI:
+    """使用共享连接池的 ChatOpenAI；请求超时取 LLM_TIMEOUT_SEC 与当前任务剩余时间的较小者。
+    SDK 自带重试关闭，由本模块统一重试。"""
+    return ChatOpenAI(
+        model=model or QWEN_MODEL,
+        openai_api_key=DASHSCOPE_API_KEY,
+        openai_api_base=DASHSCOPE_BASE_URL,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        timeout=cancellation.remaining(LLM_TIMEOUT_SEC),
+        max_retries=0,
+        stream_usage=True,
+        http_client=None if use_async else _http_client(),
+        http_async_client=_http_async_client() if use_async else None,
+    )
+
+
+# ---------- 限速与重试 ----------
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int, exc: Exception, retryable: bool) -> Optional[float]:
+    """返回重试前的等待秒数；不应重试时返回 None。"""
+    if isinstance(exc, openai.RateLimitError):
+        _count("throttled")
+        concurrency.on_throttled()
+    if not retryable or not isinstance(exc, _TRANSIENT) or attempt >= LLM_MAX_RETRIES:
+        return None
+    delay = random.uniform(0, min(LLM_RETRY_MAX_SEC, LLM_RETRY_BASE_SEC * 2 ** attempt))
+    delay = max(delay, _retry_after(exc) or 0.0)
+    ctx = cancellation.current()
+    if ctx is not None and ctx.deadline is not None and time.time() + delay >= ctx.deadline:
+        return None
+    _count("retries")
+    logger.warning("LLM 调用失败，%.1fs 后第 %s 次重试: %s", delay, attempt + 1, exc)
+    return delay
+
+
+def _cost(prompt: str, max_tokens: Optional[int]) -> int:
+    return chunking.estimate_tokens(prompt) + (max_tokens or _COMPLETION_ESTIMATE)
+
+
+def _settle(cost: int, msg) -> None:
+    _count("calls")
+    concurrency.on_success()
+    usage = getattr(msg, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        tokens_bucket.adjust(int(usage["total_tokens"]) - cost)
+
+
+def _failed(exc: BaseException) -> None:
+    if not isinstance(exc, cancellation.Cancelled):
+        _count("failed")
+
+
+def _run(prompt: str, max_tokens: Optional[int], attempt: Callable[[], object], retryable: Callable[[], bool]):
+    cost = _cost(prompt, max_tokens)
+    for n in range(LLM_MAX_RETRIES + 1):
+        requests_bucket.acquire()
+        tokens_bucket.acquire(cost)
+        try:
+            with limits.llm.slot():
+                msg = attempt()
+        except Exception as e:
+            delay = _backoff(n, e, retryable())
+            if delay is None:
+                _failed(e)
+                raise
+            time.sleep(delay)
+            cancellation.check()
+            continue
+        _settle(cost, msg)
+        return msg
+
+
+async def _arun(prompt: str, max_tokens: Optional[int], attempt, retryable: Callable[[], bool]):
+    cost = _cost(prompt, max_tokens)
+    for n in range(LLM_MAX_RETRIES + 1):
+        await requests_bucket.aacquire()
+        await tokens_bucket.aacquire(cost)
+        try:
+            async with limits.llm.aslot():
+                msg = await attempt()
+        except Exception as e:
+            delay = _backoff(n, e, retryable())
+            if delay is None:
+                _failed(e)
+                raise
+            await asyncio.sleep(delay)
+            cancellation.check()
+            continue
+        _settle(cost, msg)
+        return msg
+
+
+def invoke(prompt: str, temperature: float, max_tokens: Optional[int] = None):
+    """单次调用，返回 AIMessage。"""
+    return _run(
+        prompt, max_tokens,
+        lambda: chat_model(temperature, max_tokens).invoke(prompt),
+        lambda: True,
+    )
+
+
+async def ainvoke(prompt: str, temperature: float, max_tokens: Optional[int] = None):
+    async def attempt():
+        return await chat_model(temperature, max_tokens, use_async=True).ainvoke(prompt)
+    return await _arun(prompt, max_tokens, attempt, lambda: True)
+
+
+def stream(prompt: str, on_chunk: Callable[[str], None], temperature: float, max_tokens: Optional[int] = None):
+    """流式调用：每段文本调用 on_chunk，段间检查取消；返回聚合后的消息（无输出时为 None）。"""
+    emitted = False
+
+    def attempt():
+        nonlocal emitted
+        full = None
+        for chunk in chat_model(temperature, max_tokens).stream(prompt):
+            full = chunk if full is None else full + chunk
+            if chunk.content:
+                emitted = True
+                on_chunk(chunk.content)
+            cancellation.check()
+        return full
+
+    return _run(prompt, max_tokens, attempt, lambda: not emitted)
+
+
+async def astream(prompt: str, on_chunk: Callable[[str], None], temperature: float, max_tokens: Optional[int] = None):
+    emitted = False
+
+    async def attempt():
+        nonlocal emitted
+        full = None
+        async for chunk in chat_model(temperature, max_tokens, use_async=True).astream(prompt):
+            full = chunk if full is None else full + chunk
+            if chunk.content:
+                emitted = True
+                on_chunk(chunk.content)
+            cancellation.check()
+        return full
+
+    return await _arun(prompt, max_tokens, attempt, lambda: not emitted)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        counts = dict(_stats)
+    return {
+        **counts,
+        "concurrency": limits.llm.limit,
+        "max_concurrency": concurrency.max_limit,
+        "rpm": requests_bucket.stats(),
+        "tpm": tokens_bucket.stats(),
+    }
@@ -0,0 +1,169 @@
+"""流水线埋点：每个图节点的耗时、LLM token、TTS 字符数、下载字节数与错误。
+
+与 cancellation 相同，用 contextvars 传递：worker 执行任务时 bind() 一个 RunMetrics，
+图节点由 instrument() 包装，节点内的 LLM/TTS/下载代码调用 add() 累加到当前节点。
+任务结束时由 task_queue 写入 task_metrics 表（每次执行每个节点一行），/api/tasks/metrics 汇总。
+不在任务中执行时（如同步 API 请求）add() 为空操作。
+"""
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from backend.config import LLM_PRICE_PROMPT_PER_1K, LLM_PRICE_COMPLETION_PER_1K, TTS_PRICE_PER_1K_CHARS
+from backend.log_config import get_logger
+
+logger = get_logger(__name__)
+
+# 计数字段，与 task_metrics 表的列一致
+COUNTERS = ("llm_calls", "prompt_tokens", "completion_tokens", "tts_chars", "bytes_downloaded")
+
+# 节点之外（如采集任务中的 PDF 下载）的计数记在该名下
+TASK_SCOPE = "task"
+
+
+class NodeMetrics:
+    def __init__(self, node: str):
+        self.node = node
+        self.wall_ms = 0.0
+        self.error: Optional[str] = None
+        self.counts = dict.fromkeys(COUNTERS, 0)
+
+    def to_dict(self) -> dict:
+        return {"node": self.node, "wall_ms": round(self.wall_ms, 1), "error": self.error, **self.counts}
+
+
+class RunMetrics:
+    """一次任务执行的全部节点记录；并行节点在不同线程/协程中写入，追加时加锁。"""
+
+    def __init__(self):
+        self.nodes: list[NodeMetrics] = []
+        self._task_scope: Optional[NodeMetrics] = None
+        self._lock = threading.Lock()
+
+    def start(self, node: str) -> NodeMetrics:
+        rec = NodeMetrics(node)
+        with self._lock:
+            self.nodes.append(rec)
+        return rec
+
+    def task_scope(self) -> NodeMetrics:
+        with self._lock:
+            if self._task_scope is None:
+                self._task_scope = NodeMetrics(TASK_SCOPE)
+                self.nodes.append(self._task_scope)
+            return self._task_scope
+
+    def records(self) -> list[dict]:
+        with self._lock:
+            return [r.to_dict() for r in self.nodes]
+
+
+# 节点内也可能多线程累加（如长文解读的并发 map 调用）
+_add_lock = threading.Lock()
+
+_run: contextvars.ContextVar[Optional[RunMetrics]] = contextvars.ContextVar("run_metrics", default=None)
+_node: contextvars.ContextVar[Optional[NodeMetrics]] = contextvars.ContextVar("node_metrics", default=None)
+
+
+@contextmanager
+def bind(run: RunMetrics) -> Iterator[RunMetrics]:
+    token = _run.set(run)
+    try:
+        yield run
+    finally:
+        _run.reset(token)
+
+
+def add(counter: str, n: int | float = 1) -> None:
+    """累加到当前节点（节点外则记到任务级 TASK_SCOPE）；不在任务中时忽略。"""
+    rec = _node.get()
+    if rec is None:
+        run = _run.get()
+        if run is None:
+            return
+        rec = run.task_scope()
+    with _add_lock:
+        rec.counts[counter] += n
+
+
+def record_error(message: str) -> None:
+    """记录当前节点中被降级处理（未写入 state.error）的失败，如预取相关论文失败。"""
+    rec = _node.get()
+    if rec is not None and rec.error is None:
+        rec.error = message
+
+
+def add_llm_usage(msg: Any) -> None:
+    """从 LangChain AIMessage.usage_metadata 记录一次 LLM 调用的 token 数。"""
+    add("llm_calls")
+    usage = getattr(msg, "usage_metadata", None) or {}
+    add("prompt_tokens", int(usage.get("input_tokens") or 0))
+    add("completion_tokens", int(usage.get("output_tokens") or 0))
+
+
+def cost(counts: dict) -> float:
+    """按 LLM_PRICE_* / TTS_PRICE_* 估算费用（未配置单价时为 0）。"""
+    return round(
+        (counts.get("prompt_tokens") or 0) / 1000 * LLM_PRICE_PROMPT_PER_1K
+        + (counts.get("completion_tokens") or 0) / 1000 * LLM_PRICE_COMPLETION_PER_1K
+        + (counts.get("tts_chars") or 0) / 1000 * TTS_PRICE_PER_1K_CHARS,
+        6,
+    )
+
+
+def _begin(name: str) -> tuple[Optional[NodeMetrics], Optional[contextvars.Token]]:
+    run = _run.get()
+    if run is None:
+        return None, None
+    rec = run.start(name)
+    return rec, _node.set(rec)
+
+
+def _end(rec: Optional[NodeMetrics], token, t0: float, state: dict, out: Any, exc: Optional[BaseException]) -> None:
+    if rec is None:
+        return
+    _node.reset(token)
+    rec.wall_ms = (time.perf_counter() - t0) * 1000
+    if exc is not None:
+        rec.error = f"{type(exc).__name__}: {exc}"
+    elif isinstance(out, dict) and out.get("error") and not state.get("error"):
+        rec.error = str(out["error"])
+    logger.debug("节点 %s 耗时 %.0fms %s", rec.node, rec.wall_ms, rec.counts)
+
+
+def instrument(name: str, fn: Callable) -> Callable:
+    """包装图节点（同步函数或协程函数），记录到当前任务的 RunMetrics。"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def awrapper(state):
+            rec, token = _begin(name)
+            t0 = time.perf_counter()
+            out = exc = None
+            try:
+                out = await fn(state)
+                return out
+            except BaseException as e:
+                exc = e
+                raise
+            finally:
+                _end(rec, token, t0, state, out, exc)
+        return awrapper
+
+    @functools.wraps(fn)
+    def wrapper(state):
+        rec, token = _begin(name)
+        t0 = time.perf_counter()
+        out = exc = None
+        try:
+            out = fn(state)
+            return out
+        except BaseException as e:
+            exc = e
+            raise
+        finally:
+            _end(rec, token, t0, state, out, exc)
+    return wrapper
@@ -0,0 +1,79 @@
+"""PDF 解析结果缓存：键为 PDF 内容的 SHA-256 与解析器版本（pdf_parser.PARSER_VERSION、正文字符上限）。
+
+PDF 上传或下载后不再变化，重新解读、重新生成播客、重建全文索引时直接读取上次的解析结果，不再调用 PyMuPDF。
+- 文件为 gzip 压缩的 JSON：PARSE_CACHE_DIR/<hex[:2]>/<hex>.<版本>.json.gz，写入临时文件后原子改名；
+- 解析器版本变化时旧条目不再命中；删除论文时 invalidate_file() 删除该 PDF 各版本的条目。
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from backend.config import PARSE_CACHE_DIR, PARSE_CACHE_ENABLED
+from backend.log_config import get_logger
+
+logger = get_logger(__name__)
+
+_READ_CHUNK = 1024 * 1024
+
+
+def file_sha256(path: str | Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_READ_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _path(digest: str, version: str) -> Path:
+    return PARSE_CACHE_DIR / digest[:2] / f"{digest}.{version}.json.gz"
+
+
+def get(digest: str, version: str) -> Optional[dict[str, Any]]:
+    if not PARSE_CACHE_ENABLED:
+        return None
+    try:
+        data = _path(digest, version).read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        return json.loads(gzip.decompress(data))
+    except (OSError, ValueError) as e:
+        logger.warning("解析缓存损坏，忽略 %s: %s", digest, e)
+        return None
+
+
+def put(digest: str, version: str, result: dict[str, Any]) -> None:
+    if not PARSE_CACHE_ENABLED:
+        return
+    path = _path(digest, version)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+        tmp.write_bytes(gzip.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"), compresslevel=6))
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("写入解析缓存失败: %s", e)
+
+
+def invalidate(digest: str) -> int:
+    """删除该 PDF 所有解析器版本的条目，返回删除数。"""
+    removed = 0
+    for path in (PARSE_CACHE_DIR / digest[:2]).glob(f"{digest}.*.json.gz"):
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def invalidate_file(path: str | Path) -> int:
+    """按 PDF 文件内容失效（删除论文时在删除 PDF 之前调用）；文件不存在时忽略。"""
+    try:
+        return invalidate(file_sha256(path))
+    except OSError:
+        return 0
@@ -0,0 +1,286 @@
+"""PDF 版面结构识别：依据 PyMuPDF 给出的字号与粗体信息识别标题、摘要、关键词、章节标题、参考文献与图表标题。
+
+输入为按页的行列表 [(text, size, bold)]，输出章节列表（按原文顺序；parent 为上级章节下标，-1 表示顶层，构成章节树），
+每个章节带其正文在 raw_text 中的字符区间 [start, end) 与类型 kind：
+front（首个标题之前）、abstract、body、references、acknowledgements、appendix。
+识别不出任何章节标题时 sections 为空，由 chunking 退回纯文本启发式。
+"""
+import re
+from collections import Counter
+from typing import Any, Iterable, Optional
+
+from backend.services import chunking
+
+Line = tuple[str, float, bool]
+
+_KINDS = (
+    ("abstract", re.compile(r"abstract|摘\s*要", re.I)),
+    ("references", re.compile(r"references|bibliography|参考文献", re.I)),
+    ("acknowledgements", re.compile(r"acknowledg(?:e)?ments?|致\s*谢", re.I)),
+    ("appendix", re.compile(r"appendi(?:x|ces)(?:\s+[A-Z0-9]{1,3})?(?:\s*[:.]\s*.*)?|supplementary materials?|附\s*录.*", re.I)),
+)
+_NUMBERED = re.compile(r"(\d{1,2}(?:\.\d{1,2}){0,3})\.?\s+(\S.*)")
+_ROMAN = re.compile(r"([IVX]{1,5})\.\s+(\S.*)")
+_LETTERED = re.compile(r"([A-H](?:\.\d{1,2}){0,2})\.?\s+([A-Z].*)")  # 附录编号 "A Proofs"、"B.1 Setup"
+_CAPTION = re.compile(r"(fig(?:ure)?\.?|table|图|表)\s*(\d{1,3}[a-z]?)\s*[.:：|]", re.I)
+_KEYWORDS = re.compile(r"(?:keywords|key words|index terms|关键词)\s*[:：—–-]?\s*", re.I)
+_INLINE_ABSTRACT = re.compile(r"abstract\s*[—–:.-]\s*(?=\S)", re.I)
+
+# 相对正文字号的放大比例：达到即视为标题字号
+_HEADING_SCALE = 1.12
+_TITLE_SCALE = 1.3
+
+
+def _kind_of(title: str) -> Optional[str]:
+    for kind, pattern in _KINDS:
+        if pattern.fullmatch(title):
+            return kind
+    return None
+
+
+def _numbering(text: str) -> tuple[Optional[str], str]:
+    """拆出章节编号："3.2 Training" → ("3.2", "Training")；无编号返回 (None, text)。"""
+    for pattern in (_NUMBERED, _ROMAN):
+        m = pattern.fullmatch(text)
+        if m:
+            return m.group(1), m.group(2)
+    return None, text
+
+
+def _body_size(lines: Iterable[Line]) -> float:
+    """正文字号：按字符数加权出现最多的字号。"""
+    sizes: Counter = Counter()
+    for text, size, _ in lines:
+        sizes[round(size, 1)] += len(text)
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def _running_lines(pages: list[list[Line]]) -> set[str]:
+    """页眉页脚：去掉数字后在半数以上页面重复出现的行（至少 3 页）。"""
+    if len(pages) < 3:
+        return set()
+    seen: Counter = Counter()
+    for page in pages:
+        seen.update({re.sub(r"\d+", "#", t.strip()) for t, _, _ in page if t.strip()})
+    return {k for k, n in seen.items() if n >= max(3, len(pages) // 2)}
+
+
+class _Heading:
+    __slots__ = ("index", "title", "number", "size", "bold", "kind", "level")
+
+    def __init__(self, index: int, title: str, number: Optional[str], size: float, bold: bool, kind: Optional[str]):
+        self.index = index
+        self.title = title
+        self.number = number
+        self.size = size
+        self.bold = bold
+        self.kind = kind
+        self.level = 1
+
+
+def _heading(text: str, size: float, bold: bool, body: float, after_refs: bool) -> Optional[tuple[Optional[str], str, Optional[str]]]:
+    """判断一行是否为章节标题，返回 (编号, 标题, kind)。"""
+    s = text.strip().rstrip(":：").strip()
+    if not s or len(s) > 100 or len(s.split()) > 12 or s.endswith((".", "。", ",", "，", ";", "；")):
+        return None
+    if re.fullmatch(r"[\d.\s]+", s) or _CAPTION.match(s):
+        return None
+    styled = size >= body * _HEADING_SCALE or bold
+    number, title = _numbering(s)
+    if number is None and after_refs and styled:
+        m = _LETTERED.fullmatch(s)
+        if m:
+            return m.group(1), m.group(2), "appendix"
+    kind = _kind_of(title)
+    if kind:
+        return number, title, kind
+    if not (title[:1].isupper() or re.match(r"[一-鿿]", title)):
+        return None
+    if number is not None:
+        return (number, title, None) if styled or chunking.looks_like_heading(s) else None
+    # 无编号标题需明显大于正文字号，仅粗体的短行多为段落小标题或作者名
+    return (None, title, None) if size >= body * _HEADING_SCALE else None
+
+
+def _assign_levels(headings: list[_Heading]) -> None:
+    """编号标题按编号层级；无编号标题参照同字号编号标题的层级，否则按字号从大到小排序定级（最多 3 级）。"""
+    by_size: dict[float, int] = {}
+    for h in headings:
+        if h.number is not None:
+            depth = h.number.count(".") + 1
+            h.level = depth
+            key = round(h.size, 1)
+            by_size[key] = min(by_size.get(key, depth), depth)
+    free_sizes = sorted({round(h.size, 1) for h in headings if h.number is None} - set(by_size), reverse=True)
+    for h in headings:
+        if h.number is not None:
+            continue
+        key = round(h.size, 1)
+        if h.kind:
+            h.level = 1
+        elif key in by_size:
+            h.level = by_size[key]
+        else:
+            h.level = min(3, free_sizes.index(key) + 1)
+
+
+def _title(first_page: list[tuple[int, Line]], body: float, stop: int) -> tuple[str, set[int]]:
+    """首页在首个章节标题之前字号最大的连续几行作为论文标题。"""
+    candidates = [(i, line) for i, line in first_page if i < stop and line[0].strip()][:20]
+    if not candidates:
+        return "", set()
+    top = max(line[1] for _, line in candidates)
+    if top < body * _TITLE_SCALE:
+        return "", set()
+    picked = [(i, line[0].strip()) for i, line in candidates if abs(line[1] - top) < 0.6]
+    run = [picked[0]]
+    for item in picked[1:]:
+        if item[0] != run[-1][0] + 1:
+            break
+        run.append(item)
+    return " ".join(t for _, t in run)[:500], {i for i, _ in run}
+
+
+def _keywords(text: str) -> list[str]:
+    parts = re.split(r"[,;，；·•]|\s{2,}|\s[—–-]\s", text)
+    return [p.strip().rstrip(".") for p in parts if 1 < len(p.strip()) <= 80][:20]
+
+
+def analyze(pages: list[list[Line]], max_chars: Optional[int] = None) -> dict[str, Any]:
+    """识别版面结构，返回 title、abstract、keywords、sections、captions 与 raw_text（各区间均以 raw_text 为准）。"""
+    # 与逐页纯文本提取的拼接方式一致：每行以换行结尾，页与页之间空两行
+    flat: list[tuple[int, int, Line]] = []  # (页码, raw_text 中的起始位置, 行)
+    parts: list[str] = []
+    pos = 0
+    for p, page in enumerate(pages):
+        if p:
+            parts.append("\n\n")
+            pos += 2
+        for line in page:
+            flat.append((p, pos, line))
+            parts.append(line[0] + "\n")
+            pos += len(line[0]) + 1
+    raw_text = "".join(parts)
+    if max_chars is not None:
+        raw_text = raw_text[:max_chars]
+    limit = len(raw_text)
+    if not flat:
+        return {"title": "", "abstract": "", "keywords": [], "sections": [], "captions": [], "raw_text": raw_text}
+
+    body = _body_size(line for _, _, line in flat)
+    running = _running_lines(pages)
+
+    headings: list[_Heading] = []
+    captions: list[dict] = []
+    keywords: list[str] = []
+    keyword_start: Optional[int] = None
+    inline_abstract: Optional[tuple[int, int]] = None  # (行下标, 摘要正文起始位置)
+    anchored = False  # 已出现编号标题或固定名称标题
+    after_refs = False
+    for i, (p, start, (text, size, bold)) in enumerate(flat):
+        if start >= limit:
+            break
+        s = text.strip()
+        if not s or re.sub(r"\d+", "#", s) in running:
+            continue
+        m = _CAPTION.match(s)
+        if m:
+            captions.append({"label": f"{m.group(1).rstrip('.').capitalize()} {m.group(2)}", "text": s[:500], "page": p, "start": start})
+            continue
+        if not keywords and p <= 1:
+            m = _KEYWORDS.match(s)
+            if m and len(s) > m.end():
+                keywords = _keywords(s[m.end():])
+                keyword_start = start
+                continue
+        if not anchored and p <= 1:
+            m = _INLINE_ABSTRACT.match(s)
+            if m:
+                # "Abstract—We propose ..."：摘要与标题同行
+                inline_abstract = (i, start + len(text) - len(text.lstrip()) + m.end())
+                headings.append(_Heading(i, "Abstract", None, size, bold, "abstract"))
+                anchored = True
+                continue
+        found = _heading(text, size, bold, body, after_refs)
+        if found is None:
+            continue
+        number, title, kind = found
+        prev = headings[-1] if headings else None
+        # 换行的长标题：紧接上一标题、字号相同且本行无编号，并入上一标题
+        if prev is not None and prev.index == i - 1 and number is None and kind is None and abs(prev.size - size) < 0.2 and prev.bold == bold and not prev.kind:
+            prev.title = f"{prev.title} {title}"
+            prev.index = i
+            continue
+        headings.append(_Heading(i, title, number, size, bold, kind))
+        anchored = anchored or number is not None or kind is not None
+        if kind == "references":
+            after_refs = True
+
+    # 首个编号标题或摘要等固定名称标题之前的大字号行（标题、作者、单位）属于首页信息，不作为章节
+    anchor = next((h.index for h in headings if h.number is not None or h.kind), None)
+    if anchor is not None:
+        headings = [h for h in headings if h.index >= anchor]
+    first_page = [(i, line) for i, (p, _, line) in enumerate(flat) if p == 0]
+    title, title_lines = _title(first_page, body, anchor if anchor is not None else len(flat))
+    headings = [h for h in headings if h.index not in title_lines]
+    _assign_levels(headings)
+
+    sections: list[dict] = []
+    if headings:
+        first = flat[headings[0].index][1]
+        if first > 0 and raw_text[:first].strip():
+            sections.append(_section("", 0, "front", -1, 0, first, raw_text, 0))
+        stack: list[tuple[int, int, Optional[str]]] = []  # (level, sections 下标, kind)
+        seen_refs = False
+        for n, h in enumerate(headings):
+            p, line_start, line = flat[h.index]
+            if inline_abstract is not None and inline_abstract[0] == h.index:
+                start = inline_abstract[1]
+            else:
+                start = line_start + len(line[0]) + 1
+            end = flat[headings[n + 1].index][1] if n + 1 < len(headings) else limit
+            start, end = min(start, limit), min(end, limit)
+            while stack and stack[-1][0] >= h.level:
+                stack.pop()
+            parent = stack[-1][1] if stack else -1
+            # 未显式标注类型的子章节继承上级章节类型（参考文献、附录下的小节）；参考文献之后的章节视为附录
+            if h.kind:
+                kind = h.kind
+            elif stack and stack[-1][2] in ("references", "appendix"):
+                kind = stack[-1][2]
+            else:
+                kind = "appendix" if seen_refs else "body"
+            seen_refs = seen_refs or kind == "references"
+            heading = f"{h.number} {h.title}" if h.number else h.title
+            sections.append(_section(heading, h.level, kind, parent, start, end, raw_text, p))
+            stack.append((h.level, len(sections) - 1, kind))
+
+    abstract = ""
+    for sec in sections:
+        if sec["kind"] == "abstract":
+            end = sec["end"]
+            if keyword_start is not None and sec["start"] <= keyword_start < end:
+                end = keyword_start
+            abstract = raw_text[sec["start"]:end].strip()[:3000]
+            break
+    return {
+        "title": title,
+        "abstract": abstract,
+        "keywords": keywords,
+        "sections": sections,
+        "captions": [c for c in captions if c["start"] < limit],
+        "raw_text": raw_text,
+    }
+
+
+def _section(heading: str, level: int, kind: str, parent: int, start: int, end: int, raw_text: str, page: int) -> dict:
+    return {
+        "heading": heading,
+        "level": level,
+        "kind": kind,
+        "parent": parent,
+        "page": page,
+        "start": start,
+        "end": end,
+        "text": raw_text[start:end].strip(),
+    }
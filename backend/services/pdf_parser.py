@@ -1,44 +1,185 @@
-"""PDF 解析：PyMuPDF 提取文本与基础结构。"""
+"""PDF 解析：PyMuPDF 提取文本与版面结构（章节、摘要、关键词、图表标题，见 pdf_layout）。
+
+iter_pages() 按页顺序惰性产出每页的行（文本、字号、是否粗体），达到字符预算即停止，不提取后续页面；页数较多时按页段分给进程池并行提取，
+同时只提交有限个页段，调用方提前停止时未开始的页段直接取消。
+"""
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, Optional
 
 import fitz  # PyMuPDF
 
+from backend.config import (
+    PDF_MAX_TEXT_CHARS,
+    PDF_PARSE_PROCESSES,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_PAGES_PER_TASK,
+)
+from backend.log_config import get_logger
+from backend.services import cancellation, limits, pdf_layout
+
+logger = get_logger(__name__)
+
+# 解析器版本：提取逻辑或输出结构变化时递增，使 parse_cache 中的旧结果失效
+PARSER_VERSION = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def cache_version() -> str:
+    """parse_cache 的版本键：解析器版本与正文字符上限，任一变化都需重新解析。"""
+    return f"v{PARSER_VERSION}-{PDF_MAX_TEXT_CHARS}"
+
 
 def parse_pdf(pdf_path: str | Path) -> dict[str, Any]:
     """
-    解析 PDF，返回统一结构：title, authors, abstract, keywords, sections, raw_text。
-    V0.1 简化：从首页和后续页提取文本，尝试识别标题与摘要。
+    解析 PDF，返回统一结构：title, authors, abstract, keywords, sections, captions, raw_text。
+    sections 为带层级、类型与 raw_text 字符区间的章节列表；正文最多提取 PDF_MAX_TEXT_CHARS 字。
     """
     path = Path(pdf_path)
     if not path.exists():
         raise FileNotFoundError(f"PDF not found: {path}")
+    with limits.pdf.slot():
+        return _parse(path)
+
+
+def _parse(path: Path) -> dict[str, Any]:
+    pages = list(iter_pages(path, max_chars=PDF_MAX_TEXT_CHARS))
+    layout = pdf_layout.analyze(pages, max_chars=PDF_MAX_TEXT_CHARS)
+    raw_text = layout["raw_text"]
+    title = layout["title"]
+    abstract = layout["abstract"]
+    # 版面识别不出标题/摘要时退回首页分段启发式
+    if pages and (not title or not abstract):
+        blocks = "".join(text + "\n" for text, _, _ in pages[0]).strip().split("\n\n")
+        if not title and blocks:
+            title = blocks[0].strip()[:500]
+        if not abstract and len(blocks) > 1:
+            abstract = "\n\n".join(blocks[1:4])[:3000]
+    # 若未识别到摘要，用前 3000 字
+    if not abstract and raw_text:
+        abstract = raw_text[:3000]
+    return {
+        "title": title or "Untitled",
+        "authors": "",
+        "abstract": abstract,
+        "keywords": layout["keywords"],
+        "sections": layout["sections"],
+        "captions": layout["captions"],
+        "raw_text": raw_text,
+    }
+
+
+def iter_pages(pdf_path: str | Path, max_chars: Optional[int] = None) -> Iterator[list[pdf_layout.Line]]:
+    """按页顺序产出每页的行 [(text, size, bold)]；累计达到 max_chars 字后停止。页间检查任务是否已取消或超时。"""
+    path = str(pdf_path)
+    doc = fitz.open(path)
+    try:
+        n_pages = doc.page_count
+    finally:
+        doc.close()
+    total = 0
+    pages = _page_texts(path, n_pages)
+    try:
+        for lines in pages:
+            yield lines
+            total += sum(len(text) + 1 for text, _, _ in lines)
+            if max_chars is not None and total >= max_chars:
+                return
+            cancellation.check()
+    finally:
+        pages.close()
+
+
+def _page_lines(page: "fitz.Page") -> list[pdf_layout.Line]:
+    """一页的文本行；字号与粗体取该行字符最多的片段。"""
+    lines = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for line in block.get("lines", ()):
+            spans = [span for span in line["spans"] if span["text"]]
+            if not spans:
+                continue
+            main = max(spans, key=lambda span: len(span["text"].strip()))
+            bold = bool(main["flags"] & fitz.TEXT_FONT_BOLD) or "bold" in main["font"].lower()
+            lines.append(("".join(span["text"] for span in spans), round(main["size"], 1), bold))
+    return lines
+
+
+def _extract_range(path: str, start: int, end: int) -> list[list[pdf_layout.Line]]:
+    """子进程中执行：提取 [start, end) 页的文本行。"""
     doc = fitz.open(path)
     try:
-        full_text_parts = []
-        # 尝试取首页前几段作为标题/摘要（启发式）
-        title = ""
-        abstract = ""
-        for i, page in enumerate(doc):
-            text = page.get_text()
-            full_text_parts.append(text)
-            if i == 0:
-                blocks = text.strip().split("\n\n")
-                if blocks:
-                    title = blocks[0].strip()[:500]
-                if len(blocks) > 1:
-                    abstract = "\n\n".join(blocks[1:4])[:3000]
-        raw_text = "\n\n".join(full_text_parts)
-        # 若未识别到摘要，用前 3000 字
-        if not abstract and raw_text:
-            abstract = raw_text[:3000]
-        return {
-            "title": title or "Untitled",
-            "authors": "",
-            "abstract": abstract,
-            "keywords": [],
-            "sections": [],
-            "raw_text": raw_text[:50000],
-        }
+        return [_page_lines(doc[i]) for i in range(start, end)]
     finally:
         doc.close()
+
+
+def _executor() -> Optional[ProcessPoolExecutor]:
+    """进程池（spawn 启动，避免在多线程进程中 fork）；PDF_PARSE_PROCESSES<=1 时不启用。"""
+    global _pool
+    if PDF_PARSE_PROCESSES <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_PARSE_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    """关闭进程池（进程退出前或子进程异常退出后调用，下次使用时重建）。"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _result(future: Future) -> list[list[pdf_layout.Line]]:
+    """等待页段结果，期间每秒检查一次取消/超时。"""
+    while True:
+        try:
+            return future.result(timeout=1.0)
+        except FutureTimeout:
+            cancellation.check()
+
+
+def _page_texts(path: str, n_pages: int) -> Iterator[list[pdf_layout.Line]]:
+    pool = _executor()
+    if pool is None or n_pages < PDF_PARALLEL_MIN_PAGES:
+        doc = fitz.open(path)
+        try:
+            for i in range(n_pages):
+                yield _page_lines(doc[i])
+        finally:
+            doc.close()
+        return
+
+    step = max(1, PDF_PAGES_PER_TASK)
+    ranges = iter([(s, min(s + step, n_pages)) for s in range(0, n_pages, step)])
+    window: deque[Future] = deque()
+    try:
+        # 只预先提交 2 倍进程数的页段：调用方提前停止时，后面的页不会被提取
+        for start, end in ranges:
+            window.append(pool.submit(_extract_range, path, start, end))
+            if len(window) >= PDF_PARSE_PROCESSES * 2:
+                break
+        while window:
+            texts = _result(window.popleft())
+            nxt = next(ranges, None)
+            if nxt is not None:
+                window.append(pool.submit(_extract_range, path, *nxt))
+            yield from texts
+    except BrokenProcessPool:
+        logger.warning("PDF 提取进程池异常退出，下次解析时重建")
+        shutdown()
+        raise
+    finally:
+        for f in window:
+            f.cancel()
@@ -1,29 +1,47 @@
-"""Qwen API（DashScope OpenAI 兼容）用于解读与播客稿。"""
-from typing import Optional
+"""Qwen API（DashScope OpenAI 兼容）用于解读与播客稿。结果经 llm_cache 缓存，提示不变时不重复调用模型。
 
-from langchain_openai import ChatOpenAI
+解读覆盖全文（不含参考文献、致谢与附录）：正文较短时单次调用；较长时先按章节切片并发提炼要点（map），再据要点生成报告（reduce）。
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
-from backend.config import DASHSCOPE_API_KEY, DASHSCOPE_BASE_URL, QWEN_MODEL
+from backend.config import (
+    QWEN_MODEL,
+    INTERPRET_DIRECT_MAX_TOKENS,
+    INTERPRET_CHUNK_TOKENS,
+    INTERPRET_TOKEN_BUDGET,
+    INTERPRET_MAP_CONCURRENCY,
+    INTERPRET_NOTE_MAX_TOKENS,
+)
+from backend.services import cancellation, chunking, llm_cache, llm_client, metrics
 
 
-def get_llm(
-    model: Optional[str] = None,
-    temperature: float = 0.3,
-) -> ChatOpenAI:
-    return ChatOpenAI(
-        model=model or QWEN_MODEL,
-        openai_api_key=DASHSCOPE_API_KEY,
-        openai_api_base=DASHSCOPE_BASE_URL,
-        temperature=temperature,
-    )
+# 提示模板版本：修改模板措辞或结构时递增，使旧缓存失效
+INTERPRETATION_PROMPT_VERSION = 2
+INTERPRETATION_MAP_PROMPT_VERSION = 1
+PODCAST_PROMPT_VERSION = 1
 
+_INTERPRETATION_TEMPERATURE = 0.3
+_PODCAST_TEMPERATURE = 0.5
 
-def generate_interpretation(parse_result: dict) -> str:
-    """根据解析结果生成结构化中文解读（Markdown）。"""
-    llm = get_llm()
+
+def _content(msg) -> str:
+    metrics.add_llm_usage(msg)
+    return msg.content if hasattr(msg, "content") else str(msg)
+
+
+def _interpretation_prompt(parse_result: dict, notes: Optional[list[str]] = None) -> str:
+    """notes 为空时直接附上正文（短文）；否则附上各片段的要点（长文 map 阶段的输出）。"""
     title = parse_result.get("title", "")
     abstract = parse_result.get("abstract", "")[:4000]
-    raw_preview = (parse_result.get("raw_text") or "")[:6000]
+    if notes is None:
+        body_title = "正文"
+        body = chunking.truncate_tokens(chunking.body_text(parse_result), INTERPRET_DIRECT_MAX_TOKENS)
+    else:
+        body_title = "全文分段要点（按原文顺序）"
+        body = "\n\n".join(f"## 片段 {i + 1}\n{note}" for i, note in enumerate(notes))
 
     prompt = f"""你是一位学术论文解读助手。请根据以下论文信息，生成一份结构化的中文解读报告（Markdown 格式）。
 
@@ -33,8 +51,8 @@ def generate_interpretation(parse_result: dict) -> str:
 # 摘要
 {abstract}
 
-# 正文片段（部分）
-{raw_preview}
+# {body_title}
+{body}
 
 请按以下结构输出 Markdown，不要省略章节标题：
 1. **研究背景与动机**
@@ -46,13 +64,105 @@ def generate_interpretation(parse_result: dict) -> str:
 7. **一句话总结**
 
 只输出 Markdown 正文，不要输出代码块标记。"""
-    msg = llm.invoke(prompt)
-    return msg.content if hasattr(msg, "content") else str(msg)
+    return prompt
 
 
-def generate_podcast_script(interpretation_md: str) -> str:
-    """将解读 Markdown 改写成口语化播客稿（分段、可朗读）。"""
-    llm = get_llm(temperature=0.5)
+def _map_prompt(title: str, chunk: chunking.Chunk, index: int, total: int) -> str:
+    sections = "、".join(chunk.headings) or "（未识别到章节标题）"
+    return f"""你在协助解读论文《{title}》。下面是正文的第 {index + 1}/{total} 个片段，包含章节：{sections}。
+请用中文提炼该片段的要点，供之后汇总成完整解读报告：
+- 研究动机、问题设定、方法细节（模型结构、关键公式的含义、训练/推理流程）
+- 实验设置、数据集、主要数字结果与对比结论
+- 作者提到的局限与未来工作
+只写片段中实际出现的信息，没有的方面直接省略；用简洁的条目列出，不超过 400 字。
+
+# 片段
+{chunk.text}"""
+
+
+def _plan(parse_result: dict) -> Optional[list[chunking.Chunk]]:
+    """正文较短返回 None（单次调用）；否则返回切分并按 token 预算截短后的片段。"""
+    if chunking.estimate_tokens(chunking.body_text(parse_result)) <= INTERPRET_DIRECT_MAX_TOKENS:
+        return None
+    chunks = chunking.chunk_paper(parse_result, INTERPRET_CHUNK_TOKENS)
+    if len(chunks) <= 1:
+        return None
+    return chunking.fit_budget(chunks, INTERPRET_TOKEN_BUDGET)
+
+
+def _map_key(prompt: str) -> str:
+    return llm_cache.make_key(
+        "interpretation_map", INTERPRETATION_MAP_PROMPT_VERSION, QWEN_MODEL, _INTERPRETATION_TEMPERATURE, prompt
+    )
+
+
+def _summarize_chunk(prompt: str) -> str:
+    key = _map_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    cancellation.check()
+    msg = llm_client.invoke(prompt, _INTERPRETATION_TEMPERATURE, INTERPRET_NOTE_MAX_TOKENS)
+    text = _content(msg)
+    llm_cache.put(key, text)
+    return text
+
+
+async def _asummarize_chunk(prompt: str, sem: asyncio.Semaphore) -> str:
+    key = _map_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    async with sem:
+        cancellation.check()
+        msg = await llm_client.ainvoke(prompt, _INTERPRETATION_TEMPERATURE, INTERPRET_NOTE_MAX_TOKENS)
+    text = _content(msg)
+    llm_cache.put(key, text)
+    return text
+
+
+def _map_prompts(parse_result: dict, chunks: list[chunking.Chunk]) -> list[str]:
+    title = parse_result.get("title", "")
+    return [_map_prompt(title, c, i, len(chunks)) for i, c in enumerate(chunks)]
+
+
+def _build_prompt(parse_result: dict) -> str:
+    """生成最终（reduce）提示；长文先在线程池中并发提炼各片段。
+    每个片段在复制的 context 中执行，取消、埋点与缓存绕过设置对其同样生效；任一片段失败则整体失败，
+    已完成片段的结果留在缓存中，重试时不再重复调用。"""
+    chunks = _plan(parse_result)
+    if chunks is None:
+        return _interpretation_prompt(parse_result)
+    prompts = _map_prompts(parse_result, chunks)
+    with ThreadPoolExecutor(max_workers=min(INTERPRET_MAP_CONCURRENCY, len(prompts))) as ex:
+        futures = [ex.submit(contextvars.copy_context().run, _summarize_chunk, p) for p in prompts]
+        try:
+            notes = [f.result() for f in futures]
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+    return _interpretation_prompt(parse_result, notes)
+
+
+async def _abuild_prompt(parse_result: dict) -> str:
+    """_build_prompt 的协程版：每篇最多 INTERPRET_MAP_CONCURRENCY 个片段同时请求。"""
+    chunks = _plan(parse_result)
+    if chunks is None:
+        return _interpretation_prompt(parse_result)
+    sem = asyncio.Semaphore(INTERPRET_MAP_CONCURRENCY)
+    tasks = [asyncio.ensure_future(_asummarize_chunk(p, sem)) for p in _map_prompts(parse_result, chunks)]
+    try:
+        notes = await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return _interpretation_prompt(parse_result, list(notes))
+
+
+def _podcast_prompt(interpretation_md: str) -> str:
     content = interpretation_md[:12000]
 
     prompt = f"""请将以下论文解读报告改写成适合播客朗读的口语化稿件。要求：
@@ -66,5 +176,93 @@ def generate_podcast_script(interpretation_md: str) -> str:
 {content}
 
 只输出播客稿正文，不要输出代码块或额外说明。"""
-    msg = llm.invoke(prompt)
-    return msg.content if hasattr(msg, "content") else str(msg)
+    return prompt
+
+
+def _interpretation_key(prompt: str) -> str:
+    return llm_cache.make_key("interpretation", INTERPRETATION_PROMPT_VERSION, QWEN_MODEL, _INTERPRETATION_TEMPERATURE, prompt)
+
+
+def _podcast_key(prompt: str) -> str:
+    return llm_cache.make_key("podcast_script", PODCAST_PROMPT_VERSION, QWEN_MODEL, _PODCAST_TEMPERATURE, prompt)
+
+
+def generate_interpretation(parse_result: dict) -> str:
+    """根据解析结果生成结构化中文解读（Markdown）。"""
+    prompt = _build_prompt(parse_result)
+    key = _interpretation_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    msg = llm_client.invoke(prompt, _INTERPRETATION_TEMPERATURE)
+    text = _content(msg)
+    llm_cache.put(key, text)
+    return text
+
+
+async def agenerate_interpretation(parse_result: dict) -> str:
+    """generate_interpretation 的协程版，等待模型响应时不占用线程。"""
+    prompt = await _abuild_prompt(parse_result)
+    key = _interpretation_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    msg = await llm_client.ainvoke(prompt, _INTERPRETATION_TEMPERATURE)
+    text = _content(msg)
+    llm_cache.put(key, text)
+    return text
+
+
+def stream_interpretation(parse_result: dict, on_chunk: Callable[[str], None]) -> str:
+    """流式生成解读：每收到一段文本调用 on_chunk，返回完整文本；缓存命中时一次性给出。
+    每段之间检查任务是否已取消或超时。长文在 map 阶段完成后才开始输出。"""
+    prompt = _build_prompt(parse_result)
+    key = _interpretation_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        on_chunk(cached)
+        return cached
+    full = llm_client.stream(prompt, on_chunk, _INTERPRETATION_TEMPERATURE)
+    text = _content(full) if full is not None else ""
+    llm_cache.put(key, text)
+    return text
+
+
+async def astream_interpretation(parse_result: dict, on_chunk: Callable[[str], None]) -> str:
+    """stream_interpretation 的协程版。"""
+    prompt = await _abuild_prompt(parse_result)
+    key = _interpretation_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        on_chunk(cached)
+        return cached
+    full = await llm_client.astream(prompt, on_chunk, _INTERPRETATION_TEMPERATURE)
+    text = _content(full) if full is not None else ""
+    llm_cache.put(key, text)
+    return text
+
+
+def generate_podcast_script(interpretation_md: str) -> str:
+    """将解读 Markdown 改写成口语化播客稿（分段、可朗读）。"""
+    prompt = _podcast_prompt(interpretation_md)
+    key = _podcast_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    msg = llm_client.invoke(prompt, _PODCAST_TEMPERATURE)
+    text = _content(msg)
+    llm_cache.put(key, text)
+    return text
+
+
+async def agenerate_podcast_script(interpretation_md: str) -> str:
+    """generate_podcast_script 的协程版。"""
+    prompt = _podcast_prompt(interpretation_md)
+    key = _podcast_key(prompt)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    msg = await llm_client.ainvoke(prompt, _PODCAST_TEMPERATURE)
+    text = _content(msg)
+    llm_cache.put(key, text)
+    return text
@@ -0,0 +1,519 @@
+"""持久化任务队列：以 tasks 表为存储，领取/租约/心跳/过期回收。
+
+- API 通过 enqueue() 写入 pending 任务；
+- WorkerPool 中的 worker 线程用 task_claim 原子领取任务并持有租约，心跳线程定期续租；
+- 进程退出或崩溃后租约过期，任意存活的 worker（本进程或 `python -m backend.worker`）都会把任务放回队列重跑；
+- 每次执行有 TASK_TIMEOUT_SEC 截止时间，cancel() 请求取消；二者都通过 cancellation 协作退出，
+  卡住不退出的由回收线程直接标记为 timeout / cancelled。
+- AsyncWorkerPool 在单个事件循环中并发执行大量任务（协程处理函数），等待 LLM/TTS/arXiv 时不占用线程。
+- 需要长时间等待的处理函数（批量任务等子任务）抛 Deferred 交还 worker，任务放回队列稍后继续，
+  子任务结束时唤醒父任务；父任务被取消或超时时取消其未完成的子任务。
+"""
+import asyncio
+import inspect
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from nanoid import generate as nanoid_generate
+
+from backend.config import (
+    TASK_WORKERS,
+    TASK_LEASE_SEC,
+    TASK_MAX_ATTEMPTS,
+    TASK_IDLE_POLL_SEC,
+    TASK_SHUTDOWN_GRACE_SEC,
+    TASK_QUEUE_MAX_DEPTH,
+    TASK_RETRY_AFTER_SEC,
+    TASK_TIMEOUT_SEC,
+    TASK_ASYNC_CONCURRENCY,
+    TASK_ASYNC_THREADS,
+)
+from backend.db import connection
+from backend.db import models as db
+from backend.log_config import get_logger
+from backend.services import cancellation, events, llm_client, metrics
+
+logger = get_logger(__name__)
+
+# 任务处理函数：(task_id, payload) -> result；抛出 TaskError 表示可预期的失败
+Handler = Callable[[str, dict], Optional[dict]]
+_handlers: dict[str, Handler] = {}
+# 协程版处理函数，与同步版注册在同一任务类型下；AsyncWorkerPool 优先使用，缺省时把同步版放到线程中执行
+AsyncHandler = Callable[[str, dict], Awaitable[Optional[dict]]]
+_async_handlers: dict[str, AsyncHandler] = {}
+
+# 同进程入队时唤醒空闲 worker，跨进程时依赖 TASK_IDLE_POLL_SEC 轮询
+_wakeup = threading.Event()
+
+# 本进程正在执行的任务，cancel() 据此立即通知；其他进程的 worker 在心跳时从 DB 得知
+_running: dict[str, cancellation.TaskContext] = {}
+_running_lock = threading.Lock()
+
+
+# 领取顺序：优先级高者先执行；用户触发的任务优先于定时采集
+PRIORITY_USER = 10
+PRIORITY_BATCH = 5  # 批量任务的子任务：让位于单篇手动触发
+PRIORITY_SCHEDULED = 0
+
+
+class TaskError(Exception):
+    """任务的业务失败（如论文不存在），只记录 error，不打印堆栈。"""
+
+
+class Deferred(Exception):
+    """处理函数本次执行到此为止：任务放回队列，delay_sec 秒后（或被子任务唤醒时）再次执行，
+    不计入重试次数，截止时间不变；state 保存到任务行，下次执行时用 db.task_state_parse 读回。"""
+
+    def __init__(self, delay_sec: float, state: Optional[dict] = None):
+        super().__init__(f"{delay_sec:g} 秒后继续")
+        self.delay_sec = delay_sec
+        self.state = state
+
+
+class QueueFull(Exception):
+    """排队任务数已达 TASK_QUEUE_MAX_DEPTH，调用方应稍后重试。"""
+
+    def __init__(self, depth: int, retry_after: int = TASK_RETRY_AFTER_SEC):
+        super().__init__(f"任务队列已满（排队 {depth} 个），请 {retry_after} 秒后重试")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+def register(task_type: str):
+    """注册任务处理函数；协程函数注册为该类型的协程版。"""
+    def deco(fn):
+        if inspect.iscoroutinefunction(fn):
+            _async_handlers[task_type] = fn
+        else:
+            _handlers[task_type] = fn
+        return fn
+    return deco
+
+
+def enqueue(
+    task_type: str,
+    payload: dict,
+    paper_id: Optional[str] = None,
+    priority: int = PRIORITY_USER,
+    parent_id: Optional[str] = None,
+    timeout_sec: Optional[float] = None,
+) -> tuple[str, bool]:
+    """写入一个 pending 任务，返回 (task_id, 是否新建)。
+
+    指定 paper_id 时按 (task_type, paper_id) 单飞：已有进行中的同类任务则直接返回其 task_id。
+    排队任务数达到 TASK_QUEUE_MAX_DEPTH 时抛 QueueFull。
+    """
+    with connection() as conn:
+        if paper_id:
+            active = db.task_get_active(conn, task_type, paper_id)
+            if active:
+                return active["task_id"], False
+        depth = db.task_count_pending(conn)
+        if depth >= TASK_QUEUE_MAX_DEPTH:
+            raise QueueFull(depth)
+        task_id = nanoid_generate(size=16)
+        try:
+            db.task_insert(
+                conn, task_id, task_type, paper_id=paper_id, payload=payload,
+                max_attempts=TASK_MAX_ATTEMPTS, priority=priority,
+                parent_id=parent_id, timeout_sec=timeout_sec,
+            )
+        except sqlite3.IntegrityError:
+            # 并发提交：唯一索引 idx_tasks_active_paper 拒绝了第二个，返回先到者
+            conn.rollback()
+            active = db.task_get_active(conn, task_type, paper_id) if paper_id else None
+            if not active:
+                raise
+            return active["task_id"], False
+    _wakeup.set()
+    return task_id, True
+
+
+def report_progress(task_id: str, progress: dict) -> None:
+    """由任务处理函数调用：记录并推送运行中任务的进度（如当前完成的图节点）。"""
+    try:
+        with connection() as conn:
+            db.task_set_progress(conn, task_id, progress)
+    except Exception as e:
+        logger.warning("写入任务进度失败 task_id=%s: %s", task_id, e)
+    events.publish({"task_id": task_id, "status": "running", "progress": progress, "result": None, "error": None})
+
+
+def cancel(task_id: str) -> Optional[sqlite3.Row]:
+    """请求取消任务，返回更新后的行（不存在时 None）。pending 任务立即取消，running 任务协作退出。"""
+    with connection() as conn:
+        row = db.task_request_cancel(conn, task_id)
+    if row is None:
+        return None
+    with _running_lock:
+        ctx = _running.get(task_id)
+    if ctx is not None:
+        ctx.cancel()
+    events.publish(db.task_public(row))
+    if row["status"] == "cancelled":
+        # 等待中的父任务直接取消，不会再执行，由这里取消其子任务
+        _cancel_children(task_id)
+    return row
+
+
+def _cancel_children(parent_id: str) -> None:
+    with connection() as conn:
+        children = [r["task_id"] for r in db.task_list_children(conn, parent_id)
+                    if r["status"] not in db.TASK_TERMINAL_STATUSES]
+    for child_id in children:
+        cancel(child_id)
+
+
+def _log_recovered(prefix: str, counts: dict[str, int]) -> None:
+    if any(counts.values()):
+        logger.info(
+            "%s: 重新入队 %s, 标记失败 %s, 超时 %s, 取消 %s",
+            prefix, counts["requeued"], counts["failed"], counts["timeout"], counts["cancelled"],
+        )
+
+
+def _parse_payload(row) -> dict:
+    try:
+        return json.loads(row["payload"]) if row["payload"] else {}
+    except ValueError:
+        return {}
+
+
+def _begin(row) -> cancellation.TaskContext:
+    """登记开始执行的任务并推送 running 快照。"""
+    ctx = cancellation.TaskContext(row["task_id"], row["deadline_at"])
+    with _running_lock:
+        _running[row["task_id"]] = ctx
+    if row["cancel_requested"]:
+        ctx.cancel()
+    events.publish(db.task_public(row))
+    return ctx
+
+
+def _complete(
+    row,
+    worker_id: str,
+    ctx: cancellation.TaskContext,
+    run_metrics: metrics.RunMetrics,
+    status: str,
+    result: Optional[dict],
+    error: Optional[str],
+    timeout_sec: float,
+) -> None:
+    """写入终态与本次执行的节点埋点并推送；失败时以上下文状态区分 timeout / cancelled。"""
+    task_id = row["task_id"]
+    with _running_lock:
+        _running.pop(task_id, None)
+    if status != "success":
+        # 节点可能把取消/超时异常吞成普通错误，以上下文状态为准
+        outcome = ctx.outcome()
+        if outcome == "timeout":
+            status, error = "timeout", f"任务超时（超过 {timeout_sec:g} 秒）"
+        elif outcome == "cancelled":
+            status, error = "cancelled", ctx.reason
+    with connection() as conn:
+        try:
+            db.task_metrics_insert(conn, task_id, row["type"], row["attempts"], run_metrics.records())
+        except Exception as e:
+            logger.warning("写入任务埋点失败 task_id=%s: %s", task_id, e)
+        if not db.task_complete(conn, task_id, worker_id, status, result=result, error=error):
+            logger.warning("任务租约已丢失，结果未写入 task_id=%s", task_id)
+            return
+        if row["parent_id"] and db.task_wake(conn, row["parent_id"]):
+            _wakeup.set()
+        row = db.task_get(conn, task_id)
+    if row:
+        events.publish(db.task_public(row))
+        if status in ("cancelled", "timeout"):
+            _cancel_children(task_id)
+
+
+def _defer(row, worker_id: str, ctx: cancellation.TaskContext, deferred: Deferred) -> None:
+    """处理函数抛出 Deferred：放回队列等待下一步；期间收到取消/超时时立即再次领取，由 worker 写入终态。"""
+    task_id = row["task_id"]
+    with _running_lock:
+        _running.pop(task_id, None)
+    delay = 0.0 if ctx.outcome() else max(0.0, deferred.delay_sec)
+    with connection() as conn:
+        if not db.task_defer(conn, task_id, worker_id, time.time() + delay, deferred.state):
+            logger.warning("任务租约已丢失，未放回队列 task_id=%s", task_id)
+    if delay == 0.0:
+        _wakeup.set()
+
+
+def _heartbeat_once(active: dict[str, tuple[str, cancellation.TaskContext]], lease_sec: float, recover: bool) -> None:
+    """为进行中的任务续租（失败则取消），同步 DB 中的取消请求；recover 时顺带回收过期任务。"""
+    with connection() as conn:
+        for task_id, (worker_id, ctx) in active.items():
+            if not db.task_heartbeat(conn, task_id, worker_id, lease_sec):
+                logger.warning("续租失败，任务可能已被回收 task_id=%s", task_id)
+                ctx.cancel("任务租约已丢失")
+        for task_id in db.task_cancel_requested(conn, list(active)):
+            active[task_id][1].cancel()
+        if recover:
+            _log_recovered("回收过期任务", db.task_recover_expired(conn))
+
+
+def _release(leftover: dict[str, str]) -> None:
+    if leftover:
+        with connection() as conn:
+            for task_id, worker_id in leftover.items():
+                db.task_release(conn, task_id, worker_id)
+        logger.info("退出时放回队列的任务: %s", list(leftover))
+
+
+class WorkerPool:
+    """一组 worker 线程 + 一个心跳/回收线程。"""
+
+    def __init__(
+        self,
+        size: int = TASK_WORKERS,
+        lease_sec: float = TASK_LEASE_SEC,
+        timeout_sec: float = TASK_TIMEOUT_SEC,
+    ):
+        self.size = size
+        self.lease_sec = lease_sec
+        self.timeout_sec = timeout_sec
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._active: dict[str, tuple[str, cancellation.TaskContext]] = {}  # task_id -> (worker_id, ctx)
+        self._active_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.size <= 0:
+            return
+        with connection() as conn:
+            _log_recovered("回收中断任务", db.task_recover_expired(conn))
+        for i in range(self.size):
+            t = threading.Thread(target=self._work, args=(f"{self._prefix}:{i}",), name=f"task-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        hb = threading.Thread(target=self._heartbeat, name="task-heartbeat", daemon=True)
+        hb.start()
+        self._threads.append(hb)
+        logger.info("任务 worker 已启动: %s 个, 租约 %ss", self.size, self.lease_sec)
+
+    def stop(self, grace_sec: float = TASK_SHUTDOWN_GRACE_SEC) -> None:
+        """停止领取新任务，等待进行中的任务至多 grace_sec 秒，其余放回队列。"""
+        if not self._threads:
+            return
+        self._stop.set()
+        _wakeup.set()
+        deadline = time.monotonic() + grace_sec
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        with self._active_lock:
+            leftover = {task_id: worker_id for task_id, (worker_id, _) in self._active.items()}
+        _release(leftover)
+        self._threads.clear()
+
+    def _work(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                with connection() as conn:
+                    row = db.task_claim(conn, worker_id, self.lease_sec, self.timeout_sec)
+            except Exception as e:
+                logger.warning("领取任务失败: %s", e)
+                row = None
+            if row is None:
+                _wakeup.wait(TASK_IDLE_POLL_SEC)
+                _wakeup.clear()
+                continue
+            self._run(worker_id, row)
+
+    def _run(self, worker_id: str, row) -> None:
+        task_id, task_type = row["task_id"], row["type"]
+        handler = _handlers.get(task_type)
+        ctx = _begin(row)
+        with self._active_lock:
+            self._active[task_id] = (worker_id, ctx)
+        run_metrics = metrics.RunMetrics()
+        status, result, error = "failed", None, None
+        try:
+            if handler is None:
+                raise TaskError(f"未知任务类型: {task_type}")
+            with cancellation.bind(ctx), metrics.bind(run_metrics):
+                ctx.check()
+                result = handler(task_id, _parse_payload(row))
+            status = "success"
+        except Deferred as e:
+            with self._active_lock:
+                self._active.pop(task_id, None)
+            _defer(row, worker_id, ctx, e)
+            return
+        except (TaskError, cancellation.Cancelled) as e:
+            error = str(e)
+        except Exception as e:
+            logger.exception("任务执行异常 task_id=%s type=%s: %s", task_id, task_type, e)
+            error = str(e)
+        finally:
+            with self._active_lock:
+                self._active.pop(task_id, None)
+        _complete(row, worker_id, ctx, run_metrics, status, result, error, self.timeout_sec)
+
+    def _heartbeat(self) -> None:
+        interval = max(1.0, self.lease_sec / 3)
+        last_recover = 0.0
+        while not self._stop.wait(interval):
+            with self._active_lock:
+                active = dict(self._active)
+            recover = time.monotonic() - last_recover >= self.lease_sec
+            if recover:
+                last_recover = time.monotonic()
+            try:
+                _heartbeat_once(active, self.lease_sec, recover)
+            except Exception as e:
+                logger.warning("心跳/回收失败: %s", e)
+
+
+class AsyncWorkerPool:
+    """在一个事件循环中并发执行至多 concurrency 个任务：每个任务一个 asyncio.Task，
+    截止时间由 wait_for 强制，取消请求由监督协程转成 Task.cancel()，打断进行中的网络等待。
+
+    协程处理函数不占用线程；同步处理函数（及 PDF 解析、DB 读写）在有界线程池中执行。
+    用法：await AsyncWorkerPool(...).run(stop_event)。
+    """
+
+    def __init__(
+        self,
+        concurrency: int = TASK_ASYNC_CONCURRENCY,
+        lease_sec: float = TASK_LEASE_SEC,
+        timeout_sec: float = TASK_TIMEOUT_SEC,
+        threads: int = TASK_ASYNC_THREADS,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.lease_sec = lease_sec
+        self.timeout_sec = timeout_sec
+        self.threads = max(1, threads)
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._seq = 0
+        # task_id -> (worker_id, ctx)，由 _heartbeat_once 在线程中读取，只在事件循环中修改（修改前复制）
+        self._active: dict[str, tuple[str, cancellation.TaskContext]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._interrupted: set[str] = set()  # 已因取消/超时调用过 Task.cancel() 的任务
+
+    async def run(self, stop: asyncio.Event, grace_sec: float = TASK_SHUTDOWN_GRACE_SEC) -> None:
+        """领取并执行任务直到 stop 被设置；随后等待进行中的任务至多 grace_sec 秒，其余放回队列。"""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="task-async"))
+        await asyncio.to_thread(self._recover, "回收中断任务")
+        supervisor = asyncio.create_task(self._supervise(stop))
+        logger.info("异步任务 worker 已启动: 并发 %s, 线程 %s, 租约 %ss", self.concurrency, self.threads, self.lease_sec)
+        try:
+            await self._claim_loop(stop)
+            if self._tasks:
+                await asyncio.wait(list(self._tasks.values()), timeout=grace_sec)
+        finally:
+            leftover = {task_id: worker_id for task_id, (worker_id, _) in self._active.items()}
+            for t in self._tasks.values():
+                t.cancel()
+            if self._tasks:
+                await asyncio.wait(list(self._tasks.values()))
+            supervisor.cancel()
+            await asyncio.to_thread(_release, leftover)
+            await llm_client.aclose()
+
+    def _recover(self, prefix: str) -> None:
+        with connection() as conn:
+            _log_recovered(prefix, db.task_recover_expired(conn))
+
+    def _claim(self, worker_id: str):
+        with connection() as conn:
+            return db.task_claim(conn, worker_id, self.lease_sec, self.timeout_sec)
+
+    async def _claim_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            if len(self._tasks) >= self.concurrency:
+                await asyncio.wait(list(self._tasks.values()), timeout=TASK_IDLE_POLL_SEC, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            self._seq += 1
+            worker_id = f"{self._prefix}:a{self._seq}"
+            try:
+                row = await asyncio.to_thread(self._claim, worker_id)
+            except Exception as e:
+                logger.warning("领取任务失败: %s", e)
+                row = None
+            if row is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), TASK_IDLE_POLL_SEC)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            ctx = _begin(row)
+            self._active = {**self._active, row["task_id"]: (worker_id, ctx)}
+            self._tasks[row["task_id"]] = asyncio.create_task(self._run(worker_id, row, ctx))
+
+    async def _call(self, task_type: str, task_id: str, payload: dict) -> Optional[dict]:
+        ahandler = _async_handlers.get(task_type)
+        if ahandler is not None:
+            return await ahandler(task_id, payload)
+        handler = _handlers.get(task_type)
+        if handler is None:
+            raise TaskError(f"未知任务类型: {task_type}")
+        return await asyncio.to_thread(handler, task_id, payload)
+
+    async def _run(self, worker_id: str, row, ctx: cancellation.TaskContext) -> None:
+        task_id, task_type = row["task_id"], row["type"]
+        run_metrics = metrics.RunMetrics()
+        status, result, error = "failed", None, None
+        deferred: Optional[Deferred] = None
+        try:
+            with cancellation.bind(ctx), metrics.bind(run_metrics):
+                ctx.check()
+                timeout = max(0.0, ctx.deadline - time.time()) if ctx.deadline is not None else None
+                result = await asyncio.wait_for(self._call(task_type, task_id, _parse_payload(row)), timeout)
+            status = "success"
+        except Deferred as e:
+            deferred = e
+        except (TaskError, cancellation.Cancelled) as e:
+            error = str(e)
+        except asyncio.TimeoutError:
+            error = "任务超时"
+        except asyncio.CancelledError:
+            if not (ctx.cancelled or ctx.expired):
+                # 进程退出：不写终态，由 run() 放回队列
+                with _running_lock:
+                    _running.pop(task_id, None)
+                raise
+            error = ctx.reason
+        except Exception as e:
+            logger.exception("任务执行异常 task_id=%s type=%s: %s", task_id, task_type, e)
+            error = str(e)
+        finally:
+            self._tasks.pop(task_id, None)
+            self._interrupted.discard(task_id)
+            self._active = {k: v for k, v in self._active.items() if k != task_id}
+        if deferred is not None:
+            await asyncio.to_thread(_defer, row, worker_id, ctx, deferred)
+            return
+        await asyncio.to_thread(_complete, row, worker_id, ctx, run_metrics, status, result, error, self.timeout_sec)
+
+    async def _supervise(self, stop: asyncio.Event) -> None:
+        """每秒把已取消/超时的任务转成 Task.cancel()；每 1/3 租约续租，每个租约周期回收一次过期任务。"""
+        interval = max(1.0, self.lease_sec / 3)
+        last_beat = last_recover = time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            for task_id, (_, ctx) in self._active.items():
+                task = self._tasks.get(task_id)
+                if task is not None and (ctx.cancelled or ctx.expired) and task_id not in self._interrupted:
+                    self._interrupted.add(task_id)
+                    task.cancel()
+            now = time.monotonic()
+            if now - last_beat < interval:
+                continue
+            last_beat = now
+            recover = now - last_recover >= self.lease_sec
+            if recover:
+                last_recover = now
+            try:
+                await asyncio.to_thread(_heartbeat_once, self._active, self.lease_sec, recover)
+            except Exception as e:
+                logger.warning("心跳/回收失败: %s", e)
@@ -2,17 +2,19 @@
 import wave
 from pathlib import Path
 
+import httpx
 import requests
 
 from backend.log_config import get_logger
+from backend.services import cancellation, limits, metrics
 from backend.config import (
     DASHSCOPE_API_KEY,
+    DASHSCOPE_TTS_URL,
     QWEN_TTS_MODEL,
     PODCASTS_DIR,
+    TTS_TIMEOUT_SEC,
 )
 
-# 非流式 TTS 接口（与百炼 Qwen-TTS API 一致）
-DASHSCOPE_TTS_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/multimodal-generation/generation"
 logger = get_logger(__name__)
 
 
@@ -22,6 +24,7 @@ def synthesize_to_file(text: str, output_path: str | Path) -> tuple[str, float]:
     返回 (实际保存的文件路径, 时长秒)。
     使用 DashScope Qwen TTS（与文本模型共用 DASHSCOPE_API_KEY）。
     若未配置 Key 或调用失败，将文本写入同路径的 .txt，返回 (txt 路径, 0)。
+    在后台任务中执行时，每段请求的超时不超过任务剩余时间，任务取消/超时则抛出 cancellation.Cancelled。
     """
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -37,60 +40,142 @@ def synthesize_to_file(text: str, output_path: str | Path) -> tuple[str, float]:
     part_paths: list[Path] = []
 
     for i, seg in enumerate(segments):
-        seg = (seg or "").strip()
+        seg = _truncate_segment(seg)
         if not seg:
             continue
-        # 接口限制 600：可能按字节（UTF-8）计，中文约 200 字；按字节截断到 600
-        seg_bytes = seg.encode("utf-8")
-        if len(seg_bytes) > 600:
-            n = 0
-            for i in range(len(seg)):
-                if len(seg[: i + 1].encode("utf-8")) > 600:
-                    break
-                n = i + 1
-            seg = seg[:n] if n else seg[:200]
-        if len(seg.encode("utf-8")) > 600:
-            seg = seg[:200]
+        metrics.add("tts_chars", len(seg))
         try:
-            resp = requests.post(
-                DASHSCOPE_TTS_URL,
-                headers={
-                    "Authorization": f"Bearer {DASHSCOPE_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": QWEN_TTS_MODEL,
-                    "input": {
-                        "text": seg,
-                        "voice": "Cherry",
-                        "language_type": "Chinese",
-                    },
-                },
-                timeout=60,
-            )
+            with limits.tts.slot():
+                resp = requests.post(
+                    DASHSCOPE_TTS_URL,
+                    headers=_headers(),
+                    json=_request_body(seg),
+                    timeout=cancellation.remaining(TTS_TIMEOUT_SEC),
+                )
             data = resp.json() if resp.content else {}
-            out = data.get("output") or {}
-            audio_info = out.get("audio") or {}
-            url = audio_info.get("url")
+            url = _audio_url(data)
             # 成功：HTTP 200 且 body 含 output.audio.url（部分响应无顶层 status_code）
             if resp.status_code != 200 or not url:
                 logger.warning("TTS 接口异常 status=%s 或无 url body=%s", resp.status_code, data)
                 _fallback_txt(output_path, text)
                 return str(output_path.with_suffix(".txt")), 0.0
-            r = requests.get(url, timeout=30)
+            r = requests.get(url, timeout=cancellation.remaining(TTS_TIMEOUT_SEC))
             r.raise_for_status()
-            suffix = ".wav" if ".wav" in url.split("?")[0] else ".mp3"
-            part_path = output_path.with_suffix(suffix) if len(segments) == 1 else output_path.with_stem(f"{output_path.stem}_part{i}").with_suffix(suffix)
-            part_path.write_bytes(r.content)
+            part_path, duration = _save_part(output_path, i, len(segments), url, r.content)
             saved_path = part_path
             part_paths.append(part_path)
-            total_duration += len(r.content) / (16000 * 2) if suffix == ".wav" else len(r.content) / 16000
+            total_duration += duration
+        except cancellation.Cancelled:
+            raise
         except Exception as e:
             logger.warning("TTS 请求异常: %s", e, exc_info=True)
             _fallback_txt(output_path, text)
             return str(output_path.with_suffix(".txt")), 0.0
 
-    # 多段时合并为单个 wav（仅当均为 .wav 且多段时）
+    return str(_finish(output_path, part_paths, saved_path)), total_duration if total_duration > 0 else 0.0
+
+
+async def asynthesize_to_file(text: str, output_path: str | Path) -> tuple[str, float]:
+    """synthesize_to_file 的协程版（httpx.AsyncClient），行为与返回值一致；等待接口时不占用线程。"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if not DASHSCOPE_API_KEY:
+        _fallback_txt(output_path, text)
+        return str(output_path.with_suffix(".txt")), 0.0
+
+    segments = _split_text(text, max_chars=300)
+    saved_path: Path = output_path
+    total_duration = 0.0
+    part_paths: list[Path] = []
+
+    async with httpx.AsyncClient() as client:
+        for i, seg in enumerate(segments):
+            seg = _truncate_segment(seg)
+            if not seg:
+                continue
+            metrics.add("tts_chars", len(seg))
+            try:
+                async with limits.tts.aslot():
+                    resp = await client.post(
+                        DASHSCOPE_TTS_URL,
+                        headers=_headers(),
+                        json=_request_body(seg),
+                        timeout=cancellation.remaining(TTS_TIMEOUT_SEC),
+                    )
+                data = resp.json() if resp.content else {}
+                url = _audio_url(data)
+                if resp.status_code != 200 or not url:
+                    logger.warning("TTS 接口异常 status=%s 或无 url body=%s", resp.status_code, data)
+                    _fallback_txt(output_path, text)
+                    return str(output_path.with_suffix(".txt")), 0.0
+                r = await client.get(url, timeout=cancellation.remaining(TTS_TIMEOUT_SEC))
+                r.raise_for_status()
+                part_path, duration = _save_part(output_path, i, len(segments), url, r.content)
+                saved_path = part_path
+                part_paths.append(part_path)
+                total_duration += duration
+            except cancellation.Cancelled:
+                raise
+            except Exception as e:
+                logger.warning("TTS 请求异常: %s", e, exc_info=True)
+                _fallback_txt(output_path, text)
+                return str(output_path.with_suffix(".txt")), 0.0
+
+    return str(_finish(output_path, part_paths, saved_path)), total_duration if total_duration > 0 else 0.0
+
+
+def _truncate_segment(seg: str) -> str:
+    """接口限制 600：可能按字节（UTF-8）计，中文约 200 字；按字节截断到 600。"""
+    seg = (seg or "").strip()
+    if len(seg.encode("utf-8")) > 600:
+        n = 0
+        for i in range(len(seg)):
+            if len(seg[: i + 1].encode("utf-8")) > 600:
+                break
+            n = i + 1
+        seg = seg[:n] if n else seg[:200]
+    if len(seg.encode("utf-8")) > 600:
+        seg = seg[:200]
+    return seg
+
+
+def _headers() -> dict:
+    return {
+        "Authorization": f"Bearer {DASHSCOPE_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+
+def _request_body(seg: str) -> dict:
+    return {
+        "model": QWEN_TTS_MODEL,
+        "input": {
+            "text": seg,
+            "voice": "Cherry",
+            "language_type": "Chinese",
+        },
+    }
+
+
+def _audio_url(data: dict) -> str | None:
+    out = data.get("output") or {}
+    audio_info = out.get("audio") or {}
+    return audio_info.get("url")
+
+
+def _save_part(output_path: Path, i: int, n_segments: int, url: str, content: bytes) -> tuple[Path, float]:
+    """保存一段音频，返回 (路径, 估算时长秒)。"""
+    metrics.add("bytes_downloaded", len(content))
+    suffix = ".wav" if ".wav" in url.split("?")[0] else ".mp3"
+    part_path = output_path.with_suffix(suffix) if n_segments == 1 else output_path.with_stem(f"{output_path.stem}_part{i}").with_suffix(suffix)
+    part_path.write_bytes(content)
+    duration = len(content) / (16000 * 2) if suffix == ".wav" else len(content) / 16000
+    return part_path, duration
+
+
+def _finish(output_path: Path, part_paths: list[Path], saved_path: Path) -> Path:
+    """多段时合并为单个 wav（仅当均为 .wav 且多段时），返回最终文件路径。"""
     if len(part_paths) > 1 and all(p.suffix.lower() == ".wav" for p in part_paths):
         merged = output_path.with_suffix(".wav")
         try:
@@ -100,11 +185,10 @@ def synthesize_to_file(text: str, output_path: str | Path) -> tuple[str, float]:
                     p.unlink(missing_ok=True)
                 except OSError:
                     pass
-            saved_path = merged
+            return merged
         except Exception as e:
             logger.warning("合并 wav 失败，保留最后一段: %s", e)
-
-    return str(saved_path), total_duration if total_duration > 0 else 0.0
+    return saved_path
 
 
 def _split_text(text: str, max_chars: int = 300) -> list[str]:
@@ -0,0 +1,62 @@
+"""独立任务 worker 进程：`python -m backend.worker [--workers N]` 或 `python -m backend.worker --async [--concurrency N]`。
+
+与 API 进程共享同一个 SQLite（tasks 表）领取任务，可多开以提升吞吐；
+API 进程可设 TASK_WORKERS=0 只负责入队。收到 SIGTERM/SIGINT 后停止领取并把未完成任务放回队列。
+--async 时在单个事件循环中并发执行任务（协程版解读/播客），同时在途的 LLM/TTS/arXiv 请求不需要各占一个线程。
+"""
+import argparse
+import asyncio
+import signal
+import threading
+
+from backend.config import ensure_data_dirs, TASK_WORKERS, TASK_ASYNC_CONCURRENCY
+from backend.db import init_db, close_pool
+from backend.log_config import setup_logging, get_logger
+from backend.services.task_queue import AsyncWorkerPool, WorkerPool
+from backend.services import jobs  # noqa: F401  注册任务处理函数
+from backend.services import pdf_parser
+
+logger = get_logger(__name__)
+
+
+def _run_threaded(workers: int) -> None:
+    pool = WorkerPool(size=workers)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    pool.start()
+    stop.wait()
+    logger.info("worker 进程退出中")
+    pool.stop()
+
+
+async def _run_async(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    pool = AsyncWorkerPool(concurrency=concurrency)
+    await pool.run(stop)
+    logger.info("worker 进程退出")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PaperAxon 任务 worker")
+    parser.add_argument("--workers", type=int, default=TASK_WORKERS or 4, help="worker 线程数")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="在事件循环中并发执行任务")
+    parser.add_argument("--concurrency", type=int, default=TASK_ASYNC_CONCURRENCY, help="--async 时同时执行的任务数")
+    args = parser.parse_args()
+
+    ensure_data_dirs()
+    setup_logging()
+    init_db()
+    if args.use_async:
+        asyncio.run(_run_async(args.concurrency))
+    else:
+        _run_threaded(args.workers)
+    pdf_parser.shutdown()
+    close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,13 @@ export async function listPapers(params = {}) {
   return r.json()
 }
 
+export async function searchPapers(params = {}) {
+  const q = new URLSearchParams(params).toString()
+  const r = await fetch(`${base}/api/papers/search?${q}`)
+  if (!r.ok) throw new Error(await r.text())
+  return r.json()
+}
+
 export async function getPaper(id) {
   const r = await fetch(`${base}/api/papers/${id}`)
   if (!r.ok) throw new Error(await r.text())
@@ -37,12 +44,41 @@ export async function triggerInterpret(paperId) {
   return r.json()
 }
 
+/** 批量解读：body 为 { paper_ids } 或 { since, uninterpreted, limit }，返回父任务 { task_id, total } */
+export async function interpretBatch(body) {
+  const r = await fetch(`${base}/api/papers/interpret-batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+  })
+  if (!r.ok) throw new Error(await r.text())
+  return r.json()
+}
+
 export async function getInterpretation(paperId) {
   const r = await fetch(`${base}/api/papers/${paperId}/interpretation`)
   if (!r.ok) throw new Error(await r.text())
   return r.text()
 }
 
+// 流式读取解读：解读进行中时 onText 随生成不断收到累计的 Markdown，结束后返回全文
+export async function streamInterpretation(paperId, onText) {
+  const r = await fetch(`${base}/api/papers/${paperId}/interpretation/stream`)
+  if (!r.ok) throw new Error(await r.text())
+  const reader = r.body.getReader()
+  const decoder = new TextDecoder()
+  let text = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    text += decoder.decode(value, { stream: true })
+    onText && onText(text)
+  }
+  text += decoder.decode()
+  onText && onText(text)
+  return text
+}
+
 export async function triggerPodcast(paperId) {
   const r = await fetch(`${base}/api/papers/${paperId}/podcast`, { method: 'POST' })
   if (!r.ok) throw new Error(await r.text())
@@ -55,6 +91,24 @@ export async function getTask(taskId) {
   return r.json()
 }
 
+export async function cancelTask(taskId) {
+  const r = await fetch(`${base}/api/tasks/${taskId}/cancel`, { method: 'POST' })
+  if (!r.ok) throw new Error(await r.text())
+  return r.json()
+}
+
+/** 订阅任务进度（SSE）。onUpdate 收到 {task_id,status,progress,result,error}；返回关闭函数。 */
+export function watchTask(taskId, { onUpdate, onError } = {}) {
+  const es = new EventSource(`${base}/api/tasks/${taskId}/events`)
+  es.addEventListener('task', (e) => onUpdate && onUpdate(JSON.parse(e.data)))
+  es.addEventListener('end', () => es.close())
+  es.onerror = () => {
+    es.close()
+    onError && onError()
+  }
+  return () => es.close()
+}
+
 export async function deletePaper(paperId) {
   const r = await fetch(`${base}/api/papers/${paperId}`, { method: 'DELETE' })
   if (!r.ok) throw new Error(await r.text())